@@ -21,11 +21,16 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
-import re
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 from PIL import Image
-from io import BytesIO
+from utils.base_dados import ler_aba, versao_arquivo
+from utils.administrativo import colunas_mensais
+from utils.exportacao import planilha_excel
+from utils.financeiro import mapa_codigos_empreendimentos, despesa_real_por_empreendimento, indice_cvco_por_codigo
+from utils.periodos import classificar_periodo, PERIODOS_DEPARTAMENTO, PERIODOS_GRD
+from utils.filtros import catalogo_filtros, opcoes, mascara_filtros
+from utils.cubo import COL_MES, fatiar
+from utils.cubo_grd import montar_cubo_grd, valor_por, atende as cubo_atende
 
 # ================================
 # Funções de Pré-processamento e Carregamento
@@ -42,27 +47,11 @@ def converter_data(df, col_list):
             df[col] = pd.to_datetime(df[col], format='%d/%m/%Y', errors='coerce')
     return df
 
-def parse_month_year(col):
-    """
-    Identifica colunas como 'jan/25', 'fev/25', etc. (texto),
-    convertendo em datetime(2025,1,1), datetime(2025,2,1), etc.
-    Retorna None se não casar.
-    """
-    months_map = {
-        'jan': 1, 'fev': 2, 'mar': 3, 'abr': 4, 'mai': 5, 'jun': 6,
-        'jul': 7, 'ago': 8, 'set': 9, 'out': 10, 'nov': 11, 'dez': 12
-    }
-    match = re.match(r"^([a-zA-Z]{3})/(\d{2})$", col.strip().lower())
-    if match:
-        mon_str = match.group(1)
-        year_str = match.group(2)
-        mes = months_map.get(mon_str, None)
-        ano = 2000 + int(year_str)
-        if mes:
-            return datetime(ano, mes, 1)
-    return None
+# Tempo máximo (segundos) que a base fica em cache antes de ser relida
+CACHE_TTL = 60 * 60
 
-def load_data():
+@st.cache_resource(ttl=CACHE_TTL, max_entries=2, show_spinner="Carregando base de dados...")
+def _load_data_cached(versao):
     """
     Carrega as abas “departamento”, “engenharia”, “grd_Listagem” e “administrativo”
     do arquivo Excel "base2025.xlsx", aplicando os pré-processamentos:
@@ -70,12 +59,14 @@ def load_data():
       - Conversão de datas (DD/MM/YYYY) para datetime
       - Tratamento de valores em branco (nas abas administrativo e departamento)
       - Na aba grd_Listagem, ignora a primeira linha (células mescladas)
+    O resultado é compartilhado por todas as sessões; `versao` (mtime + hash
+    da planilha) faz com que uma planilha alterada gere uma nova entrada.
     """
-    xls = pd.ExcelFile(resource_path("base2025.xlsx"))
-    df_departamento = pd.read_excel(xls, sheet_name="departamento")
-    df_engenharia  = pd.read_excel(xls, sheet_name="engenharia")
-    df_grd         = pd.read_excel(xls, sheet_name="grd_Listagem", skiprows=1)  # ignora a primeira linha
-    df_admin       = pd.read_excel(xls, sheet_name="administrativo")
+    caminho = resource_path("base2025.xlsx")
+    df_departamento = ler_aba(caminho, "departamento")
+    df_engenharia  = ler_aba(caminho, "engenharia")
+    df_grd         = ler_aba(caminho, "grd_Listagem", skiprows=1)  # ignora a primeira linha
+    df_admin       = ler_aba(caminho, "administrativo")
     
     df_departamento = clean_columns(df_departamento)
     df_engenharia  = clean_columns(df_engenharia)
@@ -91,6 +82,50 @@ def load_data():
     
     return df_departamento, df_engenharia, df_grd, df_admin
 
+def load_data():
+    """
+    Retorna cópias rasas (sem copiar os dados) dos DataFrames em cache.
+    Cada sessão pode criar ou substituir colunas (ex.: df_grd["Data CVCO_Ref"] = ...)
+    sem afetar as demais; alterações in-place (.loc/.at) não devem ser feitas.
+    """
+    versao = versao_arquivo(resource_path("base2025.xlsx"))
+    return tuple(df.copy(deep=False) for df in _load_data_cached(versao))
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=2)
+def _mapa_codigos(versao, _empreendimentos, _codigos):
+    """Tabela código → empreendimento da GRD, montada uma vez por versão da planilha."""
+    return mapa_codigos_empreendimentos(_empreendimentos, _codigos)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=2)
+def _colunas_mensais(versao, _colunas):
+    """Colunas mensais (datetime, coluna) da aba administrativo, identificadas uma vez por versão da planilha."""
+    return colunas_mensais(_colunas)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=2)
+def _planilha_manutencao(df):
+    """Planilha .xlsx da Tabela Ajustada, gerada uma vez para cada conteúdo da tabela."""
+    return planilha_excel({"Planejamento": df})
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=2)
+def _indice_cvco(versao, _df_departamento, _codigos):
+    """Índice código → (Data CVCO, Status) dos empreendimentos, montado uma vez por versão da planilha."""
+    return indice_cvco_por_codigo(_df_departamento, _codigos)
+
+COLUNAS_FILTRO_GRD = ["Cód. Alternativo Serviço", "Ano", "Mês", "Descrição Projeto",
+                      "Descrição Grupo", "Derscrição Serviço", "Descrição Item"]
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=2)
+def _catalogo_grd(versao, _df_grd):
+    """Opções e colunas categóricas dos filtros da consulta de gastos, montadas uma vez por versão da planilha."""
+    documento = pd.to_datetime(_df_grd["Data Documento"], errors="coerce").dt
+    colunas = _df_grd.assign(Ano=documento.year.astype("Int64"), **{"Mês": documento.month.astype("Int64")})
+    return catalogo_filtros(colunas, COLUNAS_FILTRO_GRD, ordenadas=["Cód. Alternativo Serviço", "Ano", "Mês"])
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=2)
+def _cubo_grd(versao, _df_grd):
+    """Valor Conv. por código, mês, projeto, grupo e serviço, somado uma vez por versão da planilha."""
+    return montar_cubo_grd(_df_grd)
+
 # ================================
 # Função Principal
 # ================================
@@ -127,10 +162,19 @@ def main():
     except Exception as e:
         st.error(f"Não foi possível carregar as imagens: {e}")
 
+    # -------------------------------
+    # Base de Dados – força a releitura da planilha sem esperar o TTL
+    # -------------------------------
+    st.sidebar.header("Base de Dados")
+    if st.sidebar.button("🔄 Recarregar base"):
+        _load_data_cached.clear()
+        st.sidebar.success("Base recarregada.")
+
     st.markdown('<h1 style="color: orange;">Administrativo e Financeiro Pós Obras 💵</h1>', unsafe_allow_html=True)
     st.markdown('Acompanhamento do Quadro Administrativo e Financeiro do Setor de Pós Obra')
 
     # Carrega os dados
+    versao = versao_arquivo(resource_path("base2025.xlsx"))
     df_departamento, df_engenharia, df_grd, df_admin = load_data()
     
     # Colunas datetime auxiliares
@@ -141,33 +185,10 @@ def main():
     # ================================
     # Cálculo da coluna "Periodo" para filtro (aba departamento)
     # ================================
-    today = pd.Timestamp.today().to_pydatetime()
-    
-    def classify_period(cvco_date):
-        if pd.isnull(cvco_date):
-            return "Sem Data CVCO"
-        cvco_dt = pd.to_datetime(cvco_date).to_pydatetime()
-        delta = relativedelta(today, cvco_dt)
-        diff_months = delta.years * 12 + delta.months
-        if diff_months < 0:
-            return "Futuro"
-        if diff_months <= 3:
-            return "Despesas Pós Entrega"
-        elif diff_months <= 12:
-            return "Despesas 1° Ano"
-        elif diff_months <= 24:
-            return "Despesas 2° Ano"
-        elif diff_months <= 36:
-            return "Despesas 3° Ano"
-        elif diff_months <= 48:
-            return "Despesas 4° Ano"
-        elif diff_months <= 60:
-            return "Despesas 5° Ano"
-        else:
-            return "Despesas após 5 Anos"
+    today = pd.Timestamp.today()
     
     if "Data CVCO" in df_departamento.columns:
-        df_departamento["Periodo"] = df_departamento["Data CVCO"].apply(classify_period)
+        df_departamento["Periodo"] = classificar_periodo(df_departamento["Data CVCO"], today, PERIODOS_DEPARTAMENTO)
     
     # Cria as 3 tabs
     tab_mao_obra, tab_manutencao, tab_equilibrio = st.tabs(["Mão de Obra", "Manutenção", "Ponto de Equilíbrio"])
@@ -179,13 +200,7 @@ def main():
         st.header("👷 Gasto de Mão de Obra (Planejado x Real)")
                 
         # Identifica colunas mensais de custo Real (ex.: 'jan/25', 'fev/25', etc.)
-        monthly_cols_info = []
-        for col in df_admin.columns:
-            if isinstance(col, str):
-                dt_parsed = parse_month_year(col)
-                if dt_parsed:
-                    monthly_cols_info.append((dt_parsed, col))
-        monthly_cols_info.sort(key=lambda x: x[0])
+        monthly_cols_info = _colunas_mensais(versao, tuple(df_admin.columns))
         
         min_previsao = df_admin['Previsao_dt'].min()
         max_previsao = df_admin['Previsao_dt'].max()
@@ -208,22 +223,31 @@ def main():
             else:
                 all_months = pd.date_range(start=global_min, end=global_max, freq='MS')
                 
-                # Planejado (Acumulado)
-                planejado_vals = []
-                for m in all_months:
-                    val = df_admin.loc[df_admin['Previsao_dt'] <= m, 'Previsão Mão de Obra'].fillna(0).sum()
-                    planejado_vals.append(val)
+                # Planejado (Acumulado): soma por mês de início (primeiro dia de mês
+                # >= Previsão Data), acumulada e levada para cada mês de all_months
+                previsao = df_admin['Previsao_dt'].to_numpy(dtype='datetime64[ns]')
+                mes_inicio = previsao.astype('datetime64[M]')
+                mes_chave = np.where(mes_inicio == previsao, mes_inicio, mes_inicio + 1).astype('datetime64[ns]')
+                planejado_mes = (
+                    df_admin['Previsão Mão de Obra'].fillna(0)
+                    .groupby(mes_chave).sum()
+                    .sort_index()
+                    .cumsum()
+                )
+                planejado_vals = planejado_mes.reindex(all_months, method='ffill').fillna(0).to_numpy()
                 df_planejado = pd.DataFrame({'Month': all_months, 'Planejado': planejado_vals})
                 
-                # Real (Mensal, não cumulativo)
-                real_df_list = []
-                for dt_col, col_name in monthly_cols_info:
-                    col_sum = df_admin[col_name].fillna(0).sum()
-                    real_df_list.append({'Month': dt_col, 'Real': col_sum})
-                if len(real_df_list) == 0:
+                # Real (Mensal, não cumulativo): colunas mensais empilhadas e somadas por mês
+                if len(monthly_cols_info) == 0:
                     df_real = pd.DataFrame({'Month': all_months, 'Real': [0]*len(all_months)}).set_index('Month')
                 else:
-                    df_real = pd.DataFrame(real_df_list).set_index('Month')
+                    col_para_mes = {col_name: dt_col for dt_col, col_name in monthly_cols_info}
+                    real_longo = df_admin[list(col_para_mes)].melt(var_name='Coluna', value_name='Real')
+                    df_real = (
+                        real_longo['Real'].fillna(0)
+                        .groupby(real_longo['Coluna'].map(col_para_mes).rename('Month')).sum()
+                        .to_frame()
+                    )
                     df_real = df_real.reindex(all_months, fill_value=0)
                 
                 df_real.reset_index(inplace=True)
@@ -384,19 +408,11 @@ def main():
             .style.format(format_dict)
         )
 
-        # ─── botão de download .xlsx ───
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            st.session_state["maintenance_data"].to_excel(
-                writer,
-                index=False,
-                sheet_name="Planejamento"
-            )
-            
-        data = output.getvalue()
+        # ─── botão de download .xlsx (montado só no clique) ───
+        maintenance_data = st.session_state["maintenance_data"]
         st.download_button(
             label="📥 Baixar Planilha (.xlsx)",
-            data=data,
+            data=lambda: _planilha_manutencao(maintenance_data),
             file_name="Tabela_Ajustada_Planejamento.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
@@ -458,24 +474,14 @@ def main():
             selected_status = status_options
         
         df_filtered = df_departamento[df_departamento["Status"].isin(selected_status)]
-        maintenance_list = []
-        for idx, row in df_filtered.iterrows():
-            empreendimento = row['Empreendimento']
-            planejado_val = row['Custo de Construção'] * 0.015
-            real_val = 0
-            for serv in df_grd["Cód. Alternativo Serviço"].dropna().unique():
-                serv_clean = serv.strip().upper()
-                if serv_clean == "ADM":
-                    continue
-                if serv_clean in empreendimento.upper():
-                    mask = df_grd["Cód. Alternativo Serviço"].astype(str).apply(lambda x: serv_clean in x.strip().upper())
-                    real_val += df_grd.loc[mask, "Valor Conv."].sum()
-            maintenance_list.append({
-                'Empreendimento': empreendimento,
-                'Despesa Planejada': planejado_val,
-                'Despesa Real': real_val
-            })
-        maintenance_df = pd.DataFrame(maintenance_list)
+        # Despesa real: tabela código → empreendimento (cache por versão) + um único groupby
+        mapa_codigos = _mapa_codigos(versao, df_departamento["Empreendimento"], df_grd["Cód. Alternativo Serviço"])
+        despesa_real = despesa_real_por_empreendimento(df_grd, mapa_codigos)
+        maintenance_df = pd.DataFrame({
+            'Empreendimento': df_filtered['Empreendimento'],
+            'Despesa Planejada': df_filtered['Custo de Construção'] * 0.015,
+            'Despesa Real': df_filtered['Empreendimento'].map(despesa_real).fillna(0)
+        }).reset_index(drop=True)
         
         fig4 = go.Figure(data=[
             go.Bar(
@@ -516,71 +522,67 @@ def main():
         df_grd["Data Documento"] = pd.to_datetime(df_grd["Data Documento"], errors='coerce')
         month_dict = {1:"Janeiro", 2:"Fevereiro", 3:"Março", 4:"Abril", 5:"Maio", 6:"Junho",
                       7:"Julho", 8:"Agosto", 9:"Setembro", 10:"Outubro", 11:"Novembro", 12:"Dezembro"}
-        unique_month_numbers = sorted(df_grd["Data Documento"].dt.month.dropna().unique())
-        month_options = [month_dict[m] for m in unique_month_numbers]
+        catalogo_grd = _catalogo_grd(versao, df_grd)
+        month_options = [month_dict[m] for m in opcoes(catalogo_grd, "Mês")]
         
         col1, col2, col3 = st.columns(3)
         with col1:
             filtro_cod_alt = st.multiselect("Nome do Empreendimento", 
-                                            options=sorted(df_grd["Cód. Alternativo Serviço"].dropna().unique()), default=[])
+                                            options=opcoes(catalogo_grd, "Cód. Alternativo Serviço"), default=[])
         with col2:
             filtro_data_mes = st.multiselect("Período (Mês)", options=month_options, default=[])
         with col3:
             filtro_data_ano = st.multiselect("Período (Ano)", 
-                                            options=sorted(df_grd["Data Documento"].dt.year.dropna().unique()), default=[])
+                                            options=opcoes(catalogo_grd, "Ano"), default=[])
         
         col4, col5 = st.columns(2)
         with col4:
-            filtro_desc_projeto = st.multiselect("Projeto (Mega)", options=df_grd["Descrição Projeto"].unique(), default=[])
+            filtro_desc_projeto = st.multiselect("Projeto (Mega)", options=opcoes(catalogo_grd, "Descrição Projeto"), default=[])
         with col5:
-            filtro_desc_grupo = st.multiselect("Grupo de Orçamento", options=df_grd["Descrição Grupo"].unique(), default=[])
+            filtro_desc_grupo = st.multiselect("Grupo de Orçamento", options=opcoes(catalogo_grd, "Descrição Grupo"), default=[])
         
         col6, col7 = st.columns(2)
         with col6:
-            filtro_desc_servico = st.multiselect("Tipo de Contratação", options=df_grd["Derscrição Serviço"].unique(), default=[])
+            filtro_desc_servico = st.multiselect("Tipo de Contratação", options=opcoes(catalogo_grd, "Derscrição Serviço"), default=[])
         with col7:
-            filtro_desc_item = st.multiselect("Descrição do Item", options=df_grd["Descrição Item"].unique(), default=[])
-        
-        df_grd_interativo = df_grd.copy()
-        if filtro_cod_alt:
-            df_grd_interativo = df_grd_interativo[df_grd_interativo["Cód. Alternativo Serviço"].isin(filtro_cod_alt)]
-        if filtro_data_mes:
-            selected_months = [k for k, v in month_dict.items() if v in filtro_data_mes]
-            df_grd_interativo = df_grd_interativo[df_grd_interativo["Data Documento"].dt.month.isin(selected_months)]
-        if filtro_data_ano:
-            df_grd_interativo = df_grd_interativo[df_grd_interativo["Data Documento"].dt.year.isin(filtro_data_ano)]
-        if filtro_desc_projeto:
-            df_grd_interativo = df_grd_interativo[df_grd_interativo["Descrição Projeto"].isin(filtro_desc_projeto)]
-        if filtro_desc_grupo:
-            df_grd_interativo = df_grd_interativo[df_grd_interativo["Descrição Grupo"].isin(filtro_desc_grupo)]
-        if filtro_desc_servico:
-            df_grd_interativo = df_grd_interativo[df_grd_interativo["Derscrição Serviço"].isin(filtro_desc_servico)]
-        if filtro_desc_item:
-            df_grd_interativo = df_grd_interativo[df_grd_interativo["Descrição Item"].isin(filtro_desc_item)]
-        
-        df_grd_interativo = df_grd_interativo.rename(columns={
-            "Documento": "NF",
-            "Cód. Alternativo Serviço": "Cód Alternativo"
-        })
-        cols_exibir = ["Cód Alternativo", "Data Documento", "NF", "Descrição Projeto", 
-                    "Descrição Grupo", "Descrição Item", "Derscrição Serviço", "Valor Conv."]
-        df_grd_interativo = df_grd_interativo[cols_exibir]
+            filtro_desc_item = st.multiselect("Descrição do Item", options=opcoes(catalogo_grd, "Descrição Item"), default=[])
+        
+        selecoes_grd = {
+            "Cód. Alternativo Serviço": filtro_cod_alt,
+            "Mês": [k for k, v in month_dict.items() if v in filtro_data_mes],
+            "Ano": filtro_data_ano,
+            "Descrição Projeto": filtro_desc_projeto,
+            "Descrição Grupo": filtro_desc_grupo,
+            "Derscrição Serviço": filtro_desc_servico,
+            "Descrição Item": filtro_desc_item,
+        }
+        # Total e agregações saem do recorte do cubo; o filtro de item (fora do cubo) pede um cubo das linhas filtradas
+        if cubo_atende(selecoes_grd):
+            cubo_grd = fatiar(_cubo_grd(versao, df_grd), selecoes_grd)
+        else:
+            cubo_grd = montar_cubo_grd(df_grd[mascara_filtros(catalogo_grd, selecoes_grd)])
         
-        total_valor_conv = df_grd_interativo["Valor Conv."].sum()
+        total_valor_conv = cubo_grd.sum()
         st.markdown(f"**Total Gasto com PÓS OBRA: R${total_valor_conv:,.2f}**")
         
-        st.dataframe(df_grd_interativo, use_container_width=True)
-        
-        if not df_grd_interativo.empty:
-            # agrupa por Mês/Ano
-            df_grd_interativo['Mes_Ano'] = df_grd_interativo['Data Documento'].dt.to_period('M').dt.to_timestamp()
-            df_mes = (
-                df_grd_interativo
-                .groupby('Mes_Ano')['Valor Conv.']
-                .sum()
-                .reset_index()
-                .sort_values('Mes_Ano')
-            )
+        # A listagem só é filtrada quando pedida
+        if st.checkbox("Exibir lançamentos", key="exibir_lancamentos_grd"):
+            mascara_grd = mascara_filtros(catalogo_grd, selecoes_grd)
+            df_grd_interativo = df_grd if mascara_grd is None else df_grd[mascara_grd]
+            cols_exibir = ["Cód. Alternativo Serviço", "Data Documento", "Documento", "Descrição Projeto", 
+                        "Descrição Grupo", "Descrição Item", "Derscrição Serviço", "Valor Conv."]
+            df_grd_interativo = df_grd_interativo[cols_exibir].rename(columns={
+                "Documento": "NF",
+                "Cód. Alternativo Serviço": "Cód Alternativo"
+            })
+            st.dataframe(df_grd_interativo, use_container_width=True)
+        
+        # agrupa por Mês/Ano
+        valor_mes = valor_por(cubo_grd, COL_MES)
+        df_mes = pd.DataFrame({
+            'Mes_Ano': valor_mes.index.to_timestamp(),
+            'Valor Conv.': valor_mes.to_numpy()
+        })
         # formata rótulos Mês/Ano
         df_mes['Mes_Ano_str'] = df_mes['Mes_Ano'].dt.strftime('%b/%y')
 
@@ -602,8 +604,8 @@ def main():
 
         st.markdown('-----')
         st.header("📊 Gastos por Grupo de Orçamento")
-        if not df_grd_interativo.empty:
-            df_grouped = df_grd_interativo.groupby("Descrição Grupo")["Valor Conv."].sum().reset_index()
+        if not cubo_grd.empty:
+            df_grouped = valor_por(cubo_grd, "Descrição Grupo").reset_index()
             df_grouped = df_grouped.sort_values("Valor Conv.", ascending=False)
             top_n_filter = st.multiselect("TOP N", options=["Top 20", "Top 10", "Top 5"], default=[])
             if top_n_filter:
@@ -713,55 +715,14 @@ def main():
         st.markdown('-----')
         st.header("⏱️ Distribuição de Despesas por Período")
 
-        def get_enterprise_info(enterprise):
-            matches = df_departamento[
-                (df_departamento["Empreendimento"].str.upper().str.contains(enterprise.upper())) &
-                (df_departamento["Status"].isin(["Assistência Técnica", "Fora de Garantia"]))
-            ]
-            if not matches.empty:
-                row = matches.iloc[0]
-                return row["Data CVCO"], row["Status"]
-            else:
-                return None, None
-
-        df_grd["Data CVCO_Ref"] = df_grd["Cód. Alternativo Serviço"].apply(lambda x: get_enterprise_info(x)[0])
-        df_grd["Status_Depto"] = df_grd["Cód. Alternativo Serviço"].apply(lambda x: get_enterprise_info(x)[1])
-
-        def classify_period_doc(cvco_date, doc_date):
-            if pd.isnull(cvco_date) or pd.isnull(doc_date):
-                return "Sem Data"
-            cvco_dt = pd.to_datetime(cvco_date).to_pydatetime()
-            doc_dt = pd.to_datetime(doc_date).to_pydatetime()
-            delta = relativedelta(doc_dt, cvco_dt)
-            diff_months = delta.years * 12 + delta.months
-            if diff_months < 0:
-                return "Antes de CVCO"
-            if diff_months <= 3:
-                return "Despesa Pós Entrega"
-            elif diff_months <= 12:
-                return "Despesa 1° Ano"
-            elif diff_months <= 24:
-                return "Despesa 2° Ano"
-            elif diff_months <= 36:
-                return "Despesa 3° Ano"
-            elif diff_months <= 48:
-                return "Despesa 4° Ano"
-            elif diff_months <= 60:
-                return "Despesa 5° Ano"
-            else:
-                return "Despesa Após 5 Anos"
+        # Data CVCO e Status do empreendimento de cada lançamento: índice por código + um único merge
+        indice_cvco = _indice_cvco(versao, df_departamento, df_grd["Cód. Alternativo Serviço"])
+        df_grd = df_grd.merge(indice_cvco, left_on="Cód. Alternativo Serviço", right_index=True, how="left")
 
-        df_grd["Periodo Doc"] = df_grd.apply(lambda row: classify_period_doc(row["Data CVCO_Ref"], row["Data Documento"]), axis=1)
+        # Período do documento em relação à CVCO (meses completos, como o relativedelta)
+        df_grd["Periodo Doc"] = classificar_periodo(df_grd["Data CVCO_Ref"], df_grd["Data Documento"], PERIODOS_GRD)
 
-        period_options = [
-            "Despesa Pós Entrega",
-            "Despesa 1° Ano",
-            "Despesa 2° Ano",
-            "Despesa 3° Ano",
-            "Despesa 4° Ano",
-            "Despesa 5° Ano",
-            "Despesa Após 5 Anos"
-        ]
+        period_options = list(PERIODOS_GRD[2:])
 
         selected_periods = st.multiselect("Selecione os Períodos", options=period_options, default=[])
         selected_empreendimento_period = st.multiselect("Empreendimento (Filtro)",
@@ -779,7 +740,7 @@ def main():
         total_valor_conv_period = df_grd_filtered_period["Valor Conv."].sum()
         st.markdown(f"**Total Gasto por Período: R${total_valor_conv_period:,.2f}**")
 
-        df_period_sum = df_grd_filtered_period.groupby("Periodo Doc")["Valor Conv."].sum().reset_index()
+        df_period_sum = df_grd_filtered_period.groupby("Periodo Doc", observed=True)["Valor Conv."].sum().reset_index()
         df_period_sum["Periodo Doc"] = pd.Categorical(df_period_sum["Periodo Doc"], categories=period_options, ordered=True)
         df_period_sum = df_period_sum.sort_values("Periodo Doc")
         fig_period_doc = px.bar(
@@ -800,7 +761,7 @@ def main():
         st.markdown("#### Representatividade por Período")
         st.dataframe(df_period_sum[["Periodo Doc", "Percentual"]])
 
-        df_period_emp = df_grd_filtered_period.groupby(["Periodo Doc", "Cód. Alternativo Serviço"])["Valor Conv."].sum().reset_index()
+        df_period_emp = df_grd_filtered_period.groupby(["Periodo Doc", "Cód. Alternativo Serviço"], observed=True)["Valor Conv."].sum().reset_index()
         df_period_emp["Periodo Doc"] = pd.Categorical(df_period_emp["Periodo Doc"], categories=period_options, ordered=True)
         df_period_emp = df_period_emp.sort_values("Periodo Doc")
         fig_period_emp = px.bar(
@@ -935,55 +896,5 @@ def main():
                 )
                 st.plotly_chart(fig, use_container_width=True)
 
-# ================================
-# Funções auxiliares e load_data()
-# (Repetição intencional para garantir compatibilidade)
-# ================================
-def clean_columns(df):
-    df.columns = df.columns.astype(str).str.strip().str.replace(r'\s+', ' ', regex=True)
-    return df
-
-def converter_data(df, col_list):
-    for col in col_list:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], format='%d/%m/%Y', errors='coerce')
-    return df
-
-def parse_month_year(col):
-    months_map = {
-        'jan': 1, 'fev': 2, 'mar': 3, 'abr': 4, 'mai': 5, 'jun': 6,
-        'jul': 7, 'ago': 8, 'set': 9, 'out': 10, 'nov': 11, 'dez': 12
-    }
-    match = re.match(r"^([a-zA-Z]{3})/(\d{2})$", col.strip().lower())
-    if match:
-        mon_str = match.group(1)
-        year_str = match.group(2)
-        mes = months_map.get(mon_str, None)
-        ano = 2000 + int(year_str)
-        if mes:
-            return datetime(ano, mes, 1)
-    return None
-
-def load_data():
-    xls = pd.ExcelFile(resource_path("base2025.xlsx"))
-    df_departamento = pd.read_excel(xls, sheet_name="departamento")
-    df_engenharia  = pd.read_excel(xls, sheet_name="engenharia")
-    df_grd         = pd.read_excel(xls, sheet_name="grd_Listagem", skiprows=1)
-    df_admin       = pd.read_excel(xls, sheet_name="administrativo")
-    
-    df_departamento = clean_columns(df_departamento)
-    df_engenharia  = clean_columns(df_engenharia)
-    df_grd         = clean_columns(df_grd)
-    df_admin       = clean_columns(df_admin)
-    
-    df_departamento = converter_data(df_departamento, ["Data Entrega de obra", "Data CVCO"])
-    df_admin       = converter_data(df_admin, ["Previsão Data", "Admissão"])
-    df_grd         = converter_data(df_grd, ["Data Documento"])
-    
-    df_admin = df_admin.replace(r'^\s*$', np.nan, regex=True)
-    df_departamento = df_departamento.replace(r'^\s*$', np.nan, regex=True)
-    
-    return df_departamento, df_engenharia, df_grd, df_admin
-
 if __name__ == '__main__':
     main()
@@ -23,6 +23,9 @@ import plotly.express as px
 import random
 from datetime import date
 from PIL import Image
+from utils.base_dados import ler_aba, versao_arquivo
+from utils.garantia import garantia_sistemas
+from utils.confiabilidade import metricas_confiabilidade
 
 # =========================================
 # Funções de Cores e Classificação ABC
@@ -96,15 +99,16 @@ st.markdown("Página em Construção. Volte mais tarde! 🚧")
 # Carregamento dos Dados (Planilhas)
 # =========================================
 @st.cache_data
-def load_data():
-    xls = pd.ExcelFile(resource_path("base2025.xlsx"))
-    df_eng = pd.read_excel(xls, sheet_name="engenharia")
-    df_dep = pd.read_excel(xls, sheet_name="departamento")
+def load_data(versao):
+    """`versao` (mtime + hash da planilha) invalida o cache quando o arquivo muda."""
+    caminho = resource_path("base2025.xlsx")
+    df_eng = ler_aba(caminho, "engenharia")
+    df_dep = ler_aba(caminho, "departamento")
     for df_ in [df_eng, df_dep]:
         df_.columns = df_.columns.str.strip()
     return df_eng, df_dep
 
-df_eng, df_dep = load_data()
+df_eng, df_dep = load_data(versao_arquivo(resource_path("base2025.xlsx")))
 
 # =========================================
 # Conversão de Datas (engenharia)
@@ -165,21 +169,19 @@ total_solicitacoes = df_eng["N°"].count()
 # =========================================
 # Criação de Colunas Derivadas: Separação da "Garantia Solicitada"
 # =========================================
-def split_garantia(value):
+@st.cache_data
+def split_garantia(versao, _garantia):
     """
     Separa a coluna "Garantia Solicitada" em:
       - Grupo Construtivo: tudo que estiver antes do "-" (ou a frase inteira, se não houver "-")
       - Sistema Construtivo: tudo que estiver depois do "-", se existir.
+    Calculado uma vez por versão da planilha, como colunas categóricas.
     """
-    if pd.isna(value):
-        return pd.Series([np.nan, np.nan])
-    if "-" in value:
-        parts = value.split("-", 1)
-        return pd.Series([parts[0].strip(), parts[1].strip()])
-    else:
-        return pd.Series([value.strip(), ""])
+    return garantia_sistemas(_garantia)
 
-df_eng[["Grupo Construtivo", "Sistema Construtivo"]] = df_eng["Garantia Solicitada"].apply(split_garantia)
+df_eng[["Grupo Construtivo", "Sistema Construtivo"]] = split_garantia(
+    versao_arquivo(resource_path("base2025.xlsx")), df_eng["Garantia Solicitada"]
+)
 
 # =========================================
 # Interface de Filtros
@@ -244,30 +246,18 @@ st.dataframe(df_filtered)
 # =========================================
 # Cálculo das Métricas (MTBF, MTTR e Disponibilidade)
 # =========================================
-def compute_metrics(group):
-    """
-    Calcula as métricas para o grupo (ou sistema) considerando:
-      - T_disponível: diferença entre a última "Data de Abertura" e a menor "Data CVCO", convertida para horas.
-      - T_parada: soma, em horas, de (Encerramento - Data de Abertura) para cada ocorrência.
-      - MTBF: (T_disponível - T_parada) / número de ocorrências.
-      - MTTR: T_parada / número de ocorrências.
-      - Disponibilidade: MTBF/(MTBF+MTTR)*100%.
-    """
-    available_hours = (group["Data de Abertura"].max() - group["Data CVCO"].min()).total_seconds() / 3600
-    downtime_hours = group.apply(lambda row: (row["Encerramento"] - row["Data de Abertura"]).total_seconds() / 3600, axis=1).sum()
-    occurrences = group.shape[0]
-    mtbf = (available_hours - downtime_hours) / occurrences
-    mttr = downtime_hours / occurrences
-    dispon = (mtbf / (mtbf + mttr)) * 100 if (mtbf + mttr) > 0 else np.nan
-    return pd.Series({"MTBF": mtbf, "MTTR": mttr, "Disponibilidade": dispon})
+# MTBF: (T_disponível - T_parada) / ocorrências, com T_disponível entre a menor
+# "Data CVCO" e a última "Data de Abertura"; MTTR: T_parada / ocorrências;
+# Disponibilidade: MTBF/(MTBF+MTTR)*100% (ver utils/confiabilidade.py)
 
 # Recalcular métricas para cada grupo e sistema
-metrics_group = df_filtered.groupby("Grupo Construtivo").apply(compute_metrics)
-metrics_system = df_filtered.groupby("Sistema Construtivo").apply(compute_metrics)
+metrics_group = metricas_confiabilidade(df_filtered, "Grupo Construtivo")
+metrics_system = metricas_confiabilidade(df_filtered, "Sistema Construtivo")
 
 # Para curvas ABC, contagens de ocorrências
-contagem_group = df_filtered["Grupo Construtivo"].value_counts()
-contagem_system = df_filtered["Sistema Construtivo"].value_counts()
+# (colunas categóricas: descarta as categorias sem ocorrência após os filtros)
+contagem_group = df_filtered["Grupo Construtivo"].value_counts().loc[lambda s: s > 0]
+contagem_system = df_filtered["Sistema Construtivo"].value_counts().loc[lambda s: s > 0]
 
 def add_border(fig):
     for trace in fig.data:
@@ -24,6 +24,13 @@ import plotly.graph_objects as go
 from datetime import datetime, date
 from PIL import Image
 from io import BytesIO
+from utils.base_dados import ler_aba, versao_arquivo
+from utils.garantia import garantia_assistencia, unidades_em_garantia, PRAZO_GARANTIA_MESES
+from utils.confiabilidade import metricas_garantia
+from utils.filtros import catalogo_filtros, opcoes, mascara_filtros
+from utils.previsao import ajustar, prever
+from utils.cubo import fatiar
+from utils.cubo_chamados import montar_cubo, atende, chamados_por_mes, chuva_mensal, correlacao_chuva
 
 # =============================================================================
 # Função para normalizar os nomes das colunas (remove espaços extras)
@@ -68,15 +75,16 @@ def process_calendario_de_chuvas(df):
 # Função de carregamento e pré-processamento dos dados
 # =============================================================================
 @st.cache_data
-def load_and_preprocess_data(filepath):
+def load_and_preprocess_data(filepath, versao):
+    # `versao` (mtime + hash da planilha) invalida o cache quando o arquivo muda
     # Aba "engenharia"
-    df_eng = pd.read_excel(resource_path(filepath), sheet_name="engenharia")
+    df_eng = ler_aba(resource_path(filepath), "engenharia")
     df_eng = normalize_columns(df_eng)
     df_eng["Data de Abertura"] = pd.to_datetime(df_eng["Data de Abertura"], format="%d/%m/%Y", errors="coerce")
     df_eng["Encerramento"] = pd.to_datetime(df_eng["Encerramento"], format="%d/%m/%Y", errors="coerce")
     
     # Aba "departamento"
-    df_dep = pd.read_excel(resource_path(filepath), sheet_name="departamento")
+    df_dep = ler_aba(resource_path(filepath), "departamento")
     df_dep = normalize_columns(df_dep)
     if "Data CVCO" in df_dep.columns:
         df_dep["Data CVCO"] = pd.to_datetime(df_dep["Data CVCO"], format="%d/%m/%Y", errors="coerce")
@@ -84,7 +92,7 @@ def load_and_preprocess_data(filepath):
         df_dep["Data Entrega de Obra"] = pd.to_datetime(df_dep["Data Entrega de Obra"], format="%d/%m/%Y", errors="coerce")
     
     # Aba "calendariodechuvas"
-    df_chuva = pd.read_excel(resource_path(filepath), sheet_name="calendariodechuvas")
+    df_chuva = ler_aba(resource_path(filepath), "calendariodechuvas")
     df_chuva = normalize_columns(df_chuva)
     # Se estiver no formato wide (com a coluna "ANO"), processa para formato long:
     if "ANO" in df_chuva.columns:
@@ -121,24 +129,18 @@ st.markdown('Acompanhamento de Solicitações de Assistência Técnica')
 # Carregamento dos dados
 # =============================================================================
 file_path = resource_path("base2025.xlsx")
-df_eng, df_dep, df_chuva = load_and_preprocess_data(file_path)
+df_eng, df_dep, df_chuva = load_and_preprocess_data(file_path, versao_arquivo(file_path))
 
 # =============================================================================
 # Tratamento da coluna “Garantia Solicitada”
 # =============================================================================
-def tratamento_garantia(garantia):
-    if pd.isna(garantia):
-        return pd.Series([np.nan, np.nan])
-    # Substitui " - " por ": "
-    garantia = garantia.replace(" - ", ": ")
-    if ":" in garantia:
-        sistema, tipo = garantia.split(":", 1)
-        return pd.Series([sistema.strip(), tipo.strip()])
-    else:
-        return pd.Series([garantia.strip(), np.nan])
+@st.cache_data
+def tratamento_garantia(versao, _garantia):
+    # " - " vira ": " e o texto é dividido no ":" (colunas categóricas, uma vez por versão da planilha)
+    return garantia_assistencia(_garantia)
 
 # Cria as novas colunas "Sistema Construtivo" e "Tipo de Falha"
-df_eng[["Sistema Construtivo", "Tipo de Falha"]] = df_eng["Garantia Solicitada"].apply(tratamento_garantia)
+df_eng[["Sistema Construtivo", "Tipo de Falha"]] = tratamento_garantia(versao_arquivo(file_path), df_eng["Garantia Solicitada"])
 
 # =============================================================================
 # Cálculos de Tempo e Métricas (antes dos filtros)
@@ -152,6 +154,16 @@ df_eng["Dias em Aberto"] = np.where(
 )
 total_solicitacoes = df_eng["N°"].count()
 
+# Faixa de "Dias em Aberto" de cada solicitação: [0, 15], (15, 30], (30, 45], (45, 60] e > 60
+FAIXAS_DIAS = ["0-15", "15-30", "30-45", "45-60", ">60"]
+
+@st.cache_data
+def faixas_dias_em_aberto(versao, hoje, _dias):
+    # Uma vez por versão da planilha e por dia (os chamados abertos envelhecem com a data de hoje)
+    return pd.cut(_dias, bins=[0, 15, 30, 45, 60, np.inf], labels=FAIXAS_DIAS, include_lowest=True)
+
+df_eng["Faixa Dias em Aberto"] = faixas_dias_em_aberto(versao_arquivo(file_path), hoje, df_eng["Dias em Aberto"])
+
 # --- Alteração realizada: calcular o MTTC utilizando TODOS os registros,
 # ou seja, se "Encerramento" for vazio, utiliza a data de hoje.
 mttc = df_eng["Dias em Aberto"].mean()
@@ -192,116 +204,102 @@ df_eng = df_eng.merge(
     suffixes=("", "_dep")
 )
 
-def compute_mtbf(group):
-    if group["Data CVCO"].isnull().all():
-        return np.nan
-    max_data_abertura = group["Data de Abertura"].max()
-    min_data_cvco = group["Data CVCO"].min()
-    op_hours = (max_data_abertura - min_data_cvco).total_seconds() / 3600
-    return op_hours / group.shape[0]
+@st.cache_data
+def metricas_por_garantia(versao, _df):
+    # MTBF, MTTR e Disponibilidade por Garantia Solicitada, uma vez por versão da planilha
+    return metricas_garantia(_df, "Garantia Solicitada")
 
-mtbf_series = df_eng.groupby("Garantia Solicitada").apply(compute_mtbf)
+metricas = metricas_por_garantia(versao_arquivo(file_path), df_eng)
+mtbf_series = metricas["MTBF"]
+mttr_series = metricas["MTTR"]
+disponibilidade_series = metricas["Disponibilidade"]
 
-def compute_mttr(group):
-    closed = group[group["Encerramento"].notna()]
-    if closed.empty:
-        return np.nan
-    total_hours = closed["Tempo de Encerramento"].sum() * 24
-    return total_hours / closed.shape[0]
+# =============================================================================
+# Catálogo dos filtros: colunas categóricas e opções, uma vez por versão da planilha
+# =============================================================================
+COLUNAS_FILTRO = ["Ano", "Mês", "N°", "Responsável", "FCR", "Empreendimento", "Unidade",
+                  "Bloco", "Status", "Garantia Solicitada", "Sistema Construtivo", "Tipo de Falha"]
+
+@st.cache_data
+def catalogo(versao, _df):
+    abertura = _df["Data de Abertura"].dt
+    colunas = _df.assign(Ano=abertura.year.astype("Int64"), **{"Mês": abertura.month.astype("Int64")})
+    return catalogo_filtros(colunas, COLUNAS_FILTRO, ordenadas=["Ano"])
 
-mttr_series = df_eng.groupby("Garantia Solicitada").apply(compute_mttr)
-disponibilidade_series = (mtbf_series / (mtbf_series + mttr_series)) * 100
+catalogo_eng = catalogo(versao_arquivo(file_path), df_eng)
 
 # =============================================================================
 # Painel Administrativo – Filtros (integrados ao painel, default vazio)
 # =============================================================================
+selecoes = {}
 with st.expander("Filtros", expanded=True):
     # Primeira linha: 5 colunas
     col_ano, col_mes, col_chamado, col_resp, col_fcr = st.columns(5)
-    anos = sorted(df_eng["Data de Abertura"].dropna().dt.year.unique().tolist())
-    selected_anos = col_ano.multiselect("Filtro por Ano", options=anos, default=[])
+    selecoes["Ano"] = col_ano.multiselect("Filtro por Ano", options=opcoes(catalogo_eng, "Ano"), default=[])
     
     month_options = list(range(1, 13))
     month_names = {1: "Janeiro", 2: "Fevereiro", 3: "Março", 4: "Abril", 5: "Maio",
                    6: "Junho", 7: "Julho", 8: "Agosto", 9: "Setembro", 10: "Outubro",
                    11: "Novembro", 12: "Dezembro"}
-    selected_meses = col_mes.multiselect("Filtro por Mês", options=month_options, default=[], 
-                                         format_func=lambda x: month_names[x])
+    selecoes["Mês"] = col_mes.multiselect("Filtro por Mês", options=month_options, default=[], 
+                                          format_func=lambda x: month_names[x])
     
-    chamados = df_eng["N°"].dropna().unique().tolist()
-    selected_chamados = col_chamado.multiselect("N° do Chamado", options=chamados, default=[])
+    selecoes["N°"] = col_chamado.multiselect("N° do Chamado", options=opcoes(catalogo_eng, "N°"), default=[])
     
-    responsaveis = df_eng["Responsável"].dropna().unique().tolist()
-    selected_responsaveis = col_resp.multiselect("Responsável", options=responsaveis, default=[])
+    selecoes["Responsável"] = col_resp.multiselect("Responsável", options=opcoes(catalogo_eng, "Responsável"), default=[])
     
-    if "FCR" in df_eng.columns:
-        fcr_values = df_eng["FCR"].dropna().unique().tolist()
-        selected_fcr = col_fcr.multiselect("FCR", options=fcr_values, default=[])
-    else:
-        selected_fcr = []
+    if "FCR" in catalogo_eng:
+        selecoes["FCR"] = col_fcr.multiselect("FCR", options=opcoes(catalogo_eng, "FCR"), default=[])
     
     # Segunda linha: 4 colunas
     col_empre, col_unidade, col_bloco, col_status = st.columns(4)
-    empreendimentos = df_eng["Empreendimento"].dropna().unique().tolist()
-    selected_empre = col_empre.multiselect("Empreendimento", options=empreendimentos, default=[])
+    selecoes["Empreendimento"] = col_empre.multiselect("Empreendimento", options=opcoes(catalogo_eng, "Empreendimento"), default=[])
     
-    unidades = df_eng["Unidade"].dropna().unique().tolist()
-    selected_unidade = col_unidade.multiselect("Unidade", options=unidades, default=[])
+    selecoes["Unidade"] = col_unidade.multiselect("Unidade", options=opcoes(catalogo_eng, "Unidade"), default=[])
     
-    blocos = df_eng["Bloco"].dropna().unique().tolist()
-    selected_bloco = col_bloco.multiselect("Bloco", options=blocos, default=[])
+    selecoes["Bloco"] = col_bloco.multiselect("Bloco", options=opcoes(catalogo_eng, "Bloco"), default=[])
     
-    statuses = df_eng["Status"].dropna().unique().tolist()
-    selected_status = col_status.multiselect("Status", options=statuses, default=[])
+    selecoes["Status"] = col_status.multiselect("Status", options=opcoes(catalogo_eng, "Status"), default=[])
     
     # Terceira linha: 3 colunas
     col_garantia, col_sistema, col_tipo = st.columns(3)
-    garantias = df_eng["Garantia Solicitada"].dropna().unique().tolist()
-    selected_garantia = col_garantia.multiselect("Garantia Solicitada", options=garantias, default=[])
+    selecoes["Garantia Solicitada"] = col_garantia.multiselect("Garantia Solicitada", options=opcoes(catalogo_eng, "Garantia Solicitada"), default=[])
     
-    sistemas = df_eng["Sistema Construtivo"].dropna().unique().tolist()
-    selected_sistema = col_sistema.multiselect("Sistema Construtivo", options=sistemas, default=[])
+    selecoes["Sistema Construtivo"] = col_sistema.multiselect("Sistema Construtivo", options=opcoes(catalogo_eng, "Sistema Construtivo"), default=[])
     
-    tipos = df_eng["Tipo de Falha"].dropna().unique().tolist()
-    selected_tipo = col_tipo.multiselect("Tipo de Falha", options=tipos, default=[])
+    selecoes["Tipo de Falha"] = col_tipo.multiselect("Tipo de Falha", options=opcoes(catalogo_eng, "Tipo de Falha"), default=[])
+
+# =============================================================================
+# Aplicação dos filtros (máscara única sobre os códigos do catálogo; sem filtros, a base inteira)
+# =============================================================================
+mascara = mascara_filtros(catalogo_eng, selecoes)
+df_filtered = df_eng if mascara is None else df_eng[mascara]
 
 # =============================================================================
-# Aplicação dos filtros (usando .isin para cada coluna)
+# Cubo mensal (mês x Empreendimento x Sistema Construtivo x Status), uma vez por versão
 # =============================================================================
-df_filtered = df_eng.copy()
-if selected_anos:
-    df_filtered = df_filtered[df_filtered["Data de Abertura"].dt.year.isin(selected_anos)]
-if selected_meses:
-    df_filtered = df_filtered[df_filtered["Data de Abertura"].dt.month.isin(selected_meses)]
-if selected_chamados:
-    df_filtered = df_filtered[df_filtered["N°"].astype(str).isin([str(x) for x in selected_chamados])]
-if selected_responsaveis:
-    df_filtered = df_filtered[df_filtered["Responsável"].isin(selected_responsaveis)]
-if selected_fcr:
-    df_filtered = df_filtered[df_filtered["FCR"].isin(selected_fcr)]
-if selected_empre:
-    df_filtered = df_filtered[df_filtered["Empreendimento"].isin(selected_empre)]
-if selected_unidade:
-    df_filtered = df_filtered[df_filtered["Unidade"].isin(selected_unidade)]
-if selected_bloco:
-    df_filtered = df_filtered[df_filtered["Bloco"].isin(selected_bloco)]
-if selected_status:
-    df_filtered = df_filtered[df_filtered["Status"].isin(selected_status)]
-if selected_garantia:
-    df_filtered = df_filtered[df_filtered["Garantia Solicitada"].isin(selected_garantia)]
-if selected_sistema:
-    df_filtered = df_filtered[df_filtered["Sistema Construtivo"].isin(selected_sistema)]
-if selected_tipo:
-    df_filtered = df_filtered[df_filtered["Tipo de Falha"].isin(selected_tipo)]
+@st.cache_data
+def cubo_chamados(versao, _df):
+    return montar_cubo(_df)
+
+@st.cache_data
+def chuva_por_mes(versao, _df_chuva):
+    return chuva_mensal(_df_chuva)
+
+# Filtros fora das dimensões do cubo (Responsável, Unidade...) pedem um cubo das linhas filtradas
+if atende(selecoes):
+    cubo_filtrado = fatiar(cubo_chamados(versao_arquivo(file_path), df_eng), selecoes)
+else:
+    cubo_filtrado = montar_cubo(df_filtered)
+chuva_serie = chuva_por_mes(versao_arquivo(file_path), df_chuva)
+chamados_mes = chamados_por_mes(cubo_filtrado)
+df_chart2 = pd.DataFrame({"AnoMes": chamados_mes.index.astype(str), "Count": chamados_mes.to_numpy()})
 
 # =============================================================================
 # Re-cálculo das Métricas (baseado nos dados filtrados)
 # =============================================================================
-metrica_1 = df_filtered[(df_filtered["Dias em Aberto"] >= 0) & (df_filtered["Dias em Aberto"] <= 15)].shape[0]
-metrica_2 = df_filtered[(df_filtered["Dias em Aberto"] > 15) & (df_filtered["Dias em Aberto"] <= 30)].shape[0]
-metrica_3 = df_filtered[(df_filtered["Dias em Aberto"] > 30) & (df_filtered["Dias em Aberto"] <= 45)].shape[0]
-metrica_4 = df_filtered[(df_filtered["Dias em Aberto"] > 45) & (df_filtered["Dias em Aberto"] <= 60)].shape[0]
-metrica_5 = df_filtered[df_filtered["Dias em Aberto"] > 60].shape[0]
+contagem_faixas = df_filtered["Faixa Dias em Aberto"].value_counts(sort=False)
+metrica_1, metrica_2, metrica_3, metrica_4, metrica_5 = (int(contagem_faixas[f]) for f in FAIXAS_DIAS)
 metrica_6 = df_filtered["N°"].count()
 
 st.markdown("---")
@@ -327,20 +325,22 @@ with st.container():
     show_m4 = col_cb4.checkbox("Exibir Solicitações 45-60")
     show_m5 = col_cb5.checkbox("Exibir Solicitações >60")
 
-if show_m1:
-    st.write("Dados Métrica 1 (0-15 dias)",
-             df_filtered[(df_filtered["Dias em Aberto"] >= 0) & (df_filtered["Dias em Aberto"] <= 15)])
-if show_m2:
-    st.write("Dados Métrica 2 (15-30 dias)",
-             df_filtered[(df_filtered["Dias em Aberto"] > 15) & (df_filtered["Dias em Aberto"] <= 30)])
-if show_m3:
-    st.write("Dados Métrica 3 (30-45 dias)",
-             df_filtered[(df_filtered["Dias em Aberto"] > 30) & (df_filtered["Dias em Aberto"] <= 45)])
-if show_m4:
-    st.write("Dados Métrica 4 (45-60 dias)",
-             df_filtered[(df_filtered["Dias em Aberto"] > 45) & (df_filtered["Dias em Aberto"] <= 60)])
-if show_m5:
-    st.write("Dados Métrica 5 (>60 dias)", df_filtered[df_filtered["Dias em Aberto"] > 60])
+LINHAS_POR_PAGINA = 200
+
+def exibir_paginado(titulo, df, chave):
+    """Tabela de detalhamento em páginas de LINHAS_POR_PAGINA linhas: só a página escolhida vai ao navegador."""
+    paginas = max(1, -(-len(df) // LINHAS_POR_PAGINA))
+    st.write(titulo, f"({len(df)} solicitações)")
+    pagina = 1
+    if paginas > 1:
+        pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, key=chave)
+    inicio = (pagina - 1) * LINHAS_POR_PAGINA
+    st.dataframe(df.iloc[inicio:inicio + LINHAS_POR_PAGINA])
+
+for i, (exibir, faixa) in enumerate(zip([show_m1, show_m2, show_m3, show_m4, show_m5], FAIXAS_DIAS), start=1):
+    if exibir:
+        detalhe = df_filtered[(df_filtered["Faixa Dias em Aberto"] == faixa).to_numpy()]
+        exibir_paginado(f"Dados Métrica {i} ({faixa} dias)", detalhe.drop(columns="Faixa Dias em Aberto"), f"pagina_metrica_{i}")
 
 st.markdown("---")
 
@@ -350,8 +350,6 @@ st.markdown("---")
 
 # 1 – Gráfico de Solicitações ao Longo do Tempo (Anos e Meses)
 st.markdown('### 🏗️Solicitações de Assistência Técnica')
-df_filtered["AnoMes"] = df_filtered["Data de Abertura"].dt.to_period("M").astype(str)
-df_chart2 = df_filtered.groupby("AnoMes").size().reset_index(name="Count")
 fig1 = px.bar(
     df_chart2,
     x="AnoMes",
@@ -378,28 +376,14 @@ fig1.update_layout(
 st.plotly_chart(fig1, use_container_width=True)
 
 # === Gráfico de Unidades em Garantia por Mês/Ano ===
-# 1) Prepara df apenas com Data Entrega e Nº Unidades
-df_war = df_dep_renamed[["Data Entrega de Obra", "N° Unidades"]].dropna()
-
-# 2) Calcula data de fim de garantia (+60 meses)
-df_war["FimGarantia"] = df_war["Data Entrega de Obra"] + pd.DateOffset(months=60)
+# 1) Cada obra conta do mês da entrega até a entrega + 60 meses (vetor de diferenças, ver utils/garantia.py)
+@st.cache_data
+def unidades_garantia(versao, _df_dep):
+    return unidades_em_garantia(_df_dep["Data Entrega de Obra"], _df_dep["N° Unidades"], PRAZO_GARANTIA_MESES)
 
-# 3) Gera para cada obra a lista de períodos (AnoMes) em garantia e explode
-df_war["AnoMes"] = df_war.apply(
-    lambda r: pd.period_range(r["Data Entrega de Obra"], r["FimGarantia"], freq="M"),
-    axis=1
-)
-df_war = df_war.explode("AnoMes")
-df_war["AnoMes"] = df_war["AnoMes"].astype(str)
-
-# 4) Agrupa somando unidades por AnoMes
-df_war_sum = (
-    df_war
-    .groupby("AnoMes", as_index=False)["N° Unidades"]
-    .sum()
-)
+df_war_sum = unidades_garantia(versao_arquivo(file_path), df_dep_renamed)
 
-# 5) Desenha o gráfico
+# 2) Desenha o gráfico
 fig_war = px.bar(
     df_war_sum,
     x="AnoMes",
@@ -484,14 +468,25 @@ st.markdown(
     f"{media_chamados_unidade_ano:.2f}"
 )
 
-# — (6) Previsão de Chamados por Ano usando a métrica corrigida
-df_forecast = df_max_year.copy()
-df_forecast["Previsão de Chamados"] = (
-    df_forecast["N° Unidades"] * media_chamados_unidade_ano
-).round(2)
+# — (6) Previsão de Chamados por Ano: taxa por ano de garantia x fator da obra x fator de chuva,
+# ajustada no histórico completo uma vez por versão da planilha (ver utils/previsao.py)
+@st.cache_data
+def previsao_chamados(versao, _df_eng, _df_dep, _df_chuva):
+    return prever(ajustar(_df_eng, _df_dep, _df_chuva))
+
+df_previsao = previsao_chamados(versao_arquivo(file_path), df_eng, df_dep_renamed, df_chuva)
+if selecoes.get("Empreendimento"):
+    df_previsao = df_previsao[df_previsao["Empreendimento"].isin(selecoes["Empreendimento"])]
+df_forecast = (
+    df_previsao
+    .groupby("Ano", as_index=False)[["Chamados Previstos", "Chamados Registrados"]]
+    .sum(min_count=1)
+    .rename(columns={"Chamados Previstos": "Previsão de Chamados"})
+    .round(2)
+)
 
 st.markdown("### 📅 Previsão de Chamados por Ano")
-st.table(df_forecast[["Ano", "Previsão de Chamados"]])
+st.table(df_forecast[["Ano", "Previsão de Chamados", "Chamados Registrados"]])
 
 st.markdown("---")
 
@@ -651,8 +646,7 @@ with st.container():
 
 # 6 – Gráfico Combinado: Solicitações + Acumulado de Chuva
 st.markdown("### 🧮 Solicitações ❌ Acumulado de Chuva ⛈️")
-df_bar = df_filtered.groupby("AnoMes").size().reset_index(name="Count")
-df_combo = pd.merge(df_bar, df_chuva, on="AnoMes", how="left")
+df_combo = df_chart2.assign(Chuva=chuva_serie.reindex(chamados_mes.index).to_numpy())
 
 fig6 = px.bar(
     df_combo,
@@ -694,6 +688,27 @@ fig6.update_layout(
 )
 
 st.plotly_chart(fig6, use_container_width=True)
+
+# Correlação entre os chamados do mês e a chuva do mesmo mês e de até 3 meses antes
+with st.expander("Correlação Chuva x Solicitações por Sistema Construtivo (defasagem de 0 a 3 meses)"):
+    df_correlacao = correlacao_chuva(cubo_filtrado, chuva_serie).head(16)  # Total + 15 sistemas com mais chamados
+    if df_correlacao.empty:
+        st.info("Sem solicitações para calcular a correlação.")
+    else:
+        valores = df_correlacao.drop(columns="Chamados")
+        valores.columns = ["Mesmo mês", "1 mês antes", "2 meses antes", "3 meses antes"][:valores.shape[1]]
+        valores.index = [f"{sistema} ({n})" for sistema, n in df_correlacao["Chamados"].items()]
+        fig_corr = px.imshow(
+            valores,
+            text_auto=".2f",
+            color_continuous_scale="RdBu_r",
+            zmin=-1,
+            zmax=1,
+            aspect="auto",
+            labels={"x": "Chuva", "y": "", "color": "Correlação"},
+        )
+        fig_corr.update_layout(margin=dict(l=10, r=10, t=30, b=30))
+        st.plotly_chart(fig_corr, use_container_width=True)
 st.markdown("---")
 
 # 7 – MTTC – Tempo Médio de Conclusão (Por Obra)
@@ -19,6 +19,7 @@ def resource_path(relative_path):
 import streamlit as st
 import pandas as pd
 from PIL import Image
+from utils.base_dados import ler_aba
 
 
 # Configurando Página
@@ -65,7 +66,7 @@ def custom_progress_bar(value, height=20, bar_color="orange"):
     return bar_html
 
 # Lê o arquivo Excel "base2025.xlsx", aba "nps"
-df = pd.read_excel(resource_path("base2025.xlsx"), sheet_name="NPS")
+df = ler_aba(resource_path("base2025.xlsx"), "NPS")
 
 # Converter a coluna "Nota" para float (tratando valores inválidos)
 df["Nota"] = pd.to_numeric(df["Nota"], errors="coerce")
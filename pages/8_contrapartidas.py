@@ -17,13 +17,16 @@ def resource_path(relative_path):
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import datetime
-import base64
 import plotly.express as px
 import plotly.graph_objects as go
 import os
-from io import BytesIO
 from PIL import Image
+from utils import contrapartidas
+from utils import desembolso, versoes
+from utils.exportacao import planilha_excel
+from utils.gantt import figura_gantt
 
 # ------------------------------------------------------------------------------
 # Configuração da página
@@ -69,91 +72,84 @@ def formatar_data(data: datetime.date) -> str:
         return ""
     return data.strftime("%d/%m/%Y")
 
-def gerar_excel_download(df: pd.DataFrame, nome_arquivo: str = "dados_exportados.xlsx") -> str:
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-        df[COLUNAS].to_excel(writer, index=False, sheet_name='Dados Base')
-        df_fin = df.copy()
-        df_fin["Saldo"] = df_fin["Orçamento"] - df_fin["Gasto Real"]
-        df_fin["% Gasto"] = df_fin.apply(lambda x: round((x["Gasto Real"] / x["Orçamento"]) * 100, 2)
-                                         if x["Orçamento"] > 0 else 0, axis=1)
-        df_fin_exibir = df_fin[["codigo_sequencia", "Projeto", "Orçamento", "Gasto Real", "Saldo", "% Gasto"]]
-        df_fin_exibir.to_excel(writer, index=False, sheet_name='Resumo Financeiro')
-        final_df_list = []
-        for projeto, df_disp in st.session_state.desembolso.items():
-            projeto_df = df[df["Projeto"] == projeto]
-            if projeto_df.empty:
-                continue
-            orcamento = projeto_df.iloc[0]["Orçamento"]
-            perc_list = df_disp["Percentual (%)"].tolist()
-            soma = sum(perc_list)
-            if soma != 100:
-                perc_normalizado = [round((p/soma)*100, 1) for p in perc_list]
-            else:
-                perc_normalizado = perc_list
-            parcelas = [round((p/100)*orcamento, 2) for p in perc_normalizado]
-            df_final = pd.DataFrame({
-                "Mês": df_disp["Mês"],
-                "Percentual (%)": perc_normalizado,
-                "Parcela (R$)": parcelas
-            })
-            df_final["Projeto"] = projeto
-            final_df_list.append(df_final)
-        if final_df_list:
-            df_consol = pd.concat(final_df_list)
-            df_consol_group = df_consol.groupby("Mês").agg({"Parcela (R$)":"sum"}).reset_index()
-        else:
-            df_consol_group = pd.DataFrame()
-        df_consol_group.to_excel(writer, index=False, sheet_name='Desembolso Consolidado')
-        if not df_consol_group.empty and final_df_list:
-            df_break = df_consol.groupby(["Mês", "Projeto"])         ["Parcela (R$)"].sum().reset_index()
-            total_by_month = df_break.groupby("Mês")["Parcela (R$)"].transform('sum')
-            df_break["Percentual (%)"] = (df_break["Parcela (R$)"] / total_by_month * 100).round(1)
-        else:
-            df_break = pd.DataFrame()
-        df_break.to_excel(writer, index=False, sheet_name='Resumo Mensal')
-    b64 = base64.b64encode(buffer.getvalue()).decode()
-    return f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="{nome_arquivo}">Baixar {nome_arquivo}</a>'
-
-def load_data() -> pd.DataFrame:
-    if os.path.exists("contrapartidas.csv"):
-        df = pd.read_csv("contrapartidas.csv", sep=";")
-        for col in COLUNAS:
-            if col not in df.columns:
-                df[col] = ""
-        date_cols = [
-            "Data Início Contrapartida (Previsto)", "Data Término Contrapartida (Previsto)"
-        ]
-        for col in date_cols:
-            if col in df.columns and df[col].dtype != 'datetime64[ns]':
-                df[col] = pd.to_datetime(df[col], errors='coerce').dt.date
-        return df
-    else:
-        return pd.DataFrame(columns=COLUNAS)
+PREFIXO_DESEMBOLSO = "desembolso_"
+
+@st.cache_data(max_entries=16)
+def calcular_desembolso(etapas: pd.DataFrame, distribuicoes: dict, projetos=None):
+    """
+    Parcelas por etapa, desembolso consolidado e resumo mensal por projeto,
+    calculados uma vez para cada combinação de etapas/distribuições/projetos.
+    """
+    por_etapa = desembolso.desembolso_por_etapa(etapas, distribuicoes)
+    consolidado, mensal = desembolso.consolidar(por_etapa, projetos)
+    return por_etapa, consolidado, mensal
+
+def desembolso_atual(df: pd.DataFrame, projetos=None, distribuicoes=None):
+    """
+    Desembolso das etapas de `df` com as distribuições `distribuicoes`
+    ({"desembolso_<codigo>": DataFrame}); por padrão, as editadas na sessão.
+    """
+    if distribuicoes is None:
+        distribuicoes = st.session_state.desembolso
+    etapas = df.loc[df["id_pai"].isnull(), ["codigo_sequencia", "Projeto", "Orçamento"]]
+    distribuicoes = {
+        chave[len(PREFIXO_DESEMBOLSO):]: dist
+        for chave, dist in distribuicoes.items()
+    }
+    return calcular_desembolso(etapas, distribuicoes, projetos)
+
+@st.cache_data(max_entries=4)
+def gerar_excel(df: pd.DataFrame, distribuicoes: dict) -> bytes:
+    """
+    Planilha (Dados Base, Resumo Financeiro, Desembolso Consolidado e Resumo Mensal) em bytes,
+    gerada uma vez por versão dos dados/distribuições.
+    """
+    df_fin = df.copy()
+    df_fin["Saldo"] = df_fin["Orçamento"] - df_fin["Gasto Real"]
+    df_fin["% Gasto"] = np.where(df_fin["Orçamento"] > 0, (df_fin["Gasto Real"] / df_fin["Orçamento"] * 100).round(2), 0)
+    df_fin_exibir = df_fin[["codigo_sequencia", "Projeto", "Orçamento", "Gasto Real", "Saldo", "% Gasto"]]
+    _, df_consol_group, df_break = desembolso_atual(df, distribuicoes=distribuicoes)
+    return planilha_excel({
+        'Dados Base': df[COLUNAS],
+        'Resumo Financeiro': df_fin_exibir,
+        'Desembolso Consolidado': desembolso.formatar_meses(df_consol_group),
+        'Resumo Mensal': desembolso.formatar_meses(df_break),
+    })
+
+def gerar_excel_download(df: pd.DataFrame, nome_arquivo: str = "dados_exportados.xlsx"):
+    """
+    Botão de download da planilha de `df`. A planilha só é montada quando o
+    botão é clicado (e fica em cache para os mesmos dados).
+    """
+    distribuicoes = dict(st.session_state.desembolso)
+    st.download_button(
+        f"Baixar {nome_arquivo}", data=lambda: gerar_excel(df, distribuicoes), file_name=nome_arquivo,
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+def excel_versao(nome: str) -> bytes:
+    """Planilha de uma versão salva, gerada só quando o download é pedido."""
+    return gerar_excel(*versoes.carregar(nome))
 
-def persist_data():
-    st.session_state.df_principal.to_csv("contrapartidas.csv", index=False, sep=";")
+def load_data(df=None) -> pd.DataFrame:
+    """Contrapartidas do banco (ou `df`, já lido dele) com todas as COLUNAS."""
+    df = contrapartidas.carregar() if df is None else df
+    for col in COLUNAS:
+        if col not in df.columns:
+            df[col] = ""
+    return df
+
+def persist_data(idxs, antes):
+    """
+    Grava no banco só os campos das linhas `idxs` de df_principal que mudaram
+    em relação a `antes` (as mesmas linhas antes da edição).
+    """
+    contrapartidas.salvar_alteracoes(antes, st.session_state.df_principal.loc[idxs])
 
 def reorganizar_codigos():
-    df = st.session_state.df_principal.copy()
-    projects = df[df["id_pai"].isnull()].copy().sort_index()
-    new_codes = {}
-    seq = 1
-    for idx in projects.index:
-        new_code = str(seq)
-        new_codes[df.loc[idx, "Projeto"]] = new_code
-        df.loc[idx, "codigo_sequencia"] = new_code
-        seq += 1
-    subs = df[df["id_pai"].notnull()].copy().sort_index()
-    for projeto, code in new_codes.items():
-        subs_proj = df[(df["id_pai"].notnull()) & (df["Projeto"] == projeto)]
-        subs_proj = subs_proj.sort_values(by="codigo_sequencia")
-        seq_sub = 1
-        for idx in subs_proj.index:
-            df.loc[idx, "codigo_sequencia"] = f"{code}.{seq_sub}"
-            seq_sub += 1
-    st.session_state.df_principal = df.copy()
-    persist_data()
+    """Renumera os códigos sobre o estado atual do banco e recarrega df_principal com ele."""
+    df = load_data(contrapartidas.renumerar())
+    st.session_state.df_principal = df
     st.session_state.last_version = df.copy()
 
 if "df_principal" not in st.session_state:
@@ -164,8 +160,6 @@ if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 if "show_login" not in st.session_state:
     st.session_state.show_login = False
-if "versoes" not in st.session_state:
-    st.session_state.versoes = []
 if "last_version" not in st.session_state:
     st.session_state.last_version = st.session_state.df_principal.copy()
 if "edit_in_progress" not in st.session_state:
@@ -194,7 +188,6 @@ def sidebar_edicao():
                             st.session_state.editing_enabled = True
                             st.session_state.show_login = False
                             st.success("Modo de edição ativado!")
-                            persist_data()
                         else:
                             st.error("Usuário ou senha incorretos!")
         else:
@@ -210,13 +203,16 @@ def sidebar_edicao():
 def excluir_projeto(idx):
     df = st.session_state.df_principal
     projeto_val = df.loc[idx, "Projeto"]
-    df = df[(df["Projeto"] != projeto_val) | (df["id_pai"].notnull())]
+    removidos = (df["Projeto"] == projeto_val) & (df["id_pai"].isnull())
+    contrapartidas.excluir(df.loc[removidos, "id"])
+    df = df[~removidos]
     st.session_state.df_principal = df.reset_index(drop=True)
     reorganizar_codigos()
     st.success("Projeto excluído!")
 
 def excluir_subetapa(idx):
     df = st.session_state.df_principal
+    contrapartidas.excluir([df.loc[idx, "id"]])
     st.session_state.df_principal = df.drop(idx).reset_index(drop=True)
     reorganizar_codigos()
     st.success("Subetapa excluída!")
@@ -240,6 +236,7 @@ def adicionar_projeto_callback():
         "Modo de Medição": "Por % Execução",
         "Comentários": ""
     }
+    novo_projeto["id"] = contrapartidas.inserir(novo_projeto)
     st.session_state.df_principal = pd.concat([df, pd.DataFrame([novo_projeto])], ignore_index=True)
     reorganizar_codigos()
     st.success("Projeto adicionado!")
@@ -254,7 +251,7 @@ def adicionar_subetapa_callback(projeto_val):
     sub_count = len(df[df["Projeto"] == projeto_val]) - 1
     novo_codigo = f"{parent['codigo_sequencia']}.{sub_count+1}"
     nova_subetapa = {
-        "id_pai": projeto_val,
+        "id_pai": parent["id"],
         "codigo_sequencia": novo_codigo,
         "Status": "Não Iniciado",
         "Projeto": parent["Projeto"],
@@ -268,6 +265,7 @@ def adicionar_subetapa_callback(projeto_val):
         "Modo de Medição": "Por % Execução",
         "Comentários": ""
     }
+    nova_subetapa["id"] = contrapartidas.inserir(nova_subetapa)
     st.session_state.df_principal = pd.concat([df, pd.DataFrame([nova_subetapa])], ignore_index=True)
     reorganizar_codigos()
     st.success("Subetapa adicionada!")
@@ -355,7 +353,7 @@ def exibir_form_edicao_inline(idx):
                 df.at[idx, "Modo de Medição"] = modo_medicao
                 df.at[idx, "Comentários"] = novos_comentarios
                 st.session_state.df_principal = df.copy()
-                persist_data()
+                persist_data([idx], row.to_frame().T)
                 st.success("Alterações salvas!")
                 cancelar_edicao()
         with col2:
@@ -476,105 +474,15 @@ def exibir_gantt_fisico():
         df_version = df_version[df_version["Projeto"] == projeto_selecionado]
     filtro = st.selectbox("Filtrar Gantt", options=["Etapa e Subetapa", "Só Etapa", "Só Subetapa"])
     df_version = df_version.copy()
-    df_version["Tipo"] = df_version["id_pai"].apply(lambda x: "Subetapa" if pd.notnull(x) else "Etapa")
+    df_version["Tipo"] = np.where(df_version["id_pai"].notnull(), "Subetapa", "Etapa")
     if filtro == "Só Etapa":
         df_version = df_version[df_version["Tipo"] == "Etapa"]
     elif filtro == "Só Subetapa":
         df_version = df_version[df_version["Tipo"] == "Subetapa"]
-    gantt_data = []
-    for _, row in df_version.iterrows():
-        inicio = row.get("Data Início Contrapartida (Previsto)")
-        fim = row.get("Data Término Contrapartida (Previsto)")
-        if inicio and fim:
-            duration = (fim - inicio).days
-            gantt_data.append({
-                "Projeto": row.get("Projeto", ""),
-                "Codigo": row.get("codigo_sequencia", ""),
-                "TipoServico": row.get("Tipo de Serviço", ""),
-                "Tipo": row.get("Tipo", ""),
-                "Start": inicio,
-                "Finish": fim,
-                "Duration": duration,
-                "Execucao": row.get("% Execução", 0)
-            })
-    if not gantt_data:
+    fig = figura_gantt(df_version)
+    if fig is None:
         st.info("Não há datas definidas para exibir o Gantt.")
         return
-    df_gantt = pd.DataFrame(gantt_data)
-    def sort_key(codigo):
-        try:
-            return tuple(int(x) for x in str(codigo).split('.'))
-        except:
-            return (999,)
-    df_gantt["SortKey"] = df_gantt["Codigo"].apply(sort_key)
-    df_gantt = df_gantt.sort_values(by="SortKey")
-    reference_date = df_gantt["Start"].min()
-    df_gantt["Start_num"] = df_gantt["Start"].apply(lambda d: (d - reference_date).days)
-    color_palette = px.colors.qualitative.Plotly
-    unique_etapas = df_gantt[df_gantt["Tipo"]=="Etapa"]["Codigo"].unique()
-    etapa_colors = {codigo: color_palette[i % len(color_palette)] for i, codigo in enumerate(unique_etapas)}
-    def lighten_color(hex_color, amount=0.5):
-        hex_color = hex_color.lstrip('#')
-        lv = len(hex_color)
-        rgb = tuple(int(hex_color[i:i+lv//3], 16) for i in range(0, lv, lv//3))
-        new_rgb = tuple(int(c + (255-c)*amount) for c in rgb)
-        return '#%02x%02x%02x' % new_rgb
-    df_gantt.loc[df_gantt["Tipo"]=="Etapa", "Label"] = df_gantt[df_gantt["Tipo"]=="Etapa"].apply(
-        lambda r: f"Código: {r.get('codigo_sequencia','')} | {r['Projeto']} | {r['TipoServico']}", axis=1
-    )
-    df_gantt.loc[df_gantt["Tipo"]=="Subetapa", "Label"] = df_gantt[df_gantt["Tipo"]=="Subetapa"].apply(
-        lambda r: f"Código: {r.get('codigo_sequencia','')} | {r['Projeto']} | {r['TipoServico']}", axis=1
-    )
-    labels_order = df_gantt["Label"].unique().tolist()
-    fig = go.Figure()
-    df_etapa_plot = df_gantt[df_gantt["Tipo"]=="Etapa"]
-    for _, row in df_etapa_plot.iterrows():
-        fig.add_trace(go.Bar(
-            x=[row["Duration"]],
-            y=[row["Label"]],
-            base=[row["Start_num"]],
-            orientation="h",
-            marker_color=etapa_colors.get(row.get("codigo_sequencia",""), "#636efa"),
-            width=0.8,
-            text=f'{row["Execucao"]}%',
-            textposition="inside"
-        ))
-    df_sub_plot = df_gantt[df_gantt["Tipo"]=="Subetapa"]
-    for _, row in df_sub_plot.iterrows():
-        parent_codigo = str(row.get("Codigo", "")).split('.')[0]
-        parent_color = etapa_colors.get(parent_codigo, "#636efa")
-        sub_color = lighten_color(parent_color, amount=0.5)
-        fig.add_trace(go.Bar(
-            x=[row["Duration"]],
-            y=[row["Label"]],
-            base=[row["Start_num"]],
-            orientation="h",
-            marker_color=sub_color,
-            width=0.4,
-            text=f'{row["Execucao"]}%',
-            textposition="inside"
-        ))
-    start_date = df_gantt["Start"].min()
-    end_date = df_gantt["Finish"].max()
-    monthly_ticks = []
-    current = datetime.date(start_date.year, start_date.month, 1)
-    while current <= end_date:
-        monthly_ticks.append((current - reference_date).days)
-        y = current.year
-        m = current.month + 1
-        if m > 12:
-            m = 1
-            y += 1
-        current = datetime.date(y, m, 1)
-    tick_vals = monthly_ticks
-    tick_text = [(reference_date + datetime.timedelta(days=val)).strftime("%m/%Y") for val in tick_vals]
-    fig.update_layout(
-        barmode='stack',
-        yaxis={'categoryorder': 'array', 'categoryarray': labels_order, 'autorange': 'reversed'},
-        xaxis=dict(tickmode='array', tickvals=tick_vals, ticktext=tick_text, title="Data"),
-        title="📋 Cronograma de Projetos",
-        showlegend=False
-    )
     st.plotly_chart(fig, use_container_width=True)
 
 # ------------------------------------------------------------------------------
@@ -679,7 +587,27 @@ def exibir_cronograma_desembolso():
     if not projetos_selecionados:
         projetos_selecionados = projetos_opcoes
 
-    final_df_list = []
+    etapas = df_all[df_all["Projeto"].isin(projetos_selecionados) & df_all["id_pai"].isnull()]
+    chaves = PREFIXO_DESEMBOLSO + etapas["codigo_sequencia"].astype(str)
+
+    curva = st.selectbox("Curva padrão de desembolso", options=list(desembolso.CURVAS), key="curva_desembolso")
+    if st.session_state.editing_enabled and st.button("Aplicar curva às etapas selecionadas"):
+        for chave in chaves:
+            st.session_state.desembolso.pop(chave, None)
+            st.session_state.pop(f"distrib_{chave[len(PREFIXO_DESEMBOLSO):]}", None)
+
+    # Inicializa, de uma vez, as distribuições que ainda não existem
+    novas = etapas[~chaves.isin(list(st.session_state.desembolso)).to_numpy()]
+    if not novas.empty:
+        padrao = desembolso.distribuicao_padrao(novas, curva)
+        for codigo, dist in padrao.groupby("Codigo", sort=False):
+            st.session_state.desembolso[f"{PREFIXO_DESEMBOLSO}{codigo}"] = (
+                dist[["Mês", "Percentual (%)"]].reset_index(drop=True)
+            )
+
+    # Os editores são desenhados primeiro; tabelas e gráficos de cada etapa
+    # entram depois no mesmo bloco, com o desembolso já calculado
+    blocos = []
     for projeto in projetos_selecionados:
         with st.expander(f"Cronograma de Desembolso para: {projeto}"):
             # Somente as etapas (id_pai é null)
@@ -691,28 +619,13 @@ def exibir_cronograma_desembolso():
             for _, row in entries.iterrows():
                 codigo = row["codigo_sequencia"]
                 tipo_servico = row.get("Tipo de Serviço", "")
-                key = f"desembolso_{codigo}"
-
-                # Inicializa distribuição se ainda não existir
+                key = f"{PREFIXO_DESEMBOLSO}{codigo}"
                 if key not in st.session_state.desembolso:
-                    dt_ini = row["Data Início Contrapartida (Previsto)"]
-                    dt_fim = row["Data Término Contrapartida (Previsto)"]
-                    meses = []
-                    cur = datetime.date(dt_ini.year, dt_ini.month, 1)
-                    while cur <= datetime.date(dt_fim.year, dt_fim.month, 1):
-                        meses.append(cur)
-                        y, m = cur.year, cur.month + 1
-                        if m > 12:
-                            m, y = 1, y + 1
-                        cur = datetime.date(y, m, 1)
-                    default = [round(100/len(meses), 1) for _ in meses]
-                    st.session_state.desembolso[key] = pd.DataFrame({
-                        "Mês": [mes.strftime("%m/%Y") for mes in meses],
-                        "Percentual (%)": default
-                    })
+                    continue  # etapa sem datas previstas
 
                 # Editor de percentuais
-                df_edit = st.data_editor(
+                bloco = st.container()
+                df_edit = bloco.data_editor(
                     st.session_state.desembolso[key].copy(),
                     num_rows="dynamic",
                     key=f"distrib_{codigo}",
@@ -720,55 +633,35 @@ def exibir_cronograma_desembolso():
                 )
                 st.session_state.desembolso[key] = df_edit.copy()
 
-                orc = row.get("Orçamento", 0)
-                perc_list = df_edit["Percentual (%)"].tolist()
-                soma = sum(perc_list)
-                if soma != 100:
-                    perc_list = [round((p/soma)*100, 1) for p in perc_list]
-                parcelas = [round((p/100)*orc, 2) for p in perc_list]
-
-                df_final = pd.DataFrame({
-                    "Mês": df_edit["Mês"],
-                    "Percentual (%)": perc_list,
-                    "Parcela (R$)": parcelas
-                })
-                st.write(f"## Etapa {codigo} | {projeto} | {tipo_servico}")
-                st.dataframe(df_final)
-
-                fig = px.bar(
-                    df_final, x="Mês", y="Parcela (R$)", text="Percentual (%)",
-                    title=f"Desembolso Mensal - Etapa {codigo}"
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                blocos.append((bloco, codigo, projeto, tipo_servico))
+
+    por_etapa, df_group, df_break = desembolso_atual(df_all, projetos_selecionados)
+    parcelas_etapa = dict(tuple(por_etapa.groupby("Codigo", sort=False)))
+    for bloco, codigo, projeto, tipo_servico in blocos:
+        df_final = parcelas_etapa.get(str(codigo))
+        if df_final is None:
+            continue
+        df_final = desembolso.formatar_meses(df_final[["Mês", "Percentual (%)", "Parcela (R$)"]].reset_index(drop=True))
+        with bloco:
+            st.write(f"## Etapa {codigo} | {projeto} | {tipo_servico}")
+            st.dataframe(df_final)
 
-                df_final["Projeto"] = projeto
-                final_df_list.append(df_final)
+            fig = px.bar(
+                df_final, x="Mês", y="Parcela (R$)", text="Percentual (%)",
+                title=f"Desembolso Mensal - Etapa {codigo}"
+            )
+            st.plotly_chart(fig, use_container_width=True)
 
     # Consolidado geral
-    if final_df_list:
+    if not df_group.empty:
         st.markdown('-----')
         st.write("## 💳 Cronograma de Desembolso Consolidado")
-        df_consol = pd.concat(final_df_list)
-
-        # agrupa e monta o DataFrame
-        df_group = (
-            df_consol
-            .groupby("Mês", as_index=False)
-            .agg({"Parcela (R$)": "sum"})
-        )
-
-        # 1) converte 'Mês' para datetime para ordenar
-        df_group["mes_dt"] = pd.to_datetime(df_group["Mês"], format="%m/%Y")
-
-        # 2) ordena por essa nova coluna
-        df_group = df_group.sort_values("mes_dt")
-
-        # 3) (opcional) remove a coluna auxiliar
-        df_group = df_group.drop(columns="mes_dt")
 
+        # Meses já vêm ordenados (Period); o texto MM/AAAA é só para exibição
+        df_group = desembolso.formatar_meses(df_group)
         st.dataframe(df_group)
 
-        # 4) plota com as cores que definimos
+        # plota com as cores que definimos
         fig2 = px.bar(
             df_group,
             x="Mês",
@@ -785,19 +678,7 @@ def exibir_cronograma_desembolso():
 
         # ——— Resumo Mensal por Projeto ———
         st.write("## 🏙️ Resumo Mensal por Projeto")
-        df_break = (
-            df_consol
-            .groupby(["Mês", "Projeto"])["Parcela (R$)"]
-            .sum()
-            .reset_index()
-        )
-
-        # repete a mesma ordenação
-        df_break["mes_dt"] = pd.to_datetime(df_break["Mês"], format="%m/%Y")
-        df_break = df_break.sort_values("mes_dt").drop(columns="mes_dt")
-
-        total_por_mes = df_break.groupby("Mês")["Parcela (R$)"].transform("sum")
-        df_break["Percentual (%)"] = (df_break["Parcela (R$)"] / total_por_mes * 100).round(1)
+        df_break = desembolso.formatar_meses(df_break)
 
         fig3 = px.bar(
             df_break,
@@ -816,56 +697,25 @@ def exibir_cronograma_desembolso():
 # ------------------------------------------------------------------------------
 def salvar_versao():
     df = st.session_state.df_principal.copy()
-    df_fin = df.copy()
-    df_fin["Saldo"] = df_fin["Orçamento"] - df_fin["Gasto Real"]
-    df_fin["% Gasto"] = df_fin.apply(lambda x: round((x["Gasto Real"] / x["Orçamento"]) * 100, 2)
-                                     if x["Orçamento"] > 0 else 0, axis=1)
-    df_fin_exibir = df_fin[["codigo_sequencia", "Projeto", "Orçamento", "Gasto Real", "Saldo", "% Gasto"]]
-    final_df_list = []
-    for projeto, df_disp in st.session_state.desembolso.items():
-        projeto_df = df[df["Projeto"] == projeto]
-        if projeto_df.empty:
-            continue
-        orcamento = projeto_df.iloc[0]["Orçamento"]
-        perc_list = df_disp["Percentual (%)"].tolist()
-        soma = sum(perc_list)
-        if soma != 100:
-            perc_normalizado = [round((p/soma)*100, 1) for p in perc_list]
-        else:
-            perc_normalizado = perc_list
-        parcelas = [round((p/100)*orcamento, 2) for p in perc_normalizado]
-        df_final = pd.DataFrame({
-            "Mês": df_disp["Mês"],
-            "Percentual (%)": perc_normalizado,
-            "Parcela (R$)": parcelas
-        })
-        df_final["Projeto"] = projeto
-        final_df_list.append(df_final)
-    if final_df_list:
-        df_consol = pd.concat(final_df_list)
-        df_consol_group = df_consol.groupby("Mês").agg({"Parcela (R$)":"sum"}).reset_index()
-    else:
-        df_consol_group = pd.DataFrame()
-    if not df_consol_group.empty and final_df_list:
-        df_break = df_consol.groupby(["Mês", "Projeto"])["Parcela (R$)"].sum().reset_index()
-        total_by_month = df_break.groupby("Mês")["Parcela (R$)"].transform('sum')
-        df_break["Percentual (%)"] = (df_break["Parcela (R$)"] / total_by_month * 100).round(1)
-    else:
-        df_break = pd.DataFrame()
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"versao_cronograma_{timestamp}.xlsx"
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-        df[COLUNAS].to_excel(writer, index=False, sheet_name='Dados Base')
-        df_fin_exibir.to_excel(writer, index=False, sheet_name='Resumo Financeiro')
-        df_consol_group.to_excel(writer, index=False, sheet_name='Desembolso Consolidado')
-        df_break.to_excel(writer, index=False, sheet_name='Resumo Mensal')
-    b64 = base64.b64encode(buffer.getvalue()).decode()
-    excel_link = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="{filename}">Baixar {filename}</a>'
-    st.session_state.versoes.append(excel_link)
+    versoes.salvar(df, st.session_state.desembolso)
     st.session_state.last_version = df.copy()
     st.success("Versão salva com sucesso!")
 
+def exibir_versoes():
+    nomes = versoes.listar()[::-1]
+    if not nomes:
+        return
+    st.markdown("### Versões Salvas:")
+    nome = st.selectbox(
+        "Versão", options=nomes,
+        format_func=lambda n: versoes.data_versao(n).strftime("%d/%m/%Y %H:%M:%S")
+    )
+    filename = f"versao_cronograma_{versoes.data_versao(nome):%Y%m%d_%H%M%S}.xlsx"
+    st.download_button(
+        f"Baixar {filename}", data=lambda: excel_versao(nome), file_name=filename,
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
 # ------------------------------------------------------------------------------
 # Abas Principais
 # ------------------------------------------------------------------------------
@@ -879,10 +729,8 @@ def app_tabs():
     st.markdown("---")
     if st.button("Salvar Versão"):
         salvar_versao()
-    if st.session_state.versoes:
-        st.markdown("### Versões Salvas:")
-        for link in st.session_state.versoes:
-            st.markdown(link, unsafe_allow_html=True)
+    gerar_excel_download(st.session_state.df_principal, "dados_exportados.xlsx")
+    exibir_versoes()
 
 # ------------------------------------------------------------------------------
 # Tela Principal
@@ -3,142 +3,158 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-import pandas as pd
-import time
-
-def selecionar_todos_registros(driver, wait):
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+import logging
+import sys
+import os
+
+# Raiz do projeto no path, para importar utils/ quando o script é executado direto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import argparse
+from utils.importador import (
+    extrair_solicitacoes, carregar_base, sincronizar, gravar_base, com_tentativas, Metricas
+)
+
+URL_PORTAL = "https://posobravalorreal.com.br/admin/"
+TABELA = (By.ID, "tabsolics")
+LINHAS_TABELA = (By.CSS_SELECTOR, "#tabsolics tbody tr")
+# Segundos esperando a tabela mudar depois de 'Filtrar'; sem mudança, segue com as linhas atuais
+ESPERA_REDESENHO = 10
+
+def criar_driver(headless=True):
+    """Chrome para a importação; sem janela por padrão, para rodar em lote/agendado."""
+    opcoes = webdriver.ChromeOptions()
+    if headless:
+        opcoes.add_argument("--headless=new")
+        opcoes.add_argument("--window-size=1920,1080")
+    return webdriver.Chrome(options=opcoes)
+
+def fazer_login(driver, wait, url):
+    """Abre o portal, envia as credenciais e espera a tabela de solicitações aparecer."""
+    driver.get(url)
+    print("[INFO] Página de login aberta.")
+
+    username_input = wait.until(EC.presence_of_element_located(
+        (By.XPATH, "//input[@type='text' or @name='usuario' or contains(@id, 'user')]")
+    ))
+    password_input = wait.until(EC.presence_of_element_located(
+        (By.XPATH, "//input[@type='password' or @name='senha' or contains(@id, 'pass')]")
+    ))
+    username_input.send_keys("lucas")
+    password_input.send_keys("55365883")
+    password_input.send_keys(Keys.RETURN)
+    print("[INFO] Login enviado.")
+
+    driver.switch_to.default_content()
+    wait.until(EC.presence_of_element_located(TABELA))
+    print("[INFO] Página de solicitações carregada.")
+
+def estado_tabela(driver):
     """
-    Seleciona a opção "Todos" no dropdown de status e clica em 'Filtrar'.
+    (nº de linhas, texto da primeira linha) da tabela de solicitações, ou
+    None se a tabela estiver sendo redesenhada no meio da leitura.
     """
     try:
-        # 1) Localiza o select de status pelo ID
-        select_element = wait.until(
-            EC.presence_of_element_located((By.ID, "cbxstatus"))
-        )
-        select = Select(select_element)
+        linhas = driver.find_elements(*LINHAS_TABELA)
+        return len(linhas), linhas[0].text if linhas else ""
+    except StaleElementReferenceException:
+        return None
 
-        # 2) Seleciona pelo texto visível "Todos"
-        select.select_by_visible_text("Todos")
-        print("[INFO] Opção 'Todos' selecionada com sucesso.")
+def selecionar_todos_registros(driver, wait):
+    """
+    Seleciona a opção "Todos" no dropdown de status, clica em 'Filtrar' e
+    espera a tabela mudar: outro nº de linhas ou outro texto na primeira
+    linha. Isso vale tanto quando o portal troca as linhas quanto quando as
+    atualiza no lugar. Se nada mudar em ESPERA_REDESENHO segundos (a
+    listagem já era "Todos"), segue com as linhas atuais.
+    """
+    select_element = wait.until(
+        EC.presence_of_element_located((By.ID, "cbxstatus"))
+    )
+    Select(select_element).select_by_visible_text("Todos")
+    print("[INFO] Opção 'Todos' selecionada com sucesso.")
+
+    antes = estado_tabela(driver)
+    filtro_btn = wait.until(
+        EC.element_to_be_clickable((By.ID, "btnfiltrasolics"))
+    )
+    filtro_btn.click()
+    print("[INFO] Botão 'Filtrar' clicado com sucesso.")
 
-        # 3) Clica no botão 'Filtrar' para aplicar
-        filtro_btn = wait.until(
-            EC.element_to_be_clickable((By.ID, "btnfiltrasolics"))
+    try:
+        WebDriverWait(driver, ESPERA_REDESENHO).until(
+            lambda d: estado_tabela(d) not in (None, antes)
         )
-        filtro_btn.click()
-        print("[INFO] Botão 'Filtrar' clicado com sucesso.")
+    except TimeoutException:
+        print(f"[INFO] Tabela sem mudança após {ESPERA_REDESENHO} s; seguindo com as linhas atuais.")
+    wait.until(EC.presence_of_all_elements_located(LINHAS_TABELA))
 
-        return True
-    except Exception as e:
-        print(f"[ERRO] Falha ao aplicar filtro 'Todos' e clicar em Filtrar: {e}")
-        return False
+def ler_tabela(driver, wait):
+    """HTML da tabela inteira em um único round trip, convertido localmente em DataFrame."""
+    wait.until(EC.presence_of_all_elements_located(LINHAS_TABELA))
+    html_tabela = driver.find_element(*TABELA).get_attribute("outerHTML")
+    return extrair_solicitacoes(html_tabela)
 
-def main():
-    driver = webdriver.Chrome()
+def main(incremental=False, url=URL_PORTAL, headless=True):
+    """
+    Extrai as solicitações do portal para o engenharia.xlsx.
+    Com `incremental`, a extração é mesclada no engenharia.xlsx existente
+    (solicitações novas entram e as alteradas são atualizadas; as demais são
+    mantidas). O arquivo inteiro é regravado, e só quando há mudança.
+    `url` permite apontar para outro endereço (ex.: um servidor local com HTML salvo).
+
+    Login, filtro e extração são repetidos com espera crescente em caso de
+    falha (ver `com_tentativas`); os tempos de cada fase e as linhas por
+    segundo são gravados em importacao_metricas.jsonl.
+    """
+    metricas = Metricas(modo="incremental" if incremental else "completo", url=url)
+    extras = {"sucesso": False}
+    driver = criar_driver(headless)
     wait = WebDriverWait(driver, 15)
 
     try:
-        # Acessar página de login
-        driver.get("https://posobravalorreal.com.br/admin/")
-        print("[INFO] Página de login aberta.")
-
-        # Login
-        username_input = wait.until(EC.presence_of_element_located(
-            (By.XPATH, "//input[@type='text' or @name='usuario' or contains(@id, 'user')]")
-        ))
-        password_input = wait.until(EC.presence_of_element_located(
-            (By.XPATH, "//input[@type='password' or @name='senha' or contains(@id, 'pass')]")
-        ))
-        username_input.send_keys("lucas")
-        password_input.send_keys("55365883")
-        password_input.send_keys(Keys.RETURN)
-        print("[INFO] Login enviado.")
-
-        driver.switch_to.default_content()
-        time.sleep(3)
-
-        # Esperar carregamento da tabela
-        wait.until(EC.presence_of_element_located((By.XPATH, "//table[@id='tabsolics']")))
-        print("[INFO] Página de solicitações carregada.")
+        with metricas.fase("login"):
+            com_tentativas(lambda: fazer_login(driver, wait, url), "Login")
 
         # Aplicar filtro "Todos" uma única vez
-        if not selecionar_todos_registros(driver, wait):
-            print("[ERRO] Não foi possível aplicar o filtro 'Todos'. Encerrando script.")
-            return
-
-        # Aguardar atualização da tabela após aplicar o filtro
-        time.sleep(5)
-
-        # Obter todas as linhas da tabela
-        linhas = wait.until(EC.presence_of_all_elements_located((By.XPATH, "//table[@id='tabsolics']//tbody/tr")))
-        total_linhas = len(linhas)
-        print(f"[INFO] Extraindo dados de {total_linhas} solicitações.")
-
-        # Extração dos dados
-        dados = []
-        for linha in linhas:
-            try:
-                colunas = linha.find_elements(By.TAG_NAME, "td")
-                if len(colunas) < 9:
-                    print(f"[WARN] Linha com colunas insuficientes. Pulando.")
-                    continue
-
-                # Extração dos dados básicos
-                num = colunas[0].text.strip()
-                empreendimento = colunas[1].text.strip()
-                unidade = colunas[2].text.strip().replace("Comum", "Área Comum")
-                bloco = colunas[3].text.strip() if unidade != "Área Comum" else "Área Comum"
-                responsavel = colunas[4].text.strip()
-                data_abertura = colunas[5].text.strip()
-                status = colunas[7].text.strip()
-
-                # Verificar se a pesquisa foi realizada
-                try:
-                    # Esperar o ícone estar visível
-                    pesquisa_icon = WebDriverWait(linha, 2).until(
-                        EC.presence_of_element_located((By.XPATH, ".//td[10]//*[name()='svg'][contains(@class, 'fa-check') and contains(@class, 'text-success')]"))
-                    )
-                    pesquisa = "Pesquisa Realizada"
-                except Exception:
-                    pesquisa = "Pesquisa Não Realizada"
-
-                # Capturar a data de encerramento (se houver)
-                encerramento = ""
-                if status.lower() in ["concluída", "improcedente"]:
-                    try:
-                        encerramento = colunas[6].text.strip()  # Ajuste o índice conforme necessário
-                    except:
-                        encerramento = ""
-
-                # Capturar a garantia selecionada
-                garantia_solicitada = colunas[8].text.strip()  # Ajuste o índice conforme necessário
-
-                # Adicionar dados à lista
-                dados.append([
-                    num, empreendimento, unidade, bloco, responsavel,
-                    data_abertura, encerramento,  # "Data de Encerramento"
-                    status, pesquisa, garantia_solicitada
-                ])
-                print(f"[INFO] Solicitação {num} processada com sucesso.")
-
-            except Exception as ex_linha:
-                print(f"[ERRO] Falha ao processar linha: {ex_linha}")
-
-        # Exportar para Excel
-        colunas_headers = [
-            "N°", "Empreendimento", "Unidade", "Bloco", "Responsável",
-            "Data de Abertura", "Encerramento",
-            "Status", "Pesquisa", "Garantia Solicitada"
-        ]
-        df = pd.DataFrame(dados, columns=colunas_headers)
-        df.to_excel("engenharia.xlsx", index=False)
-        print("[INFO] Dados exportados com sucesso!")
+        with metricas.fase("filtro"):
+            com_tentativas(lambda: selecionar_todos_registros(driver, wait), "Filtro 'Todos'")
+
+        with metricas.fase("extracao"):
+            df = com_tentativas(lambda: ler_tabela(driver, wait), "Extração da tabela")
+        metricas.linhas = len(df)
+        print(f"[INFO] {len(df)} solicitações extraídas.")
+
+        with metricas.fase("exportacao"):
+            if incremental:
+                df, novas, alteradas = sincronizar(df, carregar_base())
+                extras.update(novas=novas, alteradas=alteradas)
+                print(f"[INFO] {novas} solicitações novas e {alteradas} alteradas.")
+            if incremental and not (novas or alteradas):
+                print("[INFO] Base local já atualizada.")
+            else:
+                # Exportar (Excel)
+                gravar_base(df)
+                print("[INFO] Dados exportados com sucesso!")
+        extras["sucesso"] = True
 
     except Exception as e:
+        extras["erro"] = str(e)
         print(f"[ERRO] Falha na execução principal: {e}")
 
     finally:
         driver.quit()
+        resumo = metricas.registrar(**extras)
+        print(f"[INFO] Tempos (s): {resumo['fases_s']} | {resumo['linhas_por_s']} linhas/s")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Importa as solicitações do portal Pós Obra.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="atualiza só as solicitações novas ou alteradas na base local")
+    parser.add_argument("--url", default=URL_PORTAL, help="endereço do portal")
+    parser.add_argument("--visivel", action="store_true",
+                        help="abre a janela do navegador (por padrão roda em modo headless)")
+    args = parser.parse_args()
+    # Avisos de utils.importador (linhas ignoradas, novas tentativas) no mesmo formato das mensagens do script
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    main(incremental=args.incremental, url=args.url, headless=not args.visivel)
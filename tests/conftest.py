@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Raiz do repositório no sys.path, como as páginas fazem, para importar utils.*
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
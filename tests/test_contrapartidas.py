@@ -0,0 +1,167 @@
+"""
+utils/contrapartidas.py: renumerar_codigos x laço anterior de
+reorganizar_codigos (pages/8_contrapartidas.py), e escritas de sessões
+simultâneas no banco.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import RAIZ
+from utils import contrapartidas
+from utils.contrapartidas import renumerar_codigos
+
+
+def reorganizar_codigos_anterior(df):
+    """Versão anterior de reorganizar_codigos, usada como referência."""
+    df = df.copy()
+    projects = df[df["id_pai"].isnull()].copy().sort_index()
+    new_codes = {}
+    seq = 1
+    for idx in projects.index:
+        new_code = str(seq)
+        new_codes[df.loc[idx, "Projeto"]] = new_code
+        df.loc[idx, "codigo_sequencia"] = new_code
+        seq += 1
+    for projeto, code in new_codes.items():
+        subs_proj = df[(df["id_pai"].notnull()) & (df["Projeto"] == projeto)]
+        subs_proj = subs_proj.sort_values(by="codigo_sequencia")
+        seq_sub = 1
+        for idx in subs_proj.index:
+            df.loc[idx, "codigo_sequencia"] = f"{code}.{seq_sub}"
+            seq_sub += 1
+    return df["codigo_sequencia"]
+
+
+@pytest.fixture
+def df_csv():
+    return pd.read_csv(os.path.join(RAIZ, "contrapartidas.csv"), sep=";", dtype={"codigo_sequencia": str})
+
+
+def conferir(df):
+    novos = renumerar_codigos(df)
+    referencia = reorganizar_codigos_anterior(df)
+    assert novos.index.equals(df.index)
+    assert novos.astype(str).tolist() == referencia.astype(str).tolist()
+
+
+def test_csv(df_csv):
+    conferir(df_csv)
+
+
+def test_csv_sem_primeira_etapa(df_csv):
+    # Como após excluir_projeto: etapa removida e índice refeito
+    etapa = df_csv.index[df_csv["id_pai"].isnull()][0]
+    projeto = df_csv.loc[etapa, "Projeto"]
+    removidos = (df_csv["Projeto"] == projeto) & df_csv["id_pai"].isnull()
+    conferir(df_csv[~removidos].reset_index(drop=True))
+
+
+def test_csv_embaralhado(df_csv):
+    conferir(df_csv.sample(frac=1, random_state=0).reset_index(drop=True))
+
+
+def test_vazio(df_csv):
+    conferir(df_csv.iloc[0:0])
+
+
+def test_sem_etapas(df_csv):
+    # Só subetapas órfãs: o que sobra ao excluir a última etapa
+    conferir(df_csv[df_csv["id_pai"].notnull()].reset_index(drop=True))
+
+
+def test_subetapas_orfas():
+    df = pd.DataFrame({
+        "id": [1, 2, 3, 4, 5],
+        "id_pai": [np.nan, 1, 9, 1, 9],
+        "codigo_sequencia": ["3", "3.2", "7.1", "3.1", "7.2"],
+        "Projeto": ["Obra A", "Obra A", "Obra Removida", "Obra A", "Obra Removida"],
+    })
+    conferir(df)
+    assert renumerar_codigos(df).tolist() == ["1", "1.2", "7.1", "1.1", "7.2"]
+
+
+def test_nomes_repetidos():
+    # Duas etapas com o mesmo Projeto: vale a última
+    df = pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "id_pai": [np.nan, np.nan, 1, 2],
+        "codigo_sequencia": ["1", "2", "1.1", "2.1"],
+        "Projeto": ["Obra", "Obra", "Obra", "Obra"],
+    })
+    conferir(df)
+
+
+@pytest.fixture
+def banco(tmp_path):
+    caminho = str(tmp_path / "contrapartidas.db")
+    contrapartidas.importar_csv(os.path.join(RAIZ, "contrapartidas.csv"), caminho)
+    return caminho
+
+
+def test_edicoes_de_sessoes_diferentes_na_mesma_linha(banco):
+    # Duas sessões com o mesmo df_principal (desatualizado) editam campos diferentes da linha
+    sessao_a = contrapartidas.carregar(banco)
+    sessao_b = contrapartidas.carregar(banco)
+    antes_a, antes_b = sessao_a.loc[[0]].copy(), sessao_b.loc[[0]].copy()
+    sessao_a.at[0, "Status"] = "Concluído"
+    sessao_b.at[0, "Comentários"] = "Revisar orçamento"
+    contrapartidas.salvar_alteracoes(antes_a, sessao_a.loc[[0]], banco)
+    contrapartidas.salvar_alteracoes(antes_b, sessao_b.loc[[0]], banco)
+
+    linha = contrapartidas.carregar(banco).loc[0]
+    assert linha["Status"] == "Concluído"
+    assert linha["Comentários"] == "Revisar orçamento"
+
+
+def test_salvar_alteracoes_sem_mudanca_nao_grava(banco):
+    sessao = contrapartidas.carregar(banco)
+    outra = contrapartidas.carregar(banco)
+    outra.at[3, "Orçamento"] = 12345.0
+    contrapartidas.salvar_alteracoes(outra.loc[[3]].assign(**{"Orçamento": 0.0}), outra.loc[[3]], banco)
+    # A sessão desatualizada salva a linha sem alterar nada: o orçamento gravado continua
+    contrapartidas.salvar_alteracoes(sessao.loc[[3]], sessao.loc[[3]], banco)
+    assert contrapartidas.carregar(banco).at[3, "Orçamento"] == 12345.0
+
+
+def test_renumerar_a_partir_do_banco(banco):
+    # Sessões que incluem etapas a partir de estados desatualizados: os códigos seguem únicos
+    for nome in ("Obra Nova A", "Obra Nova B"):
+        contrapartidas.inserir({"id_pai": None, "codigo_sequencia": "1", "Projeto": nome}, banco)
+    df = contrapartidas.renumerar(banco)
+    gravado = contrapartidas.carregar(banco)
+    assert gravado["codigo_sequencia"].tolist() == df["codigo_sequencia"].tolist()
+    assert gravado["codigo_sequencia"].is_unique
+    assert gravado["codigo_sequencia"].tolist() == renumerar_codigos(gravado).tolist()
+
+
+def test_renumerar_sem_etapas(banco):
+    # Excluir a última etapa deixa só subetapas órfãs
+    df = contrapartidas.carregar(banco)
+    contrapartidas.excluir(df.loc[df["id_pai"].isnull(), "id"], banco)
+    df = contrapartidas.renumerar(banco)
+    assert df["id_pai"].notnull().all()
+    assert df["codigo_sequencia"].tolist() == contrapartidas.carregar(banco)["codigo_sequencia"].tolist()
+
+
+def test_primeira_carga_importa_csv(tmp_path):
+    caminho_csv = os.path.join(RAIZ, "contrapartidas.csv")
+    df = contrapartidas.carregar(str(tmp_path / "novo.db"), caminho_csv)
+    assert len(df) == len(pd.read_csv(caminho_csv, sep=";"))
+
+
+def test_excluir_tudo_nao_reimporta_csv(banco):
+    # O CSV só é importado uma vez: excluir todas as linhas deixa o banco vazio
+    caminho_csv = os.path.join(RAIZ, "contrapartidas.csv")
+    contrapartidas.excluir(contrapartidas.carregar(banco, caminho_csv)["id"], banco)
+    assert contrapartidas.carregar(banco, caminho_csv).empty
+    assert contrapartidas.renumerar(banco).empty
+    assert contrapartidas.carregar(banco, caminho_csv).empty
+
+
+def test_excluir_tudo_apos_primeira_carga(tmp_path):
+    caminho, caminho_csv = str(tmp_path / "novo.db"), os.path.join(RAIZ, "contrapartidas.csv")
+    contrapartidas.excluir(contrapartidas.carregar(caminho, caminho_csv)["id"], caminho)
+    assert contrapartidas.carregar(caminho, caminho_csv).empty
@@ -0,0 +1,87 @@
+"""
+utils/cubo_grd.py: total, gastos mensais e gastos por grupo da consulta de
+gastos (página Financeiro) pelo recorte do cubo x filtros aplicados na
+listagem da grd_Listagem.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import RAIZ
+from utils.base_dados import ler_aba
+from utils.cubo import COL_MES, fatiar
+from utils.cubo_grd import DIMENSOES_GRD, atende, montar_cubo_grd, valor_por
+from utils.financeiro import COL_CODIGO, COL_VALOR
+from utils.filtros import catalogo_filtros, mascara_filtros
+
+COLUNAS_FILTRO = [COL_CODIGO, "Ano", "Mês", "Descrição Projeto", "Descrição Grupo", "Derscrição Serviço",
+                  "Descrição Item"]
+
+
+@pytest.fixture(scope="module")
+def grd():
+    df = ler_aba(os.path.join(RAIZ, "pages", "base2025.xlsx"), "grd_Listagem", skiprows=1)
+    df.columns = df.columns.astype(str).str.strip().str.replace(r"\s+", " ", regex=True)
+    df["Data Documento"] = pd.to_datetime(df["Data Documento"], errors="coerce")
+    return df
+
+
+def consulta_anterior(df, selecoes):
+    """Filtros aplicados na listagem, coluna a coluna, e agregações sobre as linhas filtradas."""
+    filtrado = df.assign(Ano=df["Data Documento"].dt.year, **{"Mês": df["Data Documento"].dt.month})
+    for coluna, valores in selecoes.items():
+        if valores:
+            filtrado = filtrado[filtrado[coluna].isin(valores)]
+    mes = filtrado.groupby(filtrado["Data Documento"].dt.to_period("M"))[COL_VALOR].sum()
+    return filtrado[COL_VALOR].sum(), mes, filtrado.groupby("Descrição Grupo")[COL_VALOR].sum()
+
+
+def consulta(df, selecoes):
+    """Como a página: recorte do cubo ou, com filtro fora do cubo, cubo das linhas filtradas."""
+    if atende(selecoes):
+        cubo = fatiar(montar_cubo_grd(df), selecoes)
+    else:
+        documento = df["Data Documento"].dt
+        catalogo = catalogo_filtros(df.assign(Ano=documento.year.astype("Int64"),
+                                              **{"Mês": documento.month.astype("Int64")}), COLUNAS_FILTRO)
+        cubo = montar_cubo_grd(df[mascara_filtros(catalogo, selecoes)])
+    return cubo.sum(), valor_por(cubo, COL_MES), valor_por(cubo, "Descrição Grupo")
+
+
+def selecoes_da_base(df):
+    codigos = df[COL_CODIGO].dropna().value_counts().index
+    grupos = df["Descrição Grupo"].dropna().value_counts().index
+    itens = df["Descrição Item"].dropna().value_counts().index
+    return {
+        "sem_filtros": {},
+        "codigo_ano": {COL_CODIGO: list(codigos[:3]), "Ano": [2023, 2024]},
+        "grupo_mes": {"Descrição Grupo": list(grupos[:5]), "Mês": [1, 2, 3]},
+        "item": {"Descrição Item": list(itens[:10])},
+        "item_codigo": {"Descrição Item": list(itens[:30]), COL_CODIGO: list(codigos[:5])},
+    }
+
+
+@pytest.mark.parametrize("nome", ["sem_filtros", "codigo_ano", "grupo_mes", "item", "item_codigo"])
+def test_igual_aos_filtros_na_listagem(grd, nome):
+    selecoes = selecoes_da_base(grd)[nome]
+    total, mes, grupo = consulta(grd, selecoes)
+    total_ref, mes_ref, grupo_ref = consulta_anterior(grd, selecoes)
+    assert total_ref > 0
+    np.testing.assert_allclose(total, total_ref)
+    pd.testing.assert_series_equal(mes, mes_ref, check_names=False, check_index_type=False)
+    pd.testing.assert_series_equal(grupo, grupo_ref, check_names=False, check_index_type=False)
+
+
+def test_atende():
+    assert atende({COL_CODIGO: ["X"], "Ano": [2024], "Descrição Item": []})
+    assert not atende({"Descrição Item": ["Tinta"]})
+
+
+def test_cubo_sem_item(grd):
+    # O item fica fora do cubo: menos células que lançamentos
+    cubo = montar_cubo_grd(grd)
+    assert list(cubo.index.names) == DIMENSOES_GRD
+    assert len(cubo) < grd[DIMENSOES_GRD[:1] + ["Data Documento"] + DIMENSOES_GRD[2:] + ["Descrição Item"]
+                           ].drop_duplicates().shape[0]
@@ -0,0 +1,125 @@
+"""
+utils/financeiro.py x laços anteriores da página Financeiro: despesa real
+por empreendimento (Despesas em Manutenção) e Data CVCO/Status por código
+(Distribuição de Despesas por Período).
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import RAIZ
+from utils.base_dados import ler_aba
+from utils.financeiro import (COL_CODIGO, COL_VALOR, despesa_real_por_empreendimento,
+                              indice_cvco_por_codigo, mapa_codigos_empreendimentos)
+
+
+def despesa_real_anterior(df_departamento, df_grd):
+    """Laço anterior do gráfico Despesas em Manutenção, usado como referência."""
+    real = {}
+    for idx, row in df_departamento.iterrows():
+        empreendimento = row["Empreendimento"]
+        real_val = 0
+        for serv in df_grd[COL_CODIGO].dropna().unique():
+            serv_clean = serv.strip().upper()
+            if serv_clean == "ADM":
+                continue
+            if serv_clean in empreendimento.upper():
+                # astype(str) anterior ao pandas 3: nulo vira "nan"
+                codigos = pd.Series([str(x) for x in df_grd[COL_CODIGO]], index=df_grd.index)
+                mask = codigos.apply(lambda x: serv_clean in x.strip().upper())
+                real_val += df_grd.loc[mask, COL_VALOR].sum()
+        real[empreendimento] = real_val
+    return pd.Series(real, dtype=float)
+
+
+def info_anterior(df_departamento, codigo):
+    """get_enterprise_info anterior, usado como referência."""
+    matches = df_departamento[
+        (df_departamento["Empreendimento"].str.upper().str.contains(codigo.upper())) &
+        (df_departamento["Status"].isin(["Assistência Técnica", "Fora de Garantia"]))
+    ]
+    if not matches.empty:
+        row = matches.iloc[0]
+        return row["Data CVCO"], row["Status"]
+    return None, None
+
+
+def despesa_real(df_departamento, df_grd):
+    mapa = mapa_codigos_empreendimentos(df_departamento["Empreendimento"], df_grd[COL_CODIGO])
+    real = despesa_real_por_empreendimento(df_grd, mapa)
+    # Empreendimentos sem lançamentos não aparecem no groupby; no laço valiam 0
+    return real.reindex(df_departamento["Empreendimento"].unique(), fill_value=0.0)
+
+
+def conferir_indice(df_departamento, df_grd):
+    resultado = df_grd.merge(indice_cvco_por_codigo(df_departamento, df_grd[COL_CODIGO]),
+                             left_on=COL_CODIGO, right_index=True, how="left")
+    for codigo, cvco, status in zip(df_grd[COL_CODIGO], resultado["Data CVCO_Ref"], resultado["Status_Depto"]):
+        cvco_ref, status_ref = info_anterior(df_departamento, codigo)
+        assert (pd.isna(cvco) and pd.isna(cvco_ref)) or cvco == cvco_ref, codigo
+        assert (pd.isna(status) and status_ref is None) or status == status_ref, codigo
+
+
+@pytest.fixture(scope="module")
+def base():
+    caminho = os.path.join(RAIZ, "pages", "base2025.xlsx")
+    departamento = ler_aba(caminho, "departamento")
+    grd = ler_aba(caminho, "grd_Listagem", skiprows=1)
+    for df in (departamento, grd):
+        df.columns = df.columns.astype(str).str.strip().str.replace(r"\s+", " ", regex=True)
+    departamento["Data CVCO"] = pd.to_datetime(departamento["Data CVCO"], format="%d/%m/%Y", errors="coerce")
+    return departamento, grd
+
+
+@pytest.fixture
+def sintetico():
+    departamento = pd.DataFrame({
+        "Empreendimento": ["Residencial Plaza Mayorca", "RESIDENCIAL SERENE", "Residencial Felice II",
+                           "Residencial Felice III", "Residencial Andorinhas", "Residencial Nantes", np.nan],
+        "Status": ["Assistência Técnica", "Fora de Garantia", "Assistência Técnica",
+                   "Em Obra", "Assistência Técnica", "Fora de Garantia", "Assistência Técnica"],
+        "Data CVCO": pd.to_datetime(["2020-01-10", "2019-05-02", "2021-03-15", "2023-01-01",
+                                     "2018-07-20", "2017-02-01", "2016-01-01"]),
+    })
+    grd = pd.DataFrame({
+        COL_CODIGO: ["MAYORCA", " mayorca ", "Serene", "SERENE-02", "FELICE II", "felice iii", "Felice",
+                     "ADM", " adm", "Andorinhas ", "XPTO", "NAN", "nantes"],
+        COL_VALOR: [100.0, 50.5, 20.0, 7.25, 300.0, 40.0, 5.0, 999.0, 1.0, 12.0, 8.0, 3.0, 2.0],
+    })
+    return departamento, grd
+
+
+def test_despesa_real_sintetico(sintetico):
+    departamento, grd = sintetico
+    validos = departamento.dropna(subset=["Empreendimento"])
+    referencia = despesa_real_anterior(validos, grd)
+    pd.testing.assert_series_equal(despesa_real(validos, grd), referencia, check_names=False, check_index_type=False)
+
+
+def test_despesa_real_codigo_nulo(sintetico):
+    # No laço, um código nulo virava "NAN" e contava para as referências contidas nele ("NAN", "NA"...)
+    departamento, grd = sintetico
+    grd = pd.concat([grd, pd.DataFrame({COL_CODIGO: [np.nan], COL_VALOR: [1000.0]})], ignore_index=True)
+    validos = departamento.dropna(subset=["Empreendimento"])
+    referencia = despesa_real_anterior(validos, grd)
+    pd.testing.assert_series_equal(despesa_real(validos, grd), referencia, check_names=False, check_index_type=False)
+
+
+def test_despesa_real_base(base):
+    departamento, grd = base
+    validos = departamento.dropna(subset=["Empreendimento"])
+    referencia = despesa_real_anterior(validos, grd)
+    pd.testing.assert_series_equal(despesa_real(validos, grd), referencia, check_names=False, check_index_type=False)
+
+
+def test_indice_cvco_sintetico(sintetico):
+    departamento, grd = sintetico
+    conferir_indice(departamento.dropna(subset=["Empreendimento"]), grd)
+
+
+def test_indice_cvco_base(base):
+    departamento, grd = base
+    grd = grd.drop_duplicates(COL_CODIGO)
+    conferir_indice(departamento, grd.dropna(subset=[COL_CODIGO]))
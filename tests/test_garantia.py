@@ -0,0 +1,75 @@
+"""
+utils/garantia.py: unidades_em_garantia (vetor de diferenças) x period_range
++ explode por obra do Painel de Assistência Técnica, com prazo único e com
+prazo por linha (sistema construtivo).
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import RAIZ
+from utils.base_dados import ler_aba
+from utils.garantia import PRAZO_GARANTIA_MESES, unidades_em_garantia
+
+
+def unidades_em_garantia_anterior(df, prazos):
+    """Laço anterior do gráfico Unidades em Garantia, com um prazo por linha, usado como referência."""
+    df_war = df.assign(Prazo=prazos).dropna().copy()
+    df_war["FimGarantia"] = [entrega + pd.DateOffset(months=int(prazo))
+                             for entrega, prazo in zip(df_war["Data Entrega de Obra"], df_war["Prazo"])]
+    df_war["AnoMes"] = df_war.apply(
+        lambda r: pd.period_range(r["Data Entrega de Obra"], r["FimGarantia"], freq="M"), axis=1)
+    df_war = df_war.explode("AnoMes")
+    df_war["AnoMes"] = df_war["AnoMes"].astype(str)
+    return df_war.groupby("AnoMes", as_index=False)["N° Unidades"].sum()
+
+
+def conferir(df, prazos):
+    resultado = unidades_em_garantia(df["Data Entrega de Obra"], df["N° Unidades"], prazos)
+    referencia = unidades_em_garantia_anterior(df, prazos)
+    pd.testing.assert_frame_equal(resultado, referencia, check_dtype=False)
+
+
+@pytest.fixture
+def obras():
+    return pd.DataFrame({
+        "Data Entrega de Obra": pd.to_datetime(["2019-01-31", "2019-03-15", None, "2020-12-01", "2018-06-30",
+                                                "2019-03-01"]),
+        "N° Unidades": [16, 80, 48, np.nan, 32, 8],
+        "Sistema": ["Estrutura", "Pisos", "Pisos", "Estrutura", "Pintura", "Sistema sem prazo"],
+    })
+
+
+def test_prazo_unico(obras):
+    conferir(obras[["Data Entrega de Obra", "N° Unidades"]], PRAZO_GARANTIA_MESES)
+
+
+def test_prazo_por_sistema(obras):
+    # Prazo de cada linha mapeado do seu sistema; sistema sem prazo fica de fora
+    prazos = obras["Sistema"].map({"Estrutura": 60, "Pisos": 12, "Pintura": 24})
+    conferir(obras[["Data Entrega de Obra", "N° Unidades"]], prazos)
+
+
+def test_prazo_por_sistema_so_na_sua_obra(obras):
+    # Cada obra conta só no prazo do próprio sistema: a de Pisos (12 meses) sai em 2020-04
+    prazos = obras["Sistema"].map({"Estrutura": 60, "Pisos": 12, "Pintura": 24})
+    serie = unidades_em_garantia(obras["Data Entrega de Obra"], obras["N° Unidades"], prazos).set_index("AnoMes")
+    assert serie.at["2020-03", "N° Unidades"] == 16 + 80 + 32
+    assert serie.at["2020-04", "N° Unidades"] == 16 + 32
+
+
+def test_sem_obras_validas(obras):
+    resultado = unidades_em_garantia(obras["Data Entrega de Obra"], obras["N° Unidades"], np.nan)
+    assert resultado.empty
+    assert resultado.columns.tolist() == ["AnoMes", "N° Unidades"]
+
+
+def test_base():
+    departamento = ler_aba(os.path.join(RAIZ, "pages", "base2025.xlsx"), "departamento")
+    departamento.columns = departamento.columns.str.strip()
+    df = departamento.rename(columns={"Data Entrega de obra": "Data Entrega de Obra"})
+    df = df[["Data Entrega de Obra", "N° Unidades"]]
+    df["Data Entrega de Obra"] = pd.to_datetime(df["Data Entrega de Obra"], dayfirst=True, errors="coerce")
+    conferir(df, PRAZO_GARANTIA_MESES)
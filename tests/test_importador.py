@@ -0,0 +1,318 @@
+"""
+utils/importador.py: extração da tabela tabsolics a partir do HTML salvo x
+extração célula a célula com Selenium usada antes, e importação de ponta a
+ponta de uma página do portal servida localmente (novas tentativas e
+mesclagem incremental na base).
+"""
+import logging
+import os
+import re
+import threading
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from utils.importador import (COLUNAS_SAIDA, carregar_base, com_tentativas, extrair_solicitacoes,
+                              gravar_base, sincronizar)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def ler_fixture(nome):
+    with open(os.path.join(FIXTURES, nome), encoding="utf-8") as f:
+        return f.read()
+
+
+# -----------------------------------------------------------------------------
+# Extração anterior (Selenium), sobre um DOM em memória no lugar do navegador
+# -----------------------------------------------------------------------------
+class By:
+    TAG_NAME = "tag name"
+
+
+QUEBRA = "\0"
+
+
+class Elemento:
+    """O mínimo de um WebElement usado pela extração anterior."""
+
+    def __init__(self, no):
+        self.no = no
+
+    def find_elements(self, by, valor):
+        assert by == By.TAG_NAME
+        return [Elemento(e) for e in self.no.iter(valor) if e is not self.no]
+
+    @property
+    def text(self):
+        """Texto visível como no Selenium: <br> quebra linha, espaços colapsados por linha, &nbsp; vira espaço."""
+        partes = []
+
+        def visitar(no):
+            if no.tag == "br":
+                partes.append(QUEBRA)
+            partes.append(no.text or "")
+            for filho in no:
+                visitar(filho)
+                partes.append(filho.tail or "")
+
+        visitar(self.no)
+        # Espaços do código-fonte (inclusive quebras de linha) colapsam; só o <br> quebra a linha
+        linhas = re.sub(r"[ \t\r\n\f\v]+", " ", "".join(partes)).split(QUEBRA)
+        return "\n".join(l.strip(" ") for l in linhas).strip("\n").replace("\xa0", " ")
+
+    def tem_icone_pesquisa(self):
+        """.//td[10]//*[name()='svg'][contains(@class, 'fa-check') and contains(@class, 'text-success')]"""
+        for pai in self.no.iter():
+            celulas = [f for f in pai if f.tag == "td"]
+            if len(celulas) >= 10:
+                for svg in celulas[9].iter("svg"):
+                    classe = svg.get("class", "")
+                    if "fa-check" in classe and "text-success" in classe:
+                        return True
+        return False
+
+
+def extracao_anterior(html):
+    """Laço de extração da versão anterior do importador, usado como referência."""
+    tabela = ET.fromstring(html)
+    linhas = [Elemento(tr) for tr in tabela.iterfind(".//tbody/tr")]
+    dados = []
+    for linha in linhas:
+        colunas = linha.find_elements(By.TAG_NAME, "td")
+        if len(colunas) < 9:
+            continue
+        num = colunas[0].text.strip()
+        empreendimento = colunas[1].text.strip()
+        unidade = colunas[2].text.strip().replace("Comum", "Área Comum")
+        bloco = colunas[3].text.strip() if unidade != "Área Comum" else "Área Comum"
+        responsavel = colunas[4].text.strip()
+        data_abertura = colunas[5].text.strip()
+        status = colunas[7].text.strip()
+        pesquisa = "Pesquisa Realizada" if linha.tem_icone_pesquisa() else "Pesquisa Não Realizada"
+        encerramento = ""
+        if status.lower() in ["concluída", "improcedente"]:
+            encerramento = colunas[6].text.strip()
+        garantia_solicitada = colunas[8].text.strip()
+        dados.append([
+            num, empreendimento, unidade, bloco, responsavel,
+            data_abertura, encerramento,
+            status, pesquisa, garantia_solicitada
+        ])
+    return pd.DataFrame(dados, columns=COLUNAS_SAIDA)
+
+
+# -----------------------------------------------------------------------------
+# Testes
+# -----------------------------------------------------------------------------
+@pytest.fixture
+def html_tabela():
+    return ler_fixture("tabsolics.html")
+
+
+def test_igual_a_extracao_anterior(html_tabela):
+    pd.testing.assert_frame_equal(extrair_solicitacoes(html_tabela), extracao_anterior(html_tabela))
+
+
+def test_valores_esperados(html_tabela):
+    df = extrair_solicitacoes(html_tabela).set_index("N°")
+    # A linha 1519 tem só 8 células e é ignorada
+    assert df.index.tolist() == ["1523", "1522", "1521", "1520", "1518"]
+    # Tags aninhadas na célula
+    assert df.at["1523", "Empreendimento"] == "Residencial Serene"
+    assert df.at["1523", "Garantia Solicitada"] == "Hidráulica - Vazamento"
+    assert df.at["1518", "Status"] == "Concluída"
+    # Espaços e quebras de linha do HTML colapsados; <br> vira quebra de linha
+    assert df.at["1522", "Empreendimento"] == "Residencial Plaza Mayorca"
+    assert df.at["1523", "Responsável"] == "Carlos Souza"
+    assert df.at["1521", "Garantia Solicitada"] == "Elétrica\nTomada"
+    assert df.at["1520", "Responsável"] == "Bruno Costa"
+    # Células vazias
+    assert df.at["1521", "Responsável"] == ""
+    assert df.at["1520", "Bloco"] == ""
+    # Área comum, encerramento só para Concluída/Improcedente
+    assert df.loc["1522", ["Unidade", "Bloco", "Encerramento"]].tolist() == ["Área Comum", "Área Comum", ""]
+    assert df.loc["1521", ["Unidade", "Bloco"]].tolist() == ["Área Comum 2", "A"]
+    assert df.at["1520", "Encerramento"] == "27/01/2025"
+    # Ícone de pesquisa: check verde (também aninhado); check de outra cor ou 10ª célula ausente não contam
+    assert df["Pesquisa"].to_dict() == {
+        "1523": "Pesquisa Realizada",
+        "1522": "Pesquisa Não Realizada",
+        "1521": "Pesquisa Não Realizada",
+        "1520": "Pesquisa Não Realizada",
+        "1518": "Pesquisa Realizada",
+    }
+
+
+def test_icone_fora_do_svg(html_tabela):
+    # A extração anterior só reconhecia o ícone como <svg> (o que o Font Awesome desenha na página)
+    html = html_tabela.replace('<svg class="svg-inline--fa fa-check text-success" viewBox="0 0 448 512">'
+                               '<path d="M438 105"/></svg>', '<i class="fa fa-check text-success"></i>')
+    pd.testing.assert_frame_equal(extrair_solicitacoes(html), extracao_anterior(html))
+
+
+def test_tabela_sem_linhas():
+    html = '<table id="tabsolics"><thead><tr><th>N°</th></tr></thead><tbody></tbody></table>'
+    df = extrair_solicitacoes(html)
+    assert df.empty
+    assert df.columns.tolist() == COLUNAS_SAIDA
+
+
+# -----------------------------------------------------------------------------
+# Importação de ponta a ponta, com o portal servido por http.server
+# -----------------------------------------------------------------------------
+class Portal(BaseHTTPRequestHandler):
+    """Serve `pagina`; as `falhas` primeiras requisições recebem 503."""
+
+    pagina = ""
+    falhas = 0
+    requisicoes = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requisicoes += 1
+        if cls.falhas:
+            cls.falhas -= 1
+            self.send_error(503, "Serviço indisponível")
+            return
+        corpo = cls.pagina.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def portal():
+    # Subclasse por teste: o estado (página, falhas) fica nos atributos da classe
+    handler = type("PortalTeste", (Portal,), {"pagina": ler_fixture("portal.html")})
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    handler.url = f"http://127.0.0.1:{servidor.server_port}/admin/"
+    yield handler
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def baixar_tabela(url):
+    def ler_tabela():
+        with urllib.request.urlopen(url, timeout=5) as resposta:
+            return extrair_solicitacoes(resposta.read().decode("utf-8"))
+
+    return com_tentativas(ler_tabela, "Extração da tabela", espera=0.01)
+
+
+def importar(url, caminho_excel):
+    """O que o main(incremental=True) faz depois do login, com a página baixada por HTTP."""
+    df, novas, alteradas = sincronizar(baixar_tabela(url), carregar_base(caminho_excel))
+    if novas or alteradas:
+        gravar_base(df, caminho_excel)
+    return novas, alteradas
+
+
+def tipos_do_numero(caminho_excel):
+    """Tipos das células da coluna N° no engenharia.xlsx ("s" = texto, "n" = número)."""
+    planilha = openpyxl.load_workbook(caminho_excel, read_only=True).active
+    return {linha[0].data_type for linha in planilha.iter_rows(min_row=2)}
+
+
+def linha_da_pagina(pagina, numero):
+    return re.search(rf'\n\s*<tr data-id="{numero}">.*?</tr>', pagina, re.S).group(0)
+
+
+def atualizar_pagina(pagina):
+    """O portal no dia seguinte: 1522 concluída com pesquisa, 1524 aberta e 1520 fora da listagem."""
+    linha = linha_da_pagina(pagina, 1522)
+    concluida = (linha
+                 .replace('<td></td>\n          <td><span class="badge bg-warning">Em andamento',
+                          '<td>12/02/2025</td>\n          <td><span class="badge bg-success">Concluída')
+                 .replace("<td></td>\n          <td><button",
+                          '<td><svg class="svg-inline--fa fa-check text-success"></svg></td>\n          <td><button'))
+    assert concluida.count("12/02/2025") == 1 and concluida.count("<svg") == 1
+    nova = (linha.replace("1522", "1524").replace("Comum", "303")
+            .replace("01/02/2025", "14/02/2025").replace("Esquadrias: Vidro", "Pisos"))
+    return pagina.replace(linha, nova + concluida).replace(linha_da_pagina(pagina, 1520), "")
+
+
+@pytest.fixture
+def caminho_excel(tmp_path):
+    return str(tmp_path / "engenharia.xlsx")
+
+
+def test_importacao_completa_grava_a_extracao(portal, caminho_excel):
+    # Sem --incremental o engenharia.xlsx é a extração como saía do Selenium: N° e demais colunas como texto
+    df = baixar_tabela(portal.url)
+    gravar_base(df, caminho_excel)
+    pd.testing.assert_frame_equal(pd.read_excel(caminho_excel, dtype=str, keep_default_na=False), df)
+    assert tipos_do_numero(caminho_excel) == {"s"}
+
+
+def test_importacao_incremental(portal, caminho_excel):
+    # Primeira execução: parte do engenharia.xlsx de antes, com a 1522 desatualizada e a 1517 fora da listagem
+    pd.DataFrame([
+        [1522, "Residencial Plaza Mayorca", "Área Comum", "Área Comum", "Ana Lima", "01/02/2025", "",
+         "Nova", "Pesquisa Não Realizada", "Esquadrias: Vidro"],
+        [1517, "Residencial Nantes", "204", "D", "Carlos Souza", "15/01/2025", "16/01/2025",
+         "Concluída", "Pesquisa Realizada", "Cobertura"],
+    ], columns=COLUNAS_SAIDA).to_excel(caminho_excel, index=False)
+
+    assert importar(portal.url, caminho_excel) == (3, 1)
+    base = carregar_base(caminho_excel).set_index("N°")
+    assert base.index.tolist() == ["1523", "1522", "1521", "1520", "1517"]
+    assert base.at["1522", "Status"] == "Em andamento"
+    assert base.at["1521", "Encerramento"] == "30/01/2025"
+    assert base.at["1521", "Garantia Solicitada"] == "Elétrica\nTomada"
+    assert base.at["1520", "Pesquisa"] == "Pesquisa Realizada"
+    assert base.at["1517", "Status"] == "Concluída"
+
+    # Mesma página: nada a gravar
+    assert importar(portal.url, caminho_excel) == (0, 0)
+
+    portal.pagina = atualizar_pagina(portal.pagina)
+    assert importar(portal.url, caminho_excel) == (1, 1)
+    base = carregar_base(caminho_excel).set_index("N°")
+    assert base.index.tolist() == ["1524", "1523", "1522", "1521", "1520", "1517"]
+    assert base.loc["1522", ["Encerramento", "Status", "Pesquisa"]].tolist() == [
+        "12/02/2025", "Concluída", "Pesquisa Realizada"]
+    assert base.loc["1524", ["Unidade", "Bloco", "Status", "Garantia Solicitada"]].tolist() == [
+        "303", "C", "Em andamento", "Pisos"]
+    # Solicitações fora da listagem atual continuam na base
+    assert base.at["1520", "Status"] == "Concluída"
+    # N° continua texto no arquivo, como na importação completa
+    assert tipos_do_numero(caminho_excel) == {"s"}
+
+
+def test_pagina_inteira_so_tabsolics(portal):
+    # A tabela de resumo da página (9 células por linha) não entra como solicitação
+    df = extrair_solicitacoes(portal.pagina)
+    assert df["N°"].tolist() == ["1523", "1522", "1521", "1520"]
+    tabela = re.search(r'<table id="tabsolics".*?</table>', portal.pagina, re.S).group(0)
+    pd.testing.assert_frame_equal(df, extrair_solicitacoes(tabela))
+
+
+def test_importacao_com_novas_tentativas(portal, caminho_excel, caplog):
+    portal.falhas = 2
+    with caplog.at_level(logging.WARNING, logger="utils.importador"):
+        assert importar(portal.url, caminho_excel) == (4, 0)
+    assert portal.requisicoes == 3
+    # Cada falha vira um aviso no logger do módulo
+    assert [r.getMessage().split(" falhou ")[0] for r in caplog.records] == ["Extração da tabela"] * 2
+    assert carregar_base(caminho_excel)["N°"].tolist() == ["1523", "1522", "1521", "1520"]
+
+
+def test_importacao_esgota_tentativas(portal, caminho_excel):
+    portal.falhas = 3
+    with pytest.raises(urllib.error.HTTPError) as erro:
+        importar(portal.url, caminho_excel)
+    assert erro.value.code == 503
+    assert portal.requisicoes == 3
+    assert not os.path.exists(caminho_excel)
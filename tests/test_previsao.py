@@ -0,0 +1,107 @@
+"""
+utils/previsao.py: chamados registrados por obra no ajuste x contagem direta
+dos chamados dentro da garantia, inclusive sem obras válidas e com chamados
+de empreendimentos sem obra.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import RAIZ
+from utils.base_dados import ler_aba
+from utils.previsao import ajustar, prever
+
+PRAZO = 60
+
+
+def registrados_anterior(chamados, obras, prazo_meses=PRAZO):
+    """Chamados de cada obra abertos na garantia e entre o primeiro e o último chamado, obra a obra."""
+    abertura = pd.to_datetime(chamados["Data de Abertura"]).dropna()
+    desde, ate = abertura.min().to_period("M"), abertura.max().to_period("M")
+    contagem = {}
+    for _, obra in obras.iterrows():
+        if obra["Empreendimento"] in contagem:
+            continue
+        entrega = pd.Timestamp(obra["Data Entrega de Obra"]).to_period("M")
+        inicio, fim = max(entrega, desde), min(entrega + prazo_meses, ate)
+        meses = pd.to_datetime(chamados.loc[chamados["Empreendimento"] == obra["Empreendimento"],
+                                            "Data de Abertura"]).dropna().dt.to_period("M")
+        contagem[obra["Empreendimento"]] = float(((meses >= inicio) & (meses <= fim)).sum())
+    return pd.Series(contagem, dtype=float)
+
+
+def registrados(ajuste):
+    previsao = prever(ajuste)
+    return previsao.groupby("Empreendimento", sort=False)["Chamados Registrados"].sum()
+
+
+@pytest.fixture
+def chamados():
+    return pd.DataFrame({
+        "Empreendimento": ["Serene", "Serene", "Nantes", "Sem Obra", "Serene", "Nantes", "Serene"],
+        "Data de Abertura": pd.to_datetime(["2019-03-10", "2019-03-20", "2020-07-01", "2020-08-01",
+                                            None, "2023-02-15", "2024-06-30"]),
+    })
+
+
+@pytest.fixture
+def chuva():
+    meses = pd.period_range("2018-01", "2024-12", freq="M")
+    return pd.DataFrame({"AnoMes": meses.astype(str), "Chuva": np.linspace(10, 300, len(meses))})
+
+
+@pytest.fixture
+def obras():
+    return pd.DataFrame({
+        "Empreendimento": ["Serene", "Nantes", "Sem Data", "Sem Unidades"],
+        "Data Entrega de Obra": pd.to_datetime(["2019-01-15", "2017-10-01", None, "2018-01-01"]),
+        "N° Unidades": [48, 16, 32, 0],
+    })
+
+
+def test_registrados(chamados, obras, chuva):
+    validas = obras.iloc[:2]
+    pd.testing.assert_series_equal(registrados(ajustar(chamados, obras, chuva)),
+                                   registrados_anterior(chamados, validas), check_names=False)
+
+
+def test_chamados_sem_obra_nao_contam(chamados, obras, chuva):
+    # Chamados de empreendimentos sem obra ajustada não podem ler os dados de outra obra
+    so_com_obra = chamados[chamados["Empreendimento"].isin(["Serene", "Nantes"])]
+    com, sem = ajustar(chamados, obras, chuva), ajustar(so_com_obra, obras, chuva)
+    np.testing.assert_array_equal(com["observados"], sem["observados"])
+    pd.testing.assert_frame_equal(com["obras"], sem["obras"])
+
+
+@pytest.mark.parametrize("linhas", [slice(0, 0), slice(2, 4)], ids=["vazio", "sem_obras_validas"])
+def test_sem_obras_validas(chamados, obras, chuva, linhas):
+    previsao = prever(ajustar(chamados, obras.iloc[linhas], chuva))
+    assert previsao.empty
+    assert previsao.columns.tolist() == ["Empreendimento", "AnoMes", "Ano", "Ano de Garantia",
+                                         "Chamados Previstos", "Chamados Registrados"]
+
+
+def test_sem_chamados(obras, chuva):
+    ajuste = ajustar(pd.DataFrame({"Empreendimento": [], "Data de Abertura": pd.to_datetime([])}), obras, chuva)
+    previsao = prever(ajuste)
+    assert len(previsao) == 2 * (PRAZO + 1)
+    assert previsao["Chamados Registrados"].isna().all()
+
+
+def test_base():
+    caminho = os.path.join(RAIZ, "pages", "base2025.xlsx")
+    eng, dep = ler_aba(caminho, "engenharia"), ler_aba(caminho, "departamento")
+    for df in (eng, dep):
+        df.columns = df.columns.str.strip()
+    dep = dep.rename(columns={"Data Entrega de obra": "Data Entrega de Obra"})
+    dep["Data Entrega de Obra"] = pd.to_datetime(dep["Data Entrega de Obra"], format="%d/%m/%Y", errors="coerce")
+    eng["Data de Abertura"] = pd.to_datetime(eng["Data de Abertura"], format="%d/%m/%Y", errors="coerce")
+
+    ajuste = ajustar(eng, dep)
+    validas = ajuste["obras"]["Empreendimento"]
+    referencia = registrados_anterior(eng, dep[dep["Empreendimento"].isin(validas)])
+    resultado = registrados(ajuste)
+    assert resultado.sum() > 0
+    pd.testing.assert_series_equal(resultado, referencia.reindex(resultado.index), check_names=False)
@@ -0,0 +1,79 @@
+"""
+utils/versoes.py: versões salvas (cópias completas e diferenças) reconstruídas
+x dados salvos, inclusive depois de uma cópia com ids nulos ou repetidos, e
+limite de versões guardadas na pasta.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import versoes
+
+
+def cronograma(n, desloca=0):
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1, dtype=float),
+        "Projeto": [f"P{i % 3}" for i in range(n)],
+        "Valor": np.arange(n, dtype=float) * 100 + desloca,
+    })
+
+
+def conferir(nome, df, distribuicoes, pasta):
+    df_lido, dist_lidas = versoes.carregar(nome, pasta)
+    pd.testing.assert_frame_equal(df_lido.reset_index(drop=True), df.reset_index(drop=True))
+    assert dist_lidas.keys() == distribuicoes.keys()
+    for chave, serie in distribuicoes.items():
+        pd.testing.assert_series_equal(dist_lidas[chave], serie)
+
+
+@pytest.fixture
+def pasta(tmp_path):
+    return str(tmp_path / "versoes")
+
+
+def test_cadeia_de_diferencas(pasta, monkeypatch):
+    monkeypatch.setattr(versoes, "INTERVALO_COMPLETA", 4)
+    salvas = []
+    df = cronograma(10)
+    for i in range(9):
+        df = df.copy()
+        df.loc[i, "Valor"] = -1.0 * i
+        if i == 3:
+            df = df.drop(index=2)
+        if i == 5:
+            df = pd.concat([df, cronograma(12).iloc[10:]])
+        distribuicoes = {"P0": pd.Series([1.0, i]), "P1": pd.Series([float(i)])} if i % 2 else {"P0": pd.Series([2.0])}
+        salvas.append((versoes.salvar(df, distribuicoes, pasta), df, distribuicoes))
+    tipos = [versoes._ler(nome, pasta)["tipo"] for nome, _, _ in salvas]
+    assert tipos == ["completa", "delta", "delta", "delta"] * 2 + ["completa"]
+    for nome, df, distribuicoes in salvas:
+        conferir(nome, df, distribuicoes, pasta)
+
+
+@pytest.mark.parametrize("ids", [[1, 2, 2, 3], [1, np.nan, 2, 3]], ids=["repetidos", "nulos"])
+def test_diferenca_apos_ids_invalidos(pasta, ids):
+    # Ids inválidos obrigam a uma cópia completa; a versão seguinte (ids válidos) é uma diferença
+    invalido = pd.DataFrame({"id": ids, "Projeto": ["A", "B", "C", "D"], "Valor": [1.0, 2.0, 3.0, 4.0]})
+    versoes.salvar(invalido, {}, pasta)
+    df = pd.DataFrame({"id": [1.0, 2.0, 3.0], "Projeto": ["A", "C", "D"], "Valor": [1.0, 3.0, 5.0]})
+    nome = versoes.salvar(df, {}, pasta)
+    registro = versoes._ler(nome, pasta)
+    assert registro["tipo"] == "delta"
+    assert registro["linhas"]["id"].tolist() == ([3.0] if ids[2] == 2 else [2.0, 3.0])
+    conferir(nome, df, {}, pasta)
+
+
+def test_limite_de_versoes(pasta, monkeypatch):
+    monkeypatch.setattr(versoes, "INTERVALO_COMPLETA", 3)
+    monkeypatch.setattr(versoes, "MAX_VERSOES", 4)
+    salvas = []
+    for i in range(11):
+        df, distribuicoes = cronograma(5, desloca=i), {"P0": pd.Series([float(i)])}
+        salvas.append((versoes.salvar(df, distribuicoes, pasta), df, distribuicoes))
+        nomes = versoes.listar(pasta)
+        # Mantém as 4 mais recentes e a cadeia de que dependem, até a cópia completa
+        assert [nome for nome, _, _ in salvas[-4:]] == nomes[-4:]
+        assert len(nomes) <= 4 + 3 - 1
+        assert versoes._ler(nomes[0], pasta)["tipo"] == "completa"
+    for nome, df, distribuicoes in salvas[-4:]:
+        conferir(nome, df, distribuicoes, pasta)
@@ -0,0 +1,3 @@
+"""
+Funções compartilhadas entre as páginas do sistema Pós Obra.
+"""
@@ -0,0 +1,44 @@
+"""
+Estrutura da aba administrativo da planilha base: identificação das
+colunas mensais de custo Real (ex.: 'jan/25', 'fev/25').
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+
+MESES = {
+    'jan': 1, 'fev': 2, 'mar': 3, 'abr': 4, 'mai': 5, 'jun': 6,
+    'jul': 7, 'ago': 8, 'set': 9, 'out': 10, 'nov': 11, 'dez': 12
+}
+
+_RE_MES_ANO = re.compile(r"^([a-z]{3})/(\d{2})$")
+
+
+@lru_cache(maxsize=None)
+def parse_month_year(col):
+    """
+    Identifica colunas como 'jan/25', 'fev/25', etc. (texto),
+    convertendo em datetime(2025,1,1), datetime(2025,2,1), etc.
+    Retorna None se não casar.
+    """
+    match = _RE_MES_ANO.match(col.strip().lower())
+    if match:
+        mes = MESES.get(match.group(1))
+        if mes:
+            return datetime(2000 + int(match.group(2)), mes, 1)
+    return None
+
+
+def colunas_mensais(colunas):
+    """
+    Colunas mensais de custo Real da aba administrativo, como lista de
+    (datetime, coluna) ordenada por mês.
+    """
+    info = []
+    for col in colunas:
+        if isinstance(col, str):
+            dt_parsed = parse_month_year(col)
+            if dt_parsed:
+                info.append((dt_parsed, col))
+    info.sort(key=lambda x: x[0])
+    return info
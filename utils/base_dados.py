@@ -0,0 +1,112 @@
+"""
+Leitura compartilhada da planilha base (base2025.xlsx).
+
+Cada aba é convertida uma única vez para um snapshot colunar (Parquet) em
+disco, identificado pela data de modificação + hash do arquivo. As leituras
+seguintes, de qualquer página ou processo, vêm direto do snapshot.
+"""
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+PASTA_SNAPSHOTS = ".snapshots"
+
+# (caminho, mtime, tamanho) -> versão, para não recalcular o hash a cada rerun
+_versoes = {}
+
+
+def versao_arquivo(caminho):
+    """
+    Retorna a versão do arquivo no formato "<mtime>-<hash>".
+    O hash só é recalculado quando a data de modificação ou o tamanho mudam.
+    """
+    stat = os.stat(caminho)
+    chave = (os.path.abspath(caminho), stat.st_mtime_ns, stat.st_size)
+    if chave not in _versoes:
+        sha = hashlib.sha1()
+        with open(caminho, "rb") as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                sha.update(bloco)
+        _versoes[chave] = f"{stat.st_mtime_ns}-{sha.hexdigest()[:16]}"
+    return _versoes[chave]
+
+
+def _pasta_snapshot(caminho, versao):
+    """Pasta dos snapshots de uma versão do arquivo (remove versões antigas)."""
+    raiz = os.path.join(os.path.dirname(os.path.abspath(caminho)), PASTA_SNAPSHOTS, os.path.basename(caminho))
+    pasta = os.path.join(raiz, versao)
+    if not os.path.isdir(pasta):
+        if os.path.isdir(raiz):
+            for antiga in os.listdir(raiz):
+                shutil.rmtree(os.path.join(raiz, antiga), ignore_errors=True)
+        os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def _gravar_snapshot(df, base):
+    """
+    Grava o snapshot em Parquet. Abas com colunas de tipos misturados
+    (ex.: "Unidade" com números e textos) não são aceitas pelo Arrow;
+    nesses casos o snapshot é gravado em pickle, preservando os valores.
+    A escrita é feita em arquivo temporário + rename para que outra sessão
+    nunca leia um snapshot pela metade.
+    """
+    for ext, gravar in ((".parquet", df.to_parquet), (".pkl", df.to_pickle)):
+        tmp = f"{base}{ext}.{os.getpid()}.tmp"
+        try:
+            gravar(tmp)
+        except (ImportError, ValueError, TypeError):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            continue
+        os.replace(tmp, base + ext)
+        return
+
+
+def ler_aba(caminho, aba, skiprows=0):
+    """
+    Lê a aba `aba` de `caminho`, usando o snapshot da versão atual do arquivo
+    quando existir. Na primeira leitura de cada versão a aba é lida pelo
+    openpyxl e o snapshot é criado.
+    """
+    pasta = _pasta_snapshot(caminho, versao_arquivo(caminho))
+    base = os.path.join(pasta, f"{aba}_{skiprows}")
+    if os.path.exists(base + ".parquet"):
+        df = pd.read_parquet(base + ".parquet")
+        # O Parquet devolve None nas colunas texto; o Excel devolve NaN
+        obj = df.columns[df.dtypes == object]
+        df[obj] = df[obj].where(df[obj].notna(), np.nan)
+        return df
+    if os.path.exists(base + ".pkl"):
+        return pd.read_pickle(base + ".pkl")
+    df = pd.read_excel(caminho, sheet_name=aba, skiprows=skiprows)
+    _gravar_snapshot(df, base)
+    return df
+
+
+if __name__ == "__main__":
+    # Benchmark: leitura direta do Excel x leitura pelo snapshot
+    # Uso: python -m utils.base_dados pages/base2025.xlsx
+    import sys
+    import time
+
+    caminho = sys.argv[1] if len(sys.argv) > 1 else os.path.join("pages", "base2025.xlsx")
+    abas = [("departamento", 0), ("engenharia", 0), ("grd_Listagem", 1),
+            ("administrativo", 0), ("calendariodechuvas", 0), ("NPS", 0)]
+
+    print(f"{'Aba':<20}{'Excel (s)':>12}{'Snapshot (s)':>15}{'Ganho':>10}")
+    for aba, skip in abas:
+        inicio = time.perf_counter()
+        df_excel = pd.read_excel(caminho, sheet_name=aba, skiprows=skip)
+        t_excel = time.perf_counter() - inicio
+
+        ler_aba(caminho, aba, skip)  # garante o snapshot criado
+        inicio = time.perf_counter()
+        df_snap = ler_aba(caminho, aba, skip)
+        t_snap = time.perf_counter() - inicio
+
+        pd.testing.assert_frame_equal(df_excel, df_snap)
+        print(f"{aba:<20}{t_excel:>12.4f}{t_snap:>15.4f}{t_excel / t_snap:>9.0f}x")
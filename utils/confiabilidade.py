@@ -0,0 +1,160 @@
+"""
+Métricas de confiabilidade (MTBF, MTTR e Disponibilidade) das solicitações
+de assistência técnica, por qualquer chave de agrupamento (Garantia
+Solicitada, Grupo/Sistema Construtivo, Empreendimento...).
+
+As datas são convertidas uma vez em colunas de horas e os agregados de cada
+grupo (última abertura, menor CVCO, horas de parada, ocorrências) saem de um
+único groupby().agg, sem funções Python por grupo ou por linha.
+"""
+import numpy as np
+import pandas as pd
+
+_HORA = np.timedelta64(1, "h")
+
+
+def _horas(datas):
+    """Datas como horas desde 1970 (float), com NaN no lugar de NaT."""
+    datas = pd.to_datetime(datas, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    return (datas - np.datetime64("1970-01-01", "ns")) / _HORA
+
+
+def agregados(df, chave):
+    """
+    Agregados por `chave` (coluna ou lista de colunas) usados nas métricas:
+      - abertura_max / cvco_min: última "Data de Abertura" e menor "Data CVCO", em horas;
+      - parada: soma das horas de (Encerramento - Data de Abertura);
+      - reparo: soma de "Tempo de Encerramento" (dias) x 24 das solicitações encerradas;
+      - ocorrencias / encerradas: nº de solicitações e de solicitações com Encerramento.
+    Chaves nulas ficam de fora, como no groupby padrão.
+    """
+    abertura = _horas(df["Data de Abertura"])
+    encerramento = _horas(df["Encerramento"])
+    encerrada = ~np.isnan(encerramento)
+    if "Tempo de Encerramento" in df.columns:
+        reparo = pd.to_numeric(df["Tempo de Encerramento"], errors="coerce").to_numpy(dtype=float) * 24
+    else:
+        reparo = np.full(len(df), np.nan)
+    chaves = [chave] if isinstance(chave, str) else list(chave)
+    horas = pd.DataFrame({
+        **{c: df[c].to_numpy() for c in chaves},
+        "abertura": abertura,
+        "cvco": _horas(df["Data CVCO"]),
+        "parada": encerramento - abertura,
+        "reparo": np.where(encerrada, reparo, np.nan),
+        "encerrada": encerrada,
+    })
+    for c in chaves:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            horas[c] = horas[c].astype(df[c].dtype)
+    return horas.groupby(chave, observed=True).agg(
+        abertura_max=("abertura", "max"),
+        cvco_min=("cvco", "min"),
+        parada=("parada", "sum"),
+        reparo=("reparo", "sum"),
+        ocorrencias=("abertura", "size"),
+        encerradas=("encerrada", "sum"),
+    )
+
+
+def metricas_confiabilidade(df, chave):
+    """
+    MTBF, MTTR e Disponibilidade por `chave`, como na página Sistemas Construtivos:
+      - MTBF: (horas entre a menor Data CVCO e a última abertura - horas de parada) / ocorrências;
+      - MTTR: horas de parada / ocorrências;
+      - Disponibilidade: MTBF / (MTBF + MTTR) x 100 (NaN quando a soma não é positiva).
+    """
+    a = agregados(df, chave)
+    mtbf = (a["abertura_max"] - a["cvco_min"] - a["parada"]) / a["ocorrencias"]
+    mttr = a["parada"] / a["ocorrencias"]
+    soma = mtbf + mttr
+    return pd.DataFrame({
+        "MTBF": mtbf,
+        "MTTR": mttr,
+        "Disponibilidade": (mtbf / soma * 100).where(soma > 0),
+    })
+
+
+def metricas_garantia(df, chave="Garantia Solicitada"):
+    """
+    MTBF, MTTR e Disponibilidade por `chave`, como no Painel de Assistência Técnica:
+      - MTBF: horas entre a menor Data CVCO e a última abertura / ocorrências;
+      - MTTR: "Tempo de Encerramento" x 24 das encerradas / nº de encerradas;
+      - Disponibilidade: MTBF / (MTBF + MTTR) x 100.
+    """
+    a = agregados(df, chave)
+    mtbf = (a["abertura_max"] - a["cvco_min"]) / a["ocorrencias"]
+    mttr = a["reparo"] / a["encerradas"].where(a["encerradas"] > 0)
+    return pd.DataFrame({
+        "MTBF": mtbf,
+        "MTTR": mttr,
+        "Disponibilidade": mtbf / (mtbf + mttr) * 100,
+    })
+
+
+if __name__ == "__main__":
+    # Benchmark: groupby().apply (versão anterior) x groupby().agg
+    # Uso: python -m utils.confiabilidade [linhas]
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    grupos = np.array([f"Sistema {i:03d}" for i in range(200)], dtype=object)
+    abertura = pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 2500 * 24, n), unit="h")
+    duracao = pd.to_timedelta(rng.integers(1, 90 * 24, n), unit="h")
+    df = pd.DataFrame({
+        "Garantia Solicitada": grupos[rng.integers(0, len(grupos), n)],
+        "Data de Abertura": abertura,
+        "Encerramento": (abertura + duracao).where(rng.random(n) < 0.8),
+        "Data CVCO": pd.Timestamp("2017-01-01") + pd.to_timedelta(rng.integers(0, 700, n), unit="D"),
+    })
+    df["Tempo de Encerramento"] = (df["Encerramento"] - df["Data de Abertura"]).dt.days
+
+    def compute_metrics(group):
+        """Versão anterior da página Sistemas Construtivos, usada como referência."""
+        available_hours = (group["Data de Abertura"].max() - group["Data CVCO"].min()).total_seconds() / 3600
+        downtime_hours = group.apply(lambda row: (row["Encerramento"] - row["Data de Abertura"]).total_seconds() / 3600, axis=1).sum()
+        occurrences = group.shape[0]
+        mtbf = (available_hours - downtime_hours) / occurrences
+        mttr = downtime_hours / occurrences
+        dispon = (mtbf / (mtbf + mttr)) * 100 if (mtbf + mttr) > 0 else np.nan
+        return pd.Series({"MTBF": mtbf, "MTTR": mttr, "Disponibilidade": dispon})
+
+    def compute_mtbf(group):
+        """Versão anterior do Painel de Assistência Técnica, usada como referência."""
+        if group["Data CVCO"].isnull().all():
+            return np.nan
+        op_hours = (group["Data de Abertura"].max() - group["Data CVCO"].min()).total_seconds() / 3600
+        return op_hours / group.shape[0]
+
+    def compute_mttr(group):
+        closed = group[group["Encerramento"].notna()]
+        if closed.empty:
+            return np.nan
+        return closed["Tempo de Encerramento"].sum() * 24 / closed.shape[0]
+
+    chave = "Garantia Solicitada"
+    print(f"Linhas: {n:,}")
+
+    inicio = time.perf_counter()
+    metricas = metricas_garantia(df, chave)
+    t_agg = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    mtbf = df.groupby(chave).apply(compute_mtbf)
+    mttr = df.groupby(chave).apply(compute_mttr)
+    t_apply = time.perf_counter() - inicio
+    np.testing.assert_allclose(metricas["MTBF"], mtbf)
+    np.testing.assert_allclose(metricas["MTTR"], mttr)
+    print(f"Assistência  apply {t_apply:8.3f} s   agg {t_agg:8.3f} s  ({t_apply / t_agg:.0f}x)")
+
+    # A versão por linha é lenta demais para 1M de linhas: mede uma amostra e extrapola
+    amostra = df.iloc[:min(n, 50_000)]
+    inicio = time.perf_counter()
+    metricas = metricas_confiabilidade(df, chave)
+    t_agg = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    referencia = amostra.groupby(chave).apply(compute_metrics)
+    t_apply = (time.perf_counter() - inicio) * n / len(amostra)
+    np.testing.assert_allclose(metricas_confiabilidade(amostra, chave).to_numpy(), referencia.to_numpy())
+    print(f"Sistemas     apply {t_apply:8.3f} s*  agg {t_agg:8.3f} s  ({t_apply / t_agg:.0f}x)  * estimado")
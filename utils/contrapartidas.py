@@ -0,0 +1,280 @@
+"""
+Armazenamento das contrapartidas (página Contrapartidas) em SQLite.
+
+Cada edição grava só as linhas alteradas (upsert por "id"), em vez de
+reescrever o contrapartidas.csv inteiro. As edições enviam só os campos
+alterados e a renumeração dos códigos é feita sobre o banco, dentro da
+transação de escrita, para que sessões simultâneas não sobrescrevam as
+alterações umas das outras.
+O CSV continua sendo o formato de troca: na primeira execução o banco é
+preenchido a partir dele (uma única vez, marcado na tabela "meta"), e pode
+ser reexportado a qualquer momento.
+"""
+import datetime
+import os
+
+import pandas as pd
+from sqlalchemy import (Column, Float, Index, Integer, MetaData, Table, Text, bindparam,
+                        create_engine, delete, event, func, insert, select)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+ARQUIVO_BANCO = "contrapartidas.db"
+ARQUIVO_CSV = "contrapartidas.csv"
+
+COLUNAS_DATA = ["Data Início Contrapartida (Previsto)", "Data Término Contrapartida (Previsto)"]
+
+_metadata = MetaData()
+tabela = Table(
+    "contrapartidas", _metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("id_pai", Integer),
+    Column("codigo_sequencia", Text),
+    Column("Status", Text),
+    Column("Projeto", Text),
+    Column("Tipo de Serviço", Text),
+    Column("Data Início Obra (Prevista)", Text),
+    Column("Data Entrega Obra (Prevista)", Text),
+    Column("Limite p/ Contratação", Text),
+    Column("Data Início Contrapartida (Previsto)", Text),
+    Column("Data Início Contrapartida (Real)", Text),
+    Column("Data Término Contrapartida (Previsto)", Text),
+    Column("Data Término Contrapartida (Real)", Text),
+    Column("Valor Viabilidade", Float),
+    Column("Orçamento", Float),
+    Column("% Execução", Float),
+    Column("Gasto Real", Float),
+    Column("Comentários", Text),
+    Column("Modo de Medição", Text),
+    Index("ix_contrapartidas_id_pai", "id_pai"),
+    Index("ix_contrapartidas_projeto", "Projeto"),
+)
+COLUNAS_BANCO = [c.name for c in tabela.columns]
+
+# Marcas do banco; CHAVE_IMPORTACAO existe depois que o CSV foi importado uma vez
+meta = Table(
+    "meta", _metadata,
+    Column("chave", Text, primary_key=True),
+    Column("valor", Text),
+)
+CHAVE_IMPORTACAO = "csv_importado"
+
+# caminho do banco -> engine, uma por processo
+_engines = {}
+
+
+def _engine(caminho):
+    caminho = os.path.abspath(caminho)
+    if caminho not in _engines:
+        engine = create_engine(f"sqlite:///{caminho}", connect_args={"timeout": 30})
+
+        @event.listens_for(engine, "connect")
+        def _conectar(conexao, _):
+            # O pysqlite só abre a transação antes de INSERT/UPDATE/DELETE; o BEGIN fica com o evento abaixo
+            conexao.isolation_level = None
+            # WAL: leitores não bloqueiam a escrita de outra sessão
+            conexao.execute("PRAGMA journal_mode=WAL")
+
+        @event.listens_for(engine, "begin")
+        def _begin(conexao):
+            # Escritas pegam a trava já no BEGIN: o que é lido na transação não muda até o commit
+            escrita = conexao.get_execution_options().get("escrita", False)
+            conexao.exec_driver_sql("BEGIN IMMEDIATE" if escrita else "BEGIN")
+
+        _metadata.create_all(engine)
+        _engines[caminho] = engine
+    return _engines[caminho]
+
+
+def _escrita(caminho):
+    """Transação de escrita (BEGIN IMMEDIATE) no banco `caminho`."""
+    return _engine(caminho).execution_options(escrita=True).begin()
+
+
+def _valor(valor):
+    """Converte um valor do DataFrame para o tipo gravado no banco (datas em ISO)."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, (datetime.date, pd.Timestamp)):
+        return valor.strftime("%Y-%m-%d")
+    if hasattr(valor, "item"):  # escalares numpy
+        return valor.item()
+    return valor
+
+
+def _registros(df, colunas):
+    colunas = [c for c in colunas if c in df.columns]
+    return [{c: _valor(v) for c, v in zip(colunas, linha)}
+            for linha in df[colunas].itertuples(index=False, name=None)]
+
+
+def _importar(conexao, caminho_csv):
+    df = pd.read_csv(caminho_csv, sep=";", dtype={"codigo_sequencia": str})
+    for col in ("id", "id_pai"):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+    conexao.execute(delete(tabela))
+    registros = _registros(df, COLUNAS_BANCO)
+    if registros:
+        conexao.execute(insert(tabela), registros)
+    _marcar_importacao(conexao)
+
+
+def _marcar_importacao(conexao):
+    agora = datetime.datetime.now().isoformat(timespec="seconds")
+    conexao.execute(sqlite_insert(meta).values(chave=CHAVE_IMPORTACAO, valor=agora).on_conflict_do_nothing())
+
+
+def _importado(conexao):
+    return conexao.execute(select(meta.c.valor).where(meta.c.chave == CHAVE_IMPORTACAO)).first() is not None
+
+
+def importar_csv(caminho_csv=ARQUIVO_CSV, caminho_banco=ARQUIVO_BANCO):
+    """Substitui o conteúdo do banco pelo CSV (separador ';'), preservando os ids."""
+    with _escrita(caminho_banco) as conexao:
+        _importar(conexao, caminho_csv)
+
+
+def exportar_csv(caminho_csv=ARQUIVO_CSV, caminho_banco=ARQUIVO_BANCO):
+    """Grava o conteúdo do banco no formato do contrapartidas.csv."""
+    with _engine(caminho_banco).connect() as conexao:
+        df = pd.read_sql(select(tabela).order_by(tabela.c.id), conexao)
+    df.to_csv(caminho_csv, index=False, sep=";")
+
+
+def carregar(caminho_banco=ARQUIVO_BANCO, caminho_csv=ARQUIVO_CSV):
+    """
+    Lê todas as contrapartidas, na ordem de inclusão. Na primeira execução
+    (banco sem a marca de importação), o CSV, se existir, é importado antes
+    para um banco vazio. Depois disso o banco é a fonte: se todas as linhas
+    forem excluídas, ele continua vazio.
+    """
+    engine = _engine(caminho_banco)
+    with engine.connect() as conexao:
+        importado = _importado(conexao)
+    if not importado:
+        with _escrita(caminho_banco) as conexao:
+            # Outra sessão pode ter importado entre a leitura e a trava
+            if not _importado(conexao):
+                vazio = conexao.execute(select(func.count()).select_from(tabela)).scalar() == 0
+                if vazio and os.path.exists(caminho_csv):
+                    _importar(conexao, caminho_csv)
+                else:
+                    _marcar_importacao(conexao)
+    with engine.connect() as conexao:
+        return _ler(conexao)
+
+
+def _ler(conexao):
+    df = pd.read_sql(select(tabela).order_by(tabela.c.id), conexao)
+    for col in COLUNAS_DATA:
+        df[col] = pd.to_datetime(df[col], format="%Y-%m-%d", errors="coerce").dt.date
+    return df
+
+
+def inserir(registro, caminho_banco=ARQUIVO_BANCO):
+    """Inclui uma linha e devolve o "id" gerado."""
+    valores = {c: _valor(v) for c, v in registro.items() if c in COLUNAS_BANCO and c != "id"}
+    with _escrita(caminho_banco) as conexao:
+        return conexao.execute(insert(tabela).values(**valores)).inserted_primary_key[0]
+
+
+def salvar(df, colunas=None, caminho_banco=ARQUIVO_BANCO):
+    """
+    Grava as linhas de `df` (upsert por "id"). Com `colunas`, só esses campos
+    são atualizados, sem tocar no restante da linha.
+    """
+    if df.empty:
+        return
+    colunas = [c for c in (colunas or COLUNAS_BANCO) if c != "id"]
+    comando = sqlite_insert(tabela)
+    comando = comando.on_conflict_do_update(
+        index_elements=[tabela.c.id],
+        set_={c: comando.excluded[c] for c in colunas if c in df.columns},
+    )
+    with _escrita(caminho_banco) as conexao:
+        conexao.execute(comando, _registros(df, ["id"] + colunas))
+
+
+def salvar_alteracoes(antes, depois, caminho_banco=ARQUIVO_BANCO):
+    """
+    Grava só os campos de `depois` que mudaram em relação a `antes` (as
+    mesmas linhas antes da edição, alinhadas pelo índice). Os demais campos
+    não são enviados, então alterações de outra sessão neles são mantidas.
+    Linhas com os mesmos campos alterados vão em um único upsert.
+    """
+    colunas = [c for c in COLUNAS_BANCO if c != "id" and c in depois.columns]
+    antes = antes.reindex(index=depois.index, columns=colunas)
+    alterados = {}
+    for idx in depois.index:
+        campos = tuple(c for c in colunas if _valor(antes.at[idx, c]) != _valor(depois.at[idx, c]))
+        if campos:
+            alterados.setdefault(campos, []).append(idx)
+    for campos, idxs in alterados.items():
+        salvar(depois.loc[idxs], list(campos), caminho_banco)
+
+
+def excluir(ids, caminho_banco=ARQUIVO_BANCO):
+    """Remove as linhas com os "id" informados."""
+    ids = [int(i) for i in ids if pd.notna(i)]
+    if ids:
+        with _escrita(caminho_banco) as conexao:
+            conexao.execute(delete(tabela).where(tabela.c.id.in_(ids)))
+
+
+def renumerar_codigos(df):
+    """
+    Novos "codigo_sequencia" de `df`, na mesma regra da página:
+      - etapas (sem id_pai) recebem 1, 2, 3... na ordem do índice;
+      - subetapas recebem "<código da etapa>.1", ".2"... na ordem do código
+        atual, usando a última etapa com o mesmo nome de Projeto;
+      - subetapas sem etapa correspondente mantêm o código.
+    """
+    codigos = df["codigo_sequencia"].astype(object).copy()
+    sub = df["id_pai"].notnull()
+
+    etapas = df.index[~sub].sort_values()
+    codigos.loc[etapas] = [str(i) for i in range(1, len(etapas) + 1)]
+    codigo_etapa = pd.Series(codigos[etapas].to_numpy(), index=df.loc[etapas, "Projeto"].to_numpy())
+    codigo_etapa = codigo_etapa[~codigo_etapa.index.duplicated(keep="last")]
+
+    subs = df.loc[sub & df["Projeto"].isin(codigo_etapa.index), ["Projeto", "codigo_sequencia"]]
+    subs = subs.sort_values("codigo_sequencia", kind="stable")
+    ordem = subs.groupby("Projeto", sort=False).cumcount() + 1
+    # astype(str) nos dois lados: sem subetapas (ou sem etapas) o map volta vazio como float
+    codigos.loc[subs.index] = subs["Projeto"].map(codigo_etapa).astype(str) + "." + ordem.astype(str)
+    return codigos
+
+
+def renumerar(caminho_banco=ARQUIVO_BANCO):
+    """
+    Aplica `renumerar_codigos` às linhas atuais do banco e grava os códigos
+    que mudaram. Leitura e gravação ficam na mesma transação de escrita:
+    duas sessões renumerando ao mesmo tempo são serializadas e cada uma parte
+    do estado já gravado pela outra, sem códigos repetidos. Retorna as
+    contrapartidas atualizadas, como `carregar`.
+    """
+    with _escrita(caminho_banco) as conexao:
+        df = _ler(conexao)
+        codigos = renumerar_codigos(df)
+        mudou = (codigos.astype(str) != df["codigo_sequencia"].astype(str)).to_numpy()
+        if mudou.any():
+            conexao.execute(
+                tabela.update().where(tabela.c.id == bindparam("_id")),
+                [{"_id": int(i), "codigo_sequencia": c}
+                 for i, c in zip(df.loc[mudou, "id"], codigos[mudou])],
+            )
+    df["codigo_sequencia"] = codigos
+    return df
+
+
+if __name__ == "__main__":
+    # Uso: python -m utils.contrapartidas importar|exportar [contrapartidas.csv]
+    import sys
+
+    acao = sys.argv[1] if len(sys.argv) > 1 else "exportar"
+    csv = sys.argv[2] if len(sys.argv) > 2 else ARQUIVO_CSV
+    if acao == "importar":
+        importar_csv(csv)
+    else:
+        exportar_csv(csv)
+    print(f"{acao}: {csv} <-> {ARQUIVO_BANCO}")
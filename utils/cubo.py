@@ -0,0 +1,36 @@
+"""
+Recorte de cubos agregados (Series com MultiIndex), compartilhado pelo cubo
+de chamados (utils/cubo_chamados.py) e pelo cubo da GRD (utils/cubo_grd.py).
+
+Um cubo tem um nível COL_MES com o mês como pd.Period mensal; os filtros
+de Ano e Mês das páginas saem desse nível. Os demais filtros usam o nível
+de mesmo nome.
+"""
+import numpy as np
+import pandas as pd
+
+COL_MES = "AnoMes"
+
+
+def fatiar(cubo, selecoes):
+    """
+    Recorte do cubo pelas `selecoes` ({coluna: valores}), onde cada coluna é
+    um nível do cubo, "Ano" ou "Mês". Como em utils/filtros.py, cada seleção
+    é resolvida nos níveis (poucos valores) e aplicada pelos códigos inteiros
+    do MultiIndex; seleções vazias não filtram.
+    """
+    indice = cubo.index
+    mascara = np.ones(len(cubo), dtype=bool)
+    for coluna, valores in selecoes.items():
+        if not valores:
+            continue
+        posicao = indice.names.index(COL_MES if coluna in ("Ano", "Mês") else coluna)
+        nivel = indice.levels[posicao]
+        if coluna == "Ano":
+            nivel = pd.Index(nivel.year)
+        elif coluna == "Mês":
+            nivel = pd.Index(nivel.month)
+        # Uma posição a mais no fim: o código -1 (nulo) nunca é selecionado
+        escolhidas = np.append(np.asarray(nivel.isin(list(valores))), False)
+        mascara &= escolhidas[indice.codes[posicao]]
+    return cubo[mascara]
@@ -0,0 +1,131 @@
+"""
+Cubo mensal de chamados do Painel de Assistência Técnica: contagem por
+mês (pd.Period) x Empreendimento x Sistema Construtivo x Status.
+
+O cubo é montado uma vez por versão da planilha e atende os gráficos
+mensais da página e a correlação com a chuva: os filtros dessas dimensões
+(e de Ano/Mês, que saem do período) viram um recorte do cubo, sem refazer
+o groupby das solicitações a cada rerun (recorte com utils.cubo.fatiar).
+"""
+import numpy as np
+import pandas as pd
+
+from utils.cubo import COL_MES, fatiar
+
+DIMENSOES = [COL_MES, "Empreendimento", "Sistema Construtivo", "Status"]
+# Filtros da página que o cubo consegue atender sozinho
+FILTROS_CUBO = {"Ano", "Mês", "Empreendimento", "Sistema Construtivo", "Status"}
+DEFASAGENS = range(4)
+
+
+def montar_cubo(df):
+    """
+    Contagem de chamados por DIMENSOES a partir de `df` ("Data de Abertura",
+    "Empreendimento", "Sistema Construtivo", "Status"). O mês é um
+    pd.Period mensal; chamados sem data de abertura ficam de fora e valores
+    nulos nas demais dimensões são mantidos como NaN.
+    """
+    mes = pd.PeriodIndex(pd.to_datetime(df["Data de Abertura"], errors="coerce"), freq="M")
+    dados = df[DIMENSOES[1:]].assign(**{COL_MES: mes})[~mes.isna()]
+    return dados.groupby(DIMENSOES, observed=True, dropna=False).size().rename("Chamados")
+
+
+def atende(selecoes):
+    """True se todos os filtros ativos em `selecoes` são dimensões do cubo."""
+    return all(coluna in FILTROS_CUBO for coluna, valores in selecoes.items() if valores)
+
+
+def chamados_por_mes(cubo, por=None, completar=False):
+    """
+    Chamados por mês (Series com PeriodIndex) ou, com `por`, uma tabela
+    mês x `por`. Traz só os meses com chamados, em ordem; com `completar`,
+    todos os meses do primeiro ao último (meses sem chamados valem 0).
+    """
+    if por is None:
+        meses = cubo.index.levels[0]
+        contagem = np.bincount(cubo.index.codes[0], weights=cubo.to_numpy(), minlength=len(meses))
+        agregado = pd.Series(contagem.astype(np.int64), index=meses, name="Chamados")[contagem > 0]
+    else:
+        agregado = cubo.groupby(level=[COL_MES, por], observed=True).sum().unstack(por, fill_value=0)
+    if completar and len(agregado):
+        periodo = pd.period_range(agregado.index.min(), agregado.index.max(), freq="M", name=COL_MES)
+        agregado = agregado.reindex(periodo, fill_value=0)
+    return agregado
+
+
+def chuva_mensal(df_chuva):
+    """Chuva acumulada (mm) por mês, como Series com PeriodIndex, a partir de "AnoMes" ("AAAA-MM") e "Chuva"."""
+    if not {"AnoMes", "Chuva"} <= set(df_chuva.columns):
+        return pd.Series(dtype=float, index=pd.PeriodIndex([], freq="M", name=COL_MES))
+    meses = pd.PeriodIndex(pd.to_datetime(df_chuva["AnoMes"], format="%Y-%m", errors="coerce"), freq="M")
+    chuva = pd.Series(pd.to_numeric(df_chuva["Chuva"], errors="coerce").to_numpy(), index=meses)
+    chuva = chuva[~meses.isna()].dropna()
+    return chuva.groupby(level=0).mean().rename_axis(COL_MES)
+
+
+def correlacao_chuva(cubo, chuva, por="Sistema Construtivo", defasagens=DEFASAGENS, minimo_meses=12):
+    """
+    Correlação de Pearson entre os chamados do mês de cada `por` (e do
+    total) e a chuva de `d` meses antes, para cada defasagem `d`. Meses sem
+    chamados entram como 0 e só contam os meses com chuva registrada;
+    correlações com menos de `minimo_meses` pares ficam NaN. Retorna uma
+    linha por valor de `por` (mais "Total"), com "Chamados" e uma coluna
+    "Defasagem d" por defasagem.
+    """
+    tabela = chamados_por_mes(cubo, por, completar=True)
+    if tabela.empty:
+        return pd.DataFrame(columns=["Chamados", *[f"Defasagem {d}" for d in defasagens]])
+    tabela = tabela.loc[:, tabela.sum() > 0]
+    tabela["Total"] = tabela.sum(axis=1)
+    resultado = {"Chamados": tabela.sum()}
+    for d in defasagens:
+        # Chuva de d meses antes, alinhada ao mês dos chamados
+        anterior = chuva.reindex(tabela.index - d).to_numpy()
+        pares = ~np.isnan(anterior)
+        if pares.sum() < minimo_meses:
+            resultado[f"Defasagem {d}"] = pd.Series(np.nan, index=tabela.columns)
+            continue
+        resultado[f"Defasagem {d}"] = tabela[pares].corrwith(pd.Series(anterior[pares], index=tabela.index[pares]))
+    return pd.DataFrame(resultado).sort_values("Chamados", ascending=False)
+
+
+if __name__ == "__main__":
+    # Benchmark: groupby das solicitações filtradas a cada rerun x recorte do cubo
+    # Uso: python -m utils.cubo_chamados [linhas]
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Data de Abertura": pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3650, n), unit="D"),
+        "Empreendimento": np.array([f"Residencial {i}" for i in range(40)], dtype=object)[rng.integers(0, 40, n)],
+        "Sistema Construtivo": pd.Categorical(np.array([f"Sistema {i}" for i in range(80)])[rng.integers(0, 80, n)]),
+        "Status": np.array(["Concluída", "Improcedente", "Em andamento", "Nova"], dtype=object)[rng.integers(0, 4, n)],
+    })
+    chuva = pd.DataFrame({"AnoMes": pd.period_range("2014-01", "2024-12", freq="M").astype(str),
+                          "Chuva": rng.gamma(2, 60, 132).round(1)})
+    selecoes = {"Empreendimento": ["Residencial 1", "Residencial 7"], "Status": ["Concluída"]}
+
+    inicio = time.perf_counter()
+    cubo = montar_cubo(df)
+    t_cubo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    filtrado = df[df["Empreendimento"].isin(selecoes["Empreendimento"]) & df["Status"].isin(selecoes["Status"])].copy()
+    filtrado["AnoMes"] = filtrado["Data de Abertura"].dt.to_period("M").astype(str)
+    referencia = filtrado.groupby("AnoMes").size()
+    t_groupby = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    serie = chamados_por_mes(fatiar(cubo, selecoes))
+    t_recorte = time.perf_counter() - inicio
+
+    assert (serie.to_numpy() == referencia.to_numpy()).all()
+    inicio = time.perf_counter()
+    correlacao = correlacao_chuva(cubo, chuva_mensal(chuva))
+    t_corr = time.perf_counter() - inicio
+    print(f"Linhas: {n:,}  |  cubo: {len(cubo):,} células, montado em {t_cubo:.3f} s (uma vez por versão)")
+    print(f"groupby a cada rerun: {t_groupby:8.4f} s")
+    print(f"recorte do cubo:      {t_recorte:8.4f} s  ({t_groupby / t_recorte:.0f}x)")
+    print(f"correlação com a chuva ({len(correlacao) - 1} sistemas x {len(DEFASAGENS)} defasagens): {t_corr:.4f} s")
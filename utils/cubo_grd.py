@@ -0,0 +1,99 @@
+"""
+Cubo dos lançamentos da GRD (aba grd_Listagem) para a consulta de gastos
+apropriados da página Financeiro: "Valor Conv." somado por empreendimento
+(código), mês do documento (pd.Period), projeto, grupo de orçamento e
+serviço.
+
+O cubo é montado uma vez por versão da planilha. Os filtros da consulta
+nessas dimensões (Ano/Mês saem do período) viram um recorte pelos códigos
+do MultiIndex (utils.cubo.fatiar); o total, os gastos mensais e os gastos
+por grupo saem do recorte, sem copiar e reagrupar a listagem a cada
+clique. O item fica fora do cubo: com ele o cubo teria quase uma célula
+por lançamento. Um filtro de item (ver `atende`) pede um cubo montado só
+com os lançamentos filtrados.
+"""
+import pandas as pd
+
+from utils.cubo import COL_MES, fatiar
+from utils.financeiro import COL_CODIGO, COL_VALOR
+
+DIMENSOES_GRD = [COL_CODIGO, COL_MES, "Descrição Projeto", "Descrição Grupo", "Derscrição Serviço"]
+# Filtros da consulta que o cubo consegue atender sozinho
+FILTROS_CUBO_GRD = {COL_CODIGO, "Ano", "Mês", "Descrição Projeto", "Descrição Grupo", "Derscrição Serviço"}
+
+
+def montar_cubo_grd(df_grd):
+    """
+    Soma de COL_VALOR por DIMENSOES_GRD. O mês vem de "Data Documento";
+    lançamentos sem data ou com dimensões nulas são mantidos (nível nulo),
+    para que o total sem filtros continue igual ao da listagem.
+    """
+    mes = pd.PeriodIndex(pd.to_datetime(df_grd["Data Documento"], errors="coerce"), freq="M")
+    dados = df_grd[[c for c in DIMENSOES_GRD if c != COL_MES] + [COL_VALOR]].assign(**{COL_MES: mes})
+    return dados.groupby(DIMENSOES_GRD, observed=True, dropna=False)[COL_VALOR].sum()
+
+
+def atende(selecoes):
+    """True se todos os filtros ativos em `selecoes` são dimensões do cubo."""
+    return all(coluna in FILTROS_CUBO_GRD for coluna, valores in selecoes.items() if valores)
+
+
+def valor_por(cubo, nivel):
+    """Soma de COL_VALOR por `nivel` do cubo (valores nulos do nível ficam de fora)."""
+    return cubo.groupby(level=nivel, observed=True).sum()
+
+
+if __name__ == "__main__":
+    # Benchmark de uma interação da consulta: cópia + cadeia de isin + groupbys
+    # na listagem (versão anterior) x recorte do cubo + agregações no recorte
+    # Uso: python -m utils.cubo_grd [linhas]
+    import sys
+    import time
+
+    import numpy as np
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = np.random.default_rng(0)
+    # Como na grd_Listagem: o projeto acompanha a obra, o serviço acompanha o grupo,
+    # poucos grupos concentram os lançamentos e os itens são muitos
+    obra = rng.integers(0, 30, n)
+    grupo = (rng.zipf(1.6, n) - 1) % 90
+    df = pd.DataFrame({
+        COL_CODIGO: np.array([f"OBRA{i:02d}" for i in range(30)], dtype=object)[obra],
+        "Data Documento": pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 2200, n), unit="D"),
+        "Descrição Projeto": np.array([f"Projeto {i}" for i in range(5)], dtype=object)[obra % 5],
+        "Descrição Grupo": np.array([f"Grupo {i}" for i in range(90)], dtype=object)[grupo],
+        "Derscrição Serviço": np.array([f"Serviço {i}" for i in range(6)], dtype=object)[grupo % 6],
+        "Descrição Item": np.array([f"Item {i}" for i in range(2000)], dtype=object)[rng.zipf(1.2, n) % 2000],
+        COL_VALOR: rng.gamma(2, 800, n).round(2),
+    })
+    filtros = {COL_CODIGO: ["OBRA01", "OBRA02", "OBRA03"], "Ano": [2021, 2022],
+               "Descrição Projeto": ["Projeto 0", "Projeto 1", "Projeto 2"]}
+
+    inicio = time.perf_counter()
+    cubo = montar_cubo_grd(df)
+    t_cubo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    filtrado = df.copy()
+    filtrado = filtrado[filtrado[COL_CODIGO].isin(filtros[COL_CODIGO])]
+    filtrado = filtrado[filtrado["Data Documento"].dt.year.isin(filtros["Ano"])]
+    filtrado = filtrado[filtrado["Descrição Projeto"].isin(filtros["Descrição Projeto"])]
+    total_ref = filtrado[COL_VALOR].sum()
+    mes_ref = filtrado.groupby(filtrado["Data Documento"].dt.to_period("M").dt.to_timestamp())[COL_VALOR].sum()
+    grupo_ref = filtrado.groupby("Descrição Grupo")[COL_VALOR].sum().sort_values(ascending=False)
+    t_listagem = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    recorte = fatiar(cubo, filtros)
+    total = recorte.sum()
+    por_mes = valor_por(recorte, COL_MES)
+    por_grupo = valor_por(recorte, "Descrição Grupo").sort_values(ascending=False)
+    t_recorte = time.perf_counter() - inicio
+
+    np.testing.assert_allclose(total, total_ref)
+    np.testing.assert_allclose(por_mes.to_numpy(), mes_ref.to_numpy())
+    np.testing.assert_allclose(por_grupo.sort_index().to_numpy(), grupo_ref.sort_index().to_numpy())
+    print(f"Linhas: {n:,}  |  cubo: {len(cubo):,} células, montado em {t_cubo:.3f} s (uma vez por versão)")
+    print(f"Listagem (cópia + isin + groupby): {t_listagem:8.4f} s")
+    print(f"Recorte do cubo + agregações:      {t_recorte:8.4f} s  ({t_listagem / t_recorte:.0f}x)")
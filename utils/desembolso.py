@@ -0,0 +1,127 @@
+"""
+Cronograma de desembolso mensal das etapas (página Contrapartidas).
+
+Um único cálculo atende a tela, o "Salvar Versão" e a exportação em Excel:
+as distribuições percentuais de todas as etapas são empilhadas em um só
+DataFrame, normalizadas por etapa e convertidas em parcelas. Os meses ficam
+como pd.Period mensal, que já ordena corretamente; o texto "MM/AAAA" só é
+gerado na exibição (`formatar_meses`).
+"""
+import numpy as np
+import pandas as pd
+
+COL_MES = "Mês"
+COL_PERCENTUAL = "Percentual (%)"
+COL_PARCELA = "Parcela (R$)"
+FORMATO_MES = "%m/%Y"
+
+# Curvas padrão de desembolso: fração acumulada F(t) do orçamento no instante
+# t ∈ [0, 1] da etapa; o percentual do mês k de n é F((k+1)/n) - F(k/n)
+CURVAS = {
+    "Uniforme": lambda t: t,
+    "Curva S": lambda t: t * t * (3 - 2 * t),
+    "Antecipada": lambda t: 1 - (1 - t) ** 2,
+    "Postergada": lambda t: t * t,
+}
+
+
+def distribuicao_padrao(etapas, curva="Uniforme"):
+    """
+    Distribuição mensal padrão de todas as `etapas` de uma vez.
+
+    `etapas` tem "codigo_sequencia", "Data Início Contrapartida (Previsto)",
+    "Data Término Contrapartida (Previsto)" e, opcionalmente, "Orçamento".
+    Cada etapa ocupa todos os meses do início ao término (ao menos um) e os
+    percentuais seguem `curva` (chave de CURVAS), com 1 casa decimal.
+    Retorna uma tabela longa com "Codigo", "Mês" ("MM/AAAA"),
+    "Percentual (%)" e "Parcela (R$)". Etapas sem datas ficam de fora.
+    """
+    inicio = pd.to_datetime(etapas["Data Início Contrapartida (Previsto)"], errors="coerce")
+    fim = pd.to_datetime(etapas["Data Término Contrapartida (Previsto)"], errors="coerce")
+    validas = (inicio.notna() & fim.notna()).to_numpy()
+    mes_inicio = (inicio.dt.year * 12 + inicio.dt.month - 1).to_numpy()[validas].astype(np.int64)
+    mes_fim = (fim.dt.year * 12 + fim.dt.month - 1).to_numpy()[validas].astype(np.int64)
+    n = np.maximum(mes_fim - mes_inicio + 1, 1)
+
+    # Uma linha por (etapa, mês): posição k do mês dentro da etapa, sem loops
+    etapa = np.repeat(np.arange(len(n)), n)
+    k = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    if curva == "Uniforme":
+        # 100 / n exato, como na divisão manual (a diferença de F pode arredondar diferente)
+        percentual = np.round(100 / n[etapa], 1)
+    else:
+        F = CURVAS[curva]
+        percentual = np.round((F((k + 1) / n[etapa]) - F(k / n[etapa])) * 100, 1)
+
+    orcamento = etapas["Orçamento"] if "Orçamento" in etapas.columns else pd.Series(0, index=etapas.index)
+    orcamento = pd.to_numeric(orcamento, errors="coerce").fillna(0).to_numpy()[validas]
+    meses = pd.PeriodIndex.from_ordinals(mes_inicio[etapa] + k - (1970 * 12), freq="M")
+    return pd.DataFrame({
+        "Codigo": etapas["codigo_sequencia"].astype(str).to_numpy()[validas][etapa],
+        COL_MES: meses.strftime(FORMATO_MES),
+        COL_PERCENTUAL: percentual,
+        COL_PARCELA: np.round(percentual / 100 * orcamento[etapa], 2),
+    })
+
+
+def desembolso_por_etapa(etapas, distribuicoes):
+    """
+    Parcelas mensais de cada etapa.
+
+    `etapas` tem "codigo_sequencia", "Projeto" e "Orçamento"; `distribuicoes`
+    é {codigo: DataFrame com "Mês" ("MM/AAAA") e "Percentual (%)"}.
+    Percentuais que não somam 100 são normalizados (1 casa decimal) e a
+    parcela é percentual x orçamento (2 casas). Retorna as colunas "Codigo",
+    "Projeto", "Mês" (Period), "Percentual (%)" e "Parcela (R$)", na ordem
+    das distribuições.
+    """
+    colunas = ["Codigo", "Projeto", COL_MES, COL_PERCENTUAL, COL_PARCELA]
+    etapas = etapas.drop_duplicates("codigo_sequencia")
+    etapas = etapas.set_index(etapas["codigo_sequencia"].astype(str).rename(None))
+    distribuicoes = {str(c): d for c, d in distribuicoes.items() if str(c) in etapas.index}
+    if not distribuicoes:
+        return pd.DataFrame(columns=colunas)
+
+    df = pd.concat(
+        [d[[COL_MES, COL_PERCENTUAL]] for d in distribuicoes.values()],
+        keys=list(distribuicoes), names=["Codigo", None],
+    ).reset_index(level=0).reset_index(drop=True)
+    df[COL_MES] = pd.to_datetime(df[COL_MES], format=FORMATO_MES, errors="coerce").dt.to_period("M")
+
+    perc = pd.to_numeric(df[COL_PERCENTUAL], errors="coerce").fillna(0)
+    soma = perc.groupby(df["Codigo"]).transform("sum")
+    normalizar = (soma != 100) & (soma != 0)
+    perc = perc.where(~normalizar, (perc / soma.where(normalizar, 1) * 100).round(1))
+    orcamento = pd.to_numeric(df["Codigo"].map(etapas["Orçamento"]), errors="coerce").fillna(0)
+
+    df[COL_PERCENTUAL] = perc
+    df[COL_PARCELA] = (perc / 100 * orcamento).round(2)
+    df["Projeto"] = df["Codigo"].map(etapas["Projeto"])
+    return df[colunas]
+
+
+def consolidar(por_etapa, projetos=None):
+    """
+    Consolida o resultado de `desembolso_por_etapa` (opcionalmente só para
+    `projetos`) em dois DataFrames ordenados por mês:
+      - consolidado: "Mês", "Parcela (R$)";
+      - mensal: "Mês", "Projeto", "Parcela (R$)", "Percentual (%)" do mês.
+    """
+    if projetos is not None:
+        por_etapa = por_etapa[por_etapa["Projeto"].isin(projetos)]
+    if por_etapa.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    mensal = por_etapa.groupby([COL_MES, "Projeto"], as_index=False)[COL_PARCELA].sum()
+    consolidado = mensal.groupby(COL_MES, as_index=False)[COL_PARCELA].sum()
+    total_mes = mensal.groupby(COL_MES)[COL_PARCELA].transform("sum")
+    mensal[COL_PERCENTUAL] = (mensal[COL_PARCELA] / total_mes.replace(0, np.nan) * 100).round(1)
+    return consolidado, mensal
+
+
+def formatar_meses(df):
+    """Cópia de `df` com a coluna "Mês" como texto "MM/AAAA", para tabelas, gráficos e Excel."""
+    if COL_MES not in df.columns:
+        return df
+    df = df.copy()
+    df[COL_MES] = df[COL_MES].dt.strftime(FORMATO_MES)
+    return df
@@ -0,0 +1,72 @@
+"""
+Geração das planilhas .xlsx oferecidas para download nas páginas.
+
+As abas são gravadas linha a linha direto pelo xlsxwriter. Acima de
+LIMITE_CELULAS o arquivo é montado em modo `constant_memory`, que mantém só
+a linha corrente em memória (o to_excel do pandas escreve coluna a coluna e
+não funciona nesse modo).
+"""
+from io import BytesIO
+
+import pandas as pd
+import xlsxwriter
+
+LIMITE_CELULAS = 200_000
+FORMATO_DATA = "dd/mm/yyyy"
+
+
+def planilha_excel(abas):
+    """
+    Monta um .xlsx com uma aba por item de `abas` ({nome: DataFrame}) e
+    devolve os bytes. Cabeçalho em negrito, sem índice, NaN/NaT em branco.
+    """
+    celulas = sum(df.size for df in abas.values())
+    buffer = BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {
+        "constant_memory": celulas > LIMITE_CELULAS,
+        "default_date_format": FORMATO_DATA,
+        "remove_timezone": True,
+    })
+    cabecalho = workbook.add_format({"bold": True, "border": 1, "align": "center"})
+    for nome, df in abas.items():
+        worksheet = workbook.add_worksheet(nome)
+        worksheet.write_row(0, 0, [str(c) for c in df.columns], cabecalho)
+        valores = df.astype(object).where(df.notna(), None)
+        for i, linha in enumerate(valores.itertuples(index=False, name=None), start=1):
+            worksheet.write_row(i, 0, linha)
+    workbook.close()
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    # Benchmark: pandas.to_excel x planilha_excel (constant_memory acima do limite)
+    # Uso: python -m utils.exportacao [linhas]
+    import sys
+    import time
+    import tracemalloc
+
+    import numpy as np
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Empreendimento": rng.choice(["Residencial A", "Residencial B", "Residencial C"], n),
+        "Data": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 700, n), unit="D"),
+        **{f"Previsão ({2025 + i})": rng.random(n) * 1e5 for i in range(5)},
+    })
+
+    def com_pandas():
+        buffer = BytesIO()
+        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+            df.to_excel(writer, index=False, sheet_name="Planejamento")
+        return buffer.getvalue()
+
+    print(f"Linhas: {n:,} ({df.size:,} células)")
+    for nome, gerar in (("pandas.to_excel", com_pandas), ("planilha_excel", lambda: planilha_excel({"Planejamento": df}))):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        dados = gerar()
+        tempo = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{nome:<18}{tempo:>8.2f} s{pico / 2**20:>10.1f} MB de pico{len(dados) / 2**20:>8.1f} MB")
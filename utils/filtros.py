@@ -0,0 +1,93 @@
+"""
+Catálogo de opções e máscara dos filtros (multiselects) das páginas, usado
+pelo Painel de Assistência Técnica e pela consulta de gastos da página Financeiro.
+
+Cada coluna filtrável é guardada uma vez por versão da planilha como
+pd.Categorical, cujas categorias são as opções do multiselect. A filtragem
+consulta só os códigos inteiros: cada seleção vira uma tabela booleana por
+categoria e todas são combinadas em uma única máscara, sem cópias
+intermediárias do DataFrame.
+"""
+import numpy as np
+import pandas as pd
+
+
+def catalogo_filtros(df, colunas, ordenadas=()):
+    """
+    {coluna: pd.Categorical} para as `colunas` presentes em `df`, na ordem
+    das linhas de `df`. As categorias (opções) seguem a ordem de aparição,
+    como dropna().unique(), ou ficam em ordem crescente para as colunas em
+    `ordenadas`. Valores nulos não viram opção.
+    """
+    catalogo = {}
+    for coluna in colunas:
+        if coluna not in df.columns:
+            continue
+        codigos, valores = pd.factorize(df[coluna], sort=coluna in ordenadas)
+        # Categorias como objetos simples: um CategoricalIndex seria reordenado pelo from_codes
+        categorias = pd.Index(np.asarray(valores, dtype=object), dtype=object)
+        catalogo[coluna] = pd.Categorical.from_codes(codigos, categories=categorias)
+    return catalogo
+
+
+def opcoes(catalogo, coluna):
+    """Opções do multiselect de `coluna` (lista vazia se a coluna não existir)."""
+    return catalogo[coluna].categories.tolist() if coluna in catalogo else []
+
+
+def mascara_filtros(catalogo, selecoes):
+    """
+    Máscara booleana das linhas que atendem a todas as `selecoes`
+    ({coluna: valores escolhidos}); seleções vazias não filtram. Valores
+    que não são opção da coluna não casam com nenhuma linha, como no isin.
+    Retorna None quando nenhum filtro está ativo.
+    """
+    mascara = None
+    for coluna, valores in selecoes.items():
+        if not valores:
+            continue
+        coluna = catalogo[coluna]
+        posicoes = coluna.categories.get_indexer(pd.Index(list(valores), dtype=object))
+        # Uma posição a mais no fim: o código -1 (nulo) nunca é selecionado
+        escolhidas = np.zeros(len(coluna.categories) + 1, dtype=bool)
+        escolhidas[posicoes[posicoes >= 0]] = True
+        atende = escolhidas[coluna.codes]
+        mascara = atende if mascara is None else mascara & atende
+    return mascara
+
+
+if __name__ == "__main__":
+    # Benchmark: cadeia de .isin sobre cópias x máscara única pelos códigos
+    # Uso: python -m utils.filtros [linhas]
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Empreendimento": np.array([f"Residencial {i}" for i in range(40)], dtype=object)[rng.integers(0, 40, n)],
+        "Bloco": np.array([f"Bloco {i}" for i in range(12)] + [None], dtype=object)[rng.integers(0, 13, n)],
+        "Status": np.array(["Concluída", "Em andamento", "Improcedente", "Aberta"], dtype=object)[rng.integers(0, 4, n)],
+        "Responsável": np.array([f"Técnico {i}" for i in range(25)], dtype=object)[rng.integers(0, 25, n)],
+    })
+    selecoes = {"Empreendimento": ["Residencial 1", "Residencial 7"], "Bloco": ["Bloco 2", "Bloco 3"],
+                "Status": ["Concluída"], "Responsável": [f"Técnico {i}" for i in range(10)]}
+
+    inicio = time.perf_counter()
+    catalogo = catalogo_filtros(df, df.columns)
+    t_catalogo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    referencia = df.copy()
+    for coluna, valores in selecoes.items():
+        referencia = referencia[referencia[coluna].isin(valores)]
+    t_isin = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    filtrado = df[mascara_filtros(catalogo, selecoes)]
+    t_codigos = time.perf_counter() - inicio
+
+    pd.testing.assert_frame_equal(filtrado, referencia)
+    print(f"Linhas: {n:,}  (catálogo montado em {t_catalogo:.3f} s, uma vez por versão)")
+    print(f"Cadeia de isin: {t_isin:8.4f} s")
+    print(f"Máscara única:  {t_codigos:8.4f} s  ({t_isin / t_codigos:.0f}x)")
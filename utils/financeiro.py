@@ -0,0 +1,90 @@
+"""
+Cruzamento entre os lançamentos da GRD (aba grd_Listagem) e os
+empreendimentos da aba departamento, usado na página Financeiro.
+"""
+import numpy as np
+import pandas as pd
+
+COL_CODIGO = "Cód. Alternativo Serviço"
+COL_VALOR = "Valor Conv."
+
+
+def limpar_codigos(serie):
+    """
+    Códigos como texto, sem espaços nas pontas e em maiúsculas. Nulos viram
+    "NAN", como no astype(str) anterior ao pandas 3 (no pandas 3 o astype(str)
+    mantém o nulo).
+    """
+    texto = serie.astype(object).where(serie.notna(), "nan").astype(str)
+    return texto.str.strip().str.upper()
+
+
+def mapa_codigos_empreendimentos(empreendimentos, codigos):
+    """
+    Monta a tabela código → empreendimento (colunas "Empreendimento", "Código", "Peso").
+
+    Regra (a mesma do gráfico "Despesas em Manutenção por Empreendimento"):
+      - os códigos de referência são os valores distintos de `codigos`,
+        limpos por `limpar_codigos`, exceto "ADM";
+      - uma referência pertence ao empreendimento quando aparece no nome dele;
+      - um lançamento conta para a referência quando o seu código a contém.
+    "Peso" é quantas referências ligam o código ao empreendimento, ou seja,
+    quantas vezes cada lançamento com esse código é somado para ele.
+    """
+    referencias = limpar_codigos(pd.Series(codigos.dropna().unique()))
+    referencias = referencias[referencias != "ADM"].to_numpy(dtype=str)
+    nomes = np.asarray(empreendimentos.dropna().unique(), dtype=str)
+    codigos_grd = np.asarray(limpar_codigos(pd.Series(codigos.unique())).unique(), dtype=str)
+
+    # Matrizes de contenção: nome x referência e referência x código
+    nome_ref = np.char.find(np.char.upper(nomes)[:, None], referencias[None, :]) >= 0
+    ref_codigo = np.char.find(codigos_grd[None, :], referencias[:, None]) >= 0
+    peso = nome_ref.astype(np.int64) @ ref_codigo.astype(np.int64)
+
+    i_nome, i_codigo = np.nonzero(peso)
+    return pd.DataFrame({
+        "Empreendimento": nomes[i_nome],
+        "Código": codigos_grd[i_codigo],
+        "Peso": peso[i_nome, i_codigo],
+    })
+
+
+def despesa_real_por_empreendimento(df_grd, mapa):
+    """
+    Soma "Valor Conv." da GRD por empreendimento a partir da tabela de
+    `mapa_codigos_empreendimentos`. Empreendimentos sem lançamentos não aparecem.
+    """
+    lancamentos = pd.DataFrame({
+        "Código": limpar_codigos(df_grd[COL_CODIGO]),
+        "Valor": df_grd[COL_VALOR],
+    })
+    mesclado = mapa.merge(lancamentos, on="Código")
+    return (mesclado["Valor"] * mesclado["Peso"]).groupby(mesclado["Empreendimento"]).sum()
+
+
+STATUS_POS_OBRA = ["Assistência Técnica", "Fora de Garantia"]
+
+
+def indice_cvco_por_codigo(df_departamento, codigos):
+    """
+    Índice código → ("Data CVCO_Ref", "Status_Depto") para os códigos distintos de `codigos`.
+    Vale o primeiro empreendimento em Assistência Técnica ou Fora de Garantia
+    cujo nome contém o código (sem diferenciar maiúsculas/minúsculas).
+    Códigos sem correspondência ficam fora do índice (nulos após o merge).
+    """
+    dep = df_departamento[
+        df_departamento["Status"].isin(STATUS_POS_OBRA) & df_departamento["Empreendimento"].notna()
+    ]
+    distintos = np.asarray(codigos.dropna().unique(), dtype=object)
+    if dep.empty or len(distintos) == 0:
+        encontrados, primeiro = np.zeros(len(distintos), dtype=bool), np.array([], dtype=np.int64)
+    else:
+        nomes = np.char.upper(dep["Empreendimento"].to_numpy(dtype=str))
+        contem = np.char.find(nomes[:, None], np.char.upper(distintos.astype(str))[None, :]) >= 0
+        encontrados = contem.any(axis=0)
+        primeiro = contem[:, encontrados].argmax(axis=0)
+    linhas = dep.iloc[primeiro]
+    return pd.DataFrame(
+        {"Data CVCO_Ref": linhas["Data CVCO"].to_numpy(), "Status_Depto": linhas["Status"].to_numpy()},
+        index=pd.Index(distintos[encontrados], name=COL_CODIGO),
+    )
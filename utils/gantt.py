@@ -0,0 +1,170 @@
+"""
+Gráfico Gantt do cronograma físico (página Contrapartidas).
+
+As barras são desenhadas com um único trace por tipo (Etapa / Subetapa),
+com cores, posições e textos passados como arrays, em vez de um trace
+por linha.
+"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+COL_INICIO = "Data Início Contrapartida (Previsto)"
+COL_FIM = "Data Término Contrapartida (Previsto)"
+COR_PADRAO = "#636efa"
+
+_RE_CODIGO = r"\s*[+-]?\d+\s*(?:\.\s*[+-]?\d+\s*)*"
+
+
+def chave_ordenacao(codigos):
+    """
+    Chave de ordenação dos códigos ("1", "1.2", ...) como DataFrame de
+    inteiros, uma coluna por nível. Equivale a ordenar pela tupla de
+    inteiros: níveis ausentes valem -1 (o "1" vem antes do "1.1") e códigos
+    inválidos vão para o fim, como (999,).
+    """
+    codigos = pd.Series(codigos, dtype=object).astype(str).reset_index(drop=True)
+    validos = codigos.str.fullmatch(_RE_CODIGO)
+    niveis = codigos.where(validos, "999").str.split(".", expand=True)
+    return niveis.apply(lambda nivel: pd.to_numeric(nivel.str.strip()).fillna(-1).astype(np.int64))
+
+
+def clarear_cor(hex_color, amount=0.5):
+    """Mistura a cor `hex_color` com branco na proporção `amount`."""
+    hex_color = hex_color.lstrip('#')
+    lv = len(hex_color)
+    rgb = tuple(int(hex_color[i:i + lv // 3], 16) for i in range(0, lv, lv // 3))
+    return '#%02x%02x%02x' % tuple(int(c + (255 - c) * amount) for c in rgb)
+
+
+def dados_gantt(df):
+    """
+    Linhas do Gantt (com início e término definidos), já ordenadas pelo código.
+    `df` precisa da coluna "Tipo" ("Etapa" / "Subetapa").
+    """
+    inicio = pd.to_datetime(df[COL_INICIO], errors="coerce")
+    fim = pd.to_datetime(df[COL_FIM], errors="coerce")
+    com_datas = (inicio.notna() & fim.notna()).to_numpy()
+    gantt = pd.DataFrame({
+        "Projeto": df["Projeto"].fillna("").to_numpy()[com_datas],
+        "Codigo": df["codigo_sequencia"].to_numpy()[com_datas],
+        "TipoServico": df["Tipo de Serviço"].fillna("").to_numpy()[com_datas],
+        "Tipo": df["Tipo"].to_numpy()[com_datas],
+        "Start": inicio.to_numpy()[com_datas],
+        "Finish": fim.to_numpy()[com_datas],
+        "Execucao": df["% Execução"].fillna(0).to_numpy()[com_datas],
+    })
+    if gantt.empty:
+        return gantt
+    chave = chave_ordenacao(gantt["Codigo"])
+    ordem = np.lexsort([chave[c].to_numpy() for c in reversed(chave.columns)])
+    gantt = gantt.iloc[ordem].reset_index(drop=True)
+    gantt["Duration"] = (gantt["Finish"] - gantt["Start"]).dt.days
+    gantt["Start_num"] = (gantt["Start"] - gantt["Start"].min()).dt.days
+    gantt["Label"] = ("Código: " + gantt["Codigo"].astype(str) + " | "
+                      + gantt["Projeto"].astype(str) + " | " + gantt["TipoServico"].astype(str))
+    return gantt
+
+
+def figura_gantt(df):
+    """
+    Figura do Gantt para as linhas de `df` (coluna "Tipo" obrigatória).
+    Retorna None quando nenhuma linha tem início e término definidos.
+    """
+    gantt = dados_gantt(df)
+    if gantt.empty:
+        return None
+
+    # Cada etapa recebe uma cor da paleta; a subetapa usa a cor da etapa, clareada
+    palette = px.colors.qualitative.Plotly
+    etapa = (gantt["Tipo"] == "Etapa").to_numpy()
+    codigos_etapa = pd.unique(gantt.loc[etapa, "Codigo"].astype(str))
+    etapa_colors = pd.Series([palette[i % len(palette)] for i in range(len(codigos_etapa))], index=codigos_etapa)
+    cor_etapa = gantt["Codigo"].astype(str).map(etapa_colors).fillna(COR_PADRAO)
+    cor_pai = gantt["Codigo"].astype(str).str.split(".").str[0].map(etapa_colors).fillna(COR_PADRAO)
+    cor_sub = cor_pai.map({c: clarear_cor(c) for c in cor_pai.unique()})
+    gantt["Cor"] = np.where(etapa, cor_etapa, cor_sub)
+    gantt["Texto"] = gantt["Execucao"].astype(str) + "%"
+
+    fig = go.Figure()
+    for tipo, largura in (("Etapa", 0.8), ("Subetapa", 0.4)):
+        barras = gantt[gantt["Tipo"] == tipo]
+        if barras.empty:
+            continue
+        fig.add_trace(go.Bar(
+            x=barras["Duration"].to_numpy(),
+            y=barras["Label"].to_numpy(),
+            base=barras["Start_num"].to_numpy(),
+            orientation="h",
+            marker_color=barras["Cor"].to_numpy(),
+            width=largura,
+            text=barras["Texto"].to_numpy(),
+            textposition="inside",
+            name=tipo,
+        ))
+
+    reference_date = gantt["Start"].min()
+    meses = pd.date_range(reference_date.to_period("M").to_timestamp(), gantt["Finish"].max(), freq="MS")
+    tick_vals = (meses - reference_date).days.tolist()
+    tick_text = meses.strftime("%m/%Y").tolist()
+    fig.update_layout(
+        barmode='stack',
+        yaxis={'categoryorder': 'array', 'categoryarray': gantt["Label"].unique().tolist(), 'autorange': 'reversed'},
+        xaxis=dict(tickmode='array', tickvals=tick_vals, ticktext=tick_text, title="Data"),
+        title="📋 Cronograma de Projetos",
+        showlegend=False
+    )
+    return fig
+
+
+if __name__ == "__main__":
+    # Benchmark: um trace por linha (versão anterior) x um trace por tipo
+    # Uso: python -m utils.gantt [linhas]
+    import datetime
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rng = np.random.default_rng(0)
+    n_etapas = max(1, n // 4)
+    pai = rng.integers(1, n_etapas + 1, n - n_etapas)
+    sub = pd.Series(pai).groupby(pai).cumcount() + 1
+    codigos = [str(i) for i in range(1, n_etapas + 1)] + [f"{p}.{s}" for p, s in zip(pai, sub)]
+    inicio = [datetime.date(2024, 1, 1) + datetime.timedelta(days=int(d)) for d in rng.integers(0, 700, n)]
+    df = pd.DataFrame({
+        "codigo_sequencia": codigos,
+        "Projeto": [f"Residencial {c.split('.')[0]}" for c in codigos],
+        "Tipo de Serviço": "Pavimentação",
+        "Tipo": ["Etapa"] * n_etapas + ["Subetapa"] * (n - n_etapas),
+        COL_INICIO: inicio,
+        COL_FIM: [d + datetime.timedelta(days=int(x)) for d, x in zip(inicio, rng.integers(10, 200, n))],
+        "% Execução": rng.integers(0, 101, n).astype(float),
+    })
+
+    def figura_por_linha(df):
+        """Versão anterior: um go.Bar por etapa/subetapa, usada como referência."""
+        gantt = dados_gantt(df)
+        palette = px.colors.qualitative.Plotly
+        etapas = gantt[gantt["Tipo"] == "Etapa"]["Codigo"].unique()
+        etapa_colors = {c: palette[i % len(palette)] for i, c in enumerate(etapas)}
+        fig = go.Figure()
+        for _, row in gantt.iterrows():
+            if row["Tipo"] == "Etapa":
+                cor, largura = etapa_colors.get(row["Codigo"], COR_PADRAO), 0.8
+            else:
+                cor, largura = clarear_cor(etapa_colors.get(row["Codigo"].split('.')[0], COR_PADRAO)), 0.4
+            fig.add_trace(go.Bar(x=[row["Duration"]], y=[row["Label"]], base=[row["Start_num"]],
+                                 orientation="h", marker_color=cor, width=largura,
+                                 text=f'{row["Execucao"]}%', textposition="inside"))
+        fig.update_layout(barmode='stack', showlegend=False)
+        return fig
+
+    print(f"Linhas: {n:,}")
+    print(f"{'':<16}{'Traces':>8}{'Tempo (s)':>12}{'JSON (KB)':>12}")
+    for nome, montar in (("Por linha", figura_por_linha), ("Por tipo", figura_gantt)):
+        t0 = time.perf_counter()
+        fig = montar(df)
+        tamanho = len(fig.to_json())
+        tempo = time.perf_counter() - t0
+        print(f"{nome:<16}{len(fig.data):>8}{tempo:>12.3f}{tamanho / 1024:>12.1f}")
@@ -0,0 +1,164 @@
+"""
+Separação da coluna "Garantia Solicitada" (ex.: "Hidráulica - Vazamento")
+em duas partes, usada pelos painéis de Assistência Técnica e de Sistemas
+Construtivos.
+
+Cada página mantém a sua regra de separação, mas a divisão é feita de uma
+vez na coluna inteira (métodos .str do pandas) e as partes voltam como
+colunas categóricas: poucos valores distintos repetidos em muitas linhas.
+
+Aqui também fica a série de unidades em garantia por mês, montada com um
+vetor de diferenças (entrada no mês da entrega, saída no fim do prazo) em
+vez de listar todos os meses de garantia de cada obra.
+"""
+import numpy as np
+import pandas as pd
+
+PRAZO_GARANTIA_MESES = 60
+
+
+def separar_garantia(garantia, separador, nomes, substituir=None, sem_separador=np.nan):
+    """
+    Divide cada valor de `garantia` na primeira ocorrência de `separador`,
+    com as duas partes sem espaços nas bordas. `substituir` = (antigo, novo)
+    é aplicado antes da divisão. Sem separador, a primeira parte é o texto
+    inteiro e a segunda recebe `sem_separador`; valores nulos ficam nulos nas
+    duas. Retorna um DataFrame com as colunas `nomes` (category), no índice
+    de `garantia`.
+    """
+    texto = garantia.astype("string")
+    if substituir:
+        texto = texto.str.replace(*substituir, regex=False)
+    partes = texto.str.split(separador, n=1, expand=True)
+    primeira = partes[0].str.strip()
+    if 1 in partes.columns:
+        segunda = partes[1].str.strip()
+    else:
+        segunda = pd.Series(pd.NA, index=texto.index, dtype="string")
+    sem = texto.notna() & ~texto.str.contains(separador, regex=False).fillna(False)
+    segunda = segunda.astype(object).mask(sem.to_numpy(), sem_separador)
+    return pd.DataFrame({
+        nomes[0]: primeira.astype(object).astype("category"),
+        nomes[1]: segunda.astype("category"),
+    }, index=garantia.index)
+
+
+def garantia_assistencia(garantia):
+    """
+    Regra do Painel de Assistência Técnica: " - " vira ": " e o texto é
+    dividido no ":" em "Sistema Construtivo" e "Tipo de Falha" (nulo quando
+    não há ":").
+    """
+    return separar_garantia(garantia, ":", ["Sistema Construtivo", "Tipo de Falha"], substituir=(" - ", ": "))
+
+
+def garantia_sistemas(garantia):
+    """
+    Regra da página Sistemas Construtivos: divisão no "-" em "Grupo
+    Construtivo" e "Sistema Construtivo" (texto vazio quando não há "-").
+    """
+    return separar_garantia(garantia, "-", ["Grupo Construtivo", "Sistema Construtivo"], sem_separador="")
+
+
+def unidades_em_garantia(entregas, unidades, prazo_meses=PRAZO_GARANTIA_MESES):
+    """
+    Unidades em garantia em cada mês. Cada obra conta do mês da entrega até
+    o mês de entrega + `prazo_meses`, inclusive (o mesmo que um period_range
+    entre as duas datas). `prazo_meses` é um número ou um prazo por obra
+    (ex.: o prazo do sistema construtivo de cada linha, mapeado de um
+    {sistema: meses}). Obras sem data, unidades ou prazo ficam de fora.
+
+    Soma +unidades no mês da entrega e -unidades no mês seguinte ao fim e
+    acumula: o custo por obra não depende do tamanho do prazo.
+    Retorna "AnoMes" ("AAAA-MM") e "N° Unidades", só nos meses com alguma
+    obra em garantia.
+    """
+    entregas = pd.Series(pd.to_datetime(np.asarray(entregas), errors="coerce"))
+    unidades = pd.to_numeric(pd.Series(np.asarray(unidades, dtype=object)), errors="coerce")
+    prazos = pd.to_numeric(pd.Series(np.broadcast_to(prazo_meses, len(entregas))), errors="coerce")
+    validas = (entregas.notna() & unidades.notna() & prazos.notna()).to_numpy()
+    if not validas.any():
+        return pd.DataFrame({"AnoMes": pd.Series(dtype=object), "N° Unidades": pd.Series(dtype=float)})
+
+    valores = unidades.to_numpy()[validas]
+    inicio = (entregas.dt.year * 12 + entregas.dt.month - 1).to_numpy()[validas].astype(np.int64)
+    fim = inicio + prazos.to_numpy()[validas].astype(np.int64)
+    base = inicio.min()
+    delta = np.zeros(fim.max() - base + 2, dtype=valores.dtype)
+    obras = np.zeros(len(delta), dtype=np.int64)
+    np.add.at(delta, inicio - base, valores)
+    np.subtract.at(delta, fim + 1 - base, valores)
+    np.add.at(obras, inicio - base, 1)
+    np.subtract.at(obras, fim + 1 - base, 1)
+
+    cobertos = np.flatnonzero(np.cumsum(obras)[:-1] > 0)
+    meses = pd.PeriodIndex.from_ordinals(base + cobertos - 1970 * 12, freq="M")
+    return pd.DataFrame({"AnoMes": meses.astype(str).to_numpy(dtype=object),
+                         "N° Unidades": np.cumsum(delta)[cobertos]})
+
+
+if __name__ == "__main__":
+    # Benchmark: .apply linha a linha (versão anterior) x divisão vetorizada, e
+    # period_range + explode (versão anterior) x vetor de diferenças
+    # Uso: python -m utils.garantia [linhas] [obras]
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    valores = np.array(["Hidráulica - Vazamento", "Elétrica: Tomada", "Pintura", " Esquadrias - Vidro - Trinca ",
+                        "Impermeabilização -Infiltração", "Cobertura:", None], dtype=object)
+    garantia = pd.Series(valores[rng.integers(0, len(valores), n)], name="Garantia Solicitada")
+
+    def tratamento_garantia(garantia):
+        if pd.isna(garantia):
+            return pd.Series([np.nan, np.nan])
+        garantia = garantia.replace(" - ", ": ")
+        if ":" in garantia:
+            sistema, tipo = garantia.split(":", 1)
+            return pd.Series([sistema.strip(), tipo.strip()])
+        return pd.Series([garantia.strip(), np.nan])
+
+    def split_garantia(value):
+        if pd.isna(value):
+            return pd.Series([np.nan, np.nan])
+        if "-" in value:
+            parts = value.split("-", 1)
+            return pd.Series([parts[0].strip(), parts[1].strip()])
+        return pd.Series([value.strip(), ""])
+
+    print(f"Linhas: {n:,}")
+    for nome, linha_a_linha, vetorizado in (("Assistência", tratamento_garantia, garantia_assistencia),
+                                           ("Sistemas", split_garantia, garantia_sistemas)):
+        inicio = time.perf_counter()
+        referencia = garantia.apply(linha_a_linha)
+        t_apply = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        resultado = vetorizado(garantia)
+        t_vetor = time.perf_counter() - inicio
+        referencia.columns = resultado.columns
+        pd.testing.assert_frame_equal(resultado.astype(object), referencia.astype(object))
+        print(f"{nome:<14}apply {t_apply:8.3f} s   vetorizado {t_vetor:8.3f} s  ({t_apply / t_vetor:.0f}x)")
+
+    obras = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    entregas = pd.Series(pd.Timestamp("2005-01-01") + pd.to_timedelta(rng.integers(0, 7000, obras), unit="D"))
+    entregas[rng.random(obras) < 0.05] = pd.NaT
+    n_unidades = pd.Series(rng.integers(8, 400, obras))
+    dep = pd.DataFrame({"Data Entrega de Obra": entregas, "N° Unidades": n_unidades})
+
+    print(f"Obras: {obras:,}")
+    for prazo in (60, 240):
+        inicio = time.perf_counter()
+        df_war = dep.dropna().copy()
+        df_war["FimGarantia"] = df_war["Data Entrega de Obra"] + pd.DateOffset(months=prazo)
+        df_war["AnoMes"] = df_war.apply(
+            lambda r: pd.period_range(r["Data Entrega de Obra"], r["FimGarantia"], freq="M"), axis=1)
+        df_war = df_war.explode("AnoMes")
+        df_war["AnoMes"] = df_war["AnoMes"].astype(str)
+        referencia = df_war.groupby("AnoMes", as_index=False)["N° Unidades"].sum()
+        t_explode = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        resultado = unidades_em_garantia(dep["Data Entrega de Obra"], dep["N° Unidades"], prazo)
+        t_vetor = time.perf_counter() - inicio
+        pd.testing.assert_frame_equal(resultado, referencia, check_dtype=False)
+        print(f"Prazo {prazo:>3} meses  explode {t_explode:8.3f} s   diferenças {t_vetor:8.4f} s  ({t_explode / t_vetor:.0f}x)")
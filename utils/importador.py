@@ -0,0 +1,273 @@
+"""
+Leitura da tabela de solicitações (tabsolics) do portal Pós Obra, usada
+pelo "importar planilha pos obra.py".
+
+O navegador entrega o HTML da tabela inteira de uma vez (outerHTML) e a
+extração é feita aqui, sem Selenium: assim o parser pode ser testado com
+um HTML salvo em disco (a tabela ou a página inteira).
+
+Também ficam aqui as novas tentativas com espera crescente e as métricas de
+tempo de cada importação, gravadas em JSON lines (uma linha por execução).
+Avisos (linhas ignoradas, tentativas que falharam) vão para o logger do
+módulo; o script de importação os mostra no terminal.
+"""
+import datetime
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from html.parser import HTMLParser
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_SAIDA = [
+    "N°", "Empreendimento", "Unidade", "Bloco", "Responsável",
+    "Data de Abertura", "Encerramento",
+    "Status", "Pesquisa", "Garantia Solicitada"
+]
+MIN_COLUNAS = 9
+COLUNA_PESQUISA = 9  # 10ª célula: ícone da pesquisa de satisfação
+STATUS_ENCERRADOS = ["concluída", "improcedente"]
+CLASSES_PESQUISA = ("fa-check", "text-success")
+ID_TABELA = "tabsolics"
+
+ARQUIVO_EXCEL = "engenharia.xlsx"
+CHAVE = "N°"
+# Campos que mudam depois da abertura; só linhas novas ou com um deles alterado são gravadas
+COLUNAS_MUDANCA = ["Status", "Encerramento", "Pesquisa"]
+
+ARQUIVO_METRICAS = "importacao_metricas.jsonl"
+TENTATIVAS = 3
+ESPERA_INICIAL = 2.0  # segundos; dobra a cada nova tentativa
+
+log = logging.getLogger(__name__)
+
+
+class _LeitorTabela(HTMLParser):
+    """
+    Percorre o HTML guardando, para cada <tr> do <tbody> da tabela
+    ID_TABELA, o texto de cada <td> e se ela contém o ícone de pesquisa
+    realizada (svg com as classes "fa-check" e "text-success", como no
+    XPath da extração com Selenium). Outras tabelas da página são ignoradas.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.linhas = []
+        self._tabela = 0  # profundidade de <table> a partir da tabela ID_TABELA
+        self._tbody = 0
+        self._linha = None
+        self._celula = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table" and (self._tabela or dict(attrs).get("id") == ID_TABELA):
+            self._tabela += 1
+        elif not self._tabela:
+            return
+        elif tag == "tbody":
+            self._tbody += 1
+        elif tag == "tr" and self._tbody:
+            self._linha = []
+        elif tag == "td" and self._linha is not None:
+            self._celula = {"texto": [], "icone": False}
+            self._linha.append(self._celula)
+        elif tag == "svg" and self._celula is not None:
+            classe = dict(attrs).get("class") or ""
+            if all(c in classe for c in CLASSES_PESQUISA):
+                self._celula["icone"] = True
+        elif tag == "br" and self._celula is not None:
+            self._celula["texto"].append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in ("br", "svg"):
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag == "table" and self._tabela:
+            self._tabela -= 1
+        elif not self._tabela:
+            return
+        elif tag == "tbody":
+            self._tbody = max(self._tbody - 1, 0)
+        elif tag == "tr" and self._linha is not None:
+            self.linhas.append(self._linha)
+            self._linha = self._celula = None
+        elif tag == "td":
+            self._celula = None
+
+    def handle_data(self, data):
+        if self._celula is not None:
+            # Quebras de linha do código-fonte são só espaço; na página, só o <br> quebra a linha
+            self._celula["texto"].append(data.replace("\r", " ").replace("\n", " "))
+
+
+def _texto(celula):
+    """Texto da célula como o .text do Selenium: linhas do <br>, espaços colapsados, sem bordas."""
+    linhas = "".join(celula["texto"]).split("\n")
+    return "\n".join(" ".join(l.split()) for l in linhas).strip()
+
+
+def extrair_solicitacoes(html):
+    """
+    Converte o HTML da tabela tabsolics (o outerHTML da tabela ou a página
+    inteira) em um DataFrame com COLUNAS_SAIDA, nas mesmas regras da
+    extração linha a linha:
+      - linhas com menos de 9 células são ignoradas;
+      - "Comum" na unidade vira "Área Comum", e o bloco dessas linhas também;
+      - "Encerramento" só é preenchido para status Concluída/Improcedente;
+      - "Pesquisa" depende do ícone de check na 10ª célula.
+    """
+    leitor = _LeitorTabela()
+    leitor.feed(html)
+    leitor.close()
+
+    linhas = [l for l in leitor.linhas if len(l) >= MIN_COLUNAS]
+    if len(linhas) < len(leitor.linhas):
+        log.warning("%d linha(s) com colunas insuficientes ignorada(s).", len(leitor.linhas) - len(linhas))
+    textos = pd.DataFrame([[_texto(c) for c in l[:MIN_COLUNAS]] for l in linhas], columns=range(MIN_COLUNAS))
+    icone = pd.Series([len(l) > COLUNA_PESQUISA and l[COLUNA_PESQUISA]["icone"] for l in linhas], dtype=bool)
+
+    unidade = textos[2].str.replace("Comum", "Área Comum")
+    status = textos[7]
+    df = pd.DataFrame({
+        "N°": textos[0],
+        "Empreendimento": textos[1],
+        "Unidade": unidade,
+        "Bloco": textos[3].where(unidade != "Área Comum", "Área Comum"),
+        "Responsável": textos[4],
+        "Data de Abertura": textos[5],
+        "Encerramento": textos[6].where(status.str.lower().isin(STATUS_ENCERRADOS), ""),
+        "Status": status,
+        "Pesquisa": icone.map({True: "Pesquisa Realizada", False: "Pesquisa Não Realizada"}),
+        "Garantia Solicitada": textos[8],
+    })
+    return df[COLUNAS_SAIDA]
+
+
+def _normalizar(df):
+    """COLUNAS_SAIDA como texto, como saem da extração, com vazio no lugar de NaN."""
+    return df.reindex(columns=COLUNAS_SAIDA).fillna("").astype(str)
+
+
+def _por_chave(df, nome):
+    """`df` indexado pelo N° numérico, sem linhas sem N° e sem N° repetido (fica a última)."""
+    chave = pd.to_numeric(df[CHAVE], errors="coerce").astype("Int64")
+    if chave.isna().any():
+        log.warning("%d solicitação(ões) %s sem N° numérico ignorada(s).", chave.isna().sum(), nome)
+    validas = chave.notna().to_numpy()
+    df = df[validas].set_index(chave[validas].astype(np.int64).to_numpy())
+    return df[~df.index.duplicated(keep="last")]
+
+
+def carregar_base(caminho_excel=ARQUIVO_EXCEL):
+    """
+    Base local de solicitações: o engenharia.xlsx da última importação, lido
+    como texto (o formato em que a extração o grava). Vazia se não existir.
+    """
+    if os.path.exists(caminho_excel):
+        return _normalizar(pd.read_excel(caminho_excel, dtype=str))
+    return _normalizar(pd.DataFrame(columns=COLUNAS_SAIDA))
+
+
+def sincronizar(extraidas, base):
+    """
+    Mescla as solicitações `extraidas` do portal na `base` local (upsert por N°,
+    comparado como número). Só entram as linhas novas ou com
+    Status/Encerramento/Pesquisa diferentes; solicitações que não vieram na
+    extração são mantidas. As colunas continuam texto, como na extração, em
+    ordem decrescente de N°.
+    Retorna (base atualizada, nº de novas, nº de alteradas).
+    """
+    extraidas = _por_chave(_normalizar(extraidas), "extraída(s)")
+    base = _por_chave(_normalizar(base), "da base")
+
+    novas = extraidas.index.difference(base.index)
+    comuns = extraidas.index.intersection(base.index)
+    diferentes = (extraidas.loc[comuns, COLUNAS_MUDANCA] != base.loc[comuns, COLUNAS_MUDANCA]).any(axis=1)
+    alteradas = comuns[diferentes.to_numpy()]
+
+    atualizada = base.copy()
+    atualizada.loc[alteradas] = extraidas.loc[alteradas]
+    atualizada = pd.concat([extraidas.loc[novas], atualizada])
+    atualizada = atualizada.sort_index(ascending=False, kind="stable").reset_index(drop=True)
+    return atualizada, len(novas), len(alteradas)
+
+
+def gravar_base(df, caminho_excel=ARQUIVO_EXCEL):
+    """Grava a base no engenharia.xlsx, com as colunas como vieram (a extração grava tudo como texto)."""
+    df.to_excel(caminho_excel, index=False)
+
+
+def com_tentativas(acao, descricao, tentativas=TENTATIVAS, espera=ESPERA_INICIAL):
+    """
+    Executa `acao()` até `tentativas` vezes, esperando `espera`, 2x`espera`, ...
+    segundos entre elas. A exceção da última tentativa é repassada.
+    """
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return acao()
+        except Exception as e:
+            if tentativa == tentativas:
+                raise
+            pausa = espera * 2 ** (tentativa - 1)
+            log.warning("%s falhou (%d/%d): %s. Nova tentativa em %.0f s.", descricao, tentativa, tentativas, e, pausa)
+            time.sleep(pausa)
+
+
+class Metricas:
+    """
+    Tempos de uma importação, por fase ("login", "filtro", "extracao",
+    "exportacao"), e nº de linhas extraídas. `registrar` acrescenta o
+    resultado como uma linha JSON em ARQUIVO_METRICAS.
+    """
+
+    def __init__(self, **contexto):
+        self.contexto = contexto
+        self.inicio = datetime.datetime.now()
+        self._t0 = time.perf_counter()
+        self.fases = {}
+        self.linhas = 0
+
+    @contextmanager
+    def fase(self, nome):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nome] = round(self.fases.get(nome, 0) + time.perf_counter() - t0, 3)
+
+    def resumo(self, **extras):
+        total = time.perf_counter() - self._t0
+        extracao = self.fases.get("extracao")
+        return {
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            **self.contexto,
+            "linhas": self.linhas,
+            "linhas_por_s": round(self.linhas / extracao, 1) if extracao else None,
+            "fases_s": self.fases,
+            "total_s": round(total, 3),
+            **extras,
+        }
+
+    def registrar(self, caminho=ARQUIVO_METRICAS, **extras):
+        """Grava o resumo (com `extras`, ex.: sucesso/erro) em `caminho` e o devolve."""
+        resumo = self.resumo(**extras)
+        with open(caminho, "a", encoding="utf-8") as f:
+            f.write(json.dumps(resumo, ensure_ascii=False) + "\n")
+        return resumo
+
+
+if __name__ == "__main__":
+    # Extrai um HTML salvo da tabela (ex.: outerHTML copiado do navegador)
+    # Uso: python -m utils.importador tabsolics.html [saida.xlsx]
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    with open(sys.argv[1], encoding="utf-8") as f:
+        df = extrair_solicitacoes(f.read())
+    print(df.to_string())
+    if len(sys.argv) > 2:
+        df.to_excel(sys.argv[2], index=False)
@@ -0,0 +1,106 @@
+"""
+Aritmética de meses vetorizada (NumPy) para classificar despesas e
+empreendimentos por período em relação à data de CVCO.
+"""
+import numpy as np
+import pandas as pd
+
+# Limites (em meses completos) das faixas Pós Entrega, 1° ao 5° Ano
+LIMITES_MESES = np.array([3, 12, 24, 36, 48, 60])
+
+# Rótulos na ordem: sem data, antes da CVCO, faixas de LIMITES_MESES, após 5 anos
+PERIODOS_DEPARTAMENTO = (
+    "Sem Data CVCO", "Futuro",
+    "Despesas Pós Entrega", "Despesas 1° Ano", "Despesas 2° Ano",
+    "Despesas 3° Ano", "Despesas 4° Ano", "Despesas 5° Ano",
+    "Despesas após 5 Anos",
+)
+PERIODOS_GRD = (
+    "Sem Data", "Antes de CVCO",
+    "Despesa Pós Entrega", "Despesa 1° Ano", "Despesa 2° Ano",
+    "Despesa 3° Ano", "Despesa 4° Ano", "Despesa 5° Ano",
+    "Despesa Após 5 Anos",
+)
+
+
+def _datas(valores):
+    """Converte Series, arrays ou datas avulsas em array datetime64[ns]."""
+    return np.asarray(pd.to_datetime(valores), dtype="datetime64[ns]")
+
+
+def diferenca_meses(inicio, fim):
+    """
+    Meses completos de `inicio` até `fim`, com o mesmo resultado de
+    relativedelta(fim, inicio).years * 12 + relativedelta(fim, inicio).months
+    (negativo quando `fim` é anterior a `inicio`).
+    Aceita Series/arrays ou uma data avulsa em qualquer dos lados.
+    Retorna um array float, com NaN onde alguma das datas é nula.
+    """
+    ini, fim = np.broadcast_arrays(_datas(inicio), _datas(fim))
+    nulo = np.isnat(ini) | np.isnat(fim)
+
+    mes_ini = ini.astype("datetime64[M]")
+    mes_fim = fim.astype("datetime64[M]")
+    meses = (mes_fim - mes_ini).astype(np.int64)
+
+    # inicio + meses: mesmo dia/hora de `inicio` no mês de `fim`, com o dia
+    # limitado ao último dia do mês (regra do relativedelta)
+    dia_ini = ini.astype("datetime64[D]")
+    dias_no_mes = (mes_fim + 1).astype("datetime64[D]") - mes_fim.astype("datetime64[D]")
+    dia = np.minimum(dia_ini - mes_ini.astype("datetime64[D]"), dias_no_mes - 1)
+    alvo = mes_fim.astype("datetime64[D]") + dia + (ini - dia_ini)
+
+    meses = np.where((fim >= ini) & (fim < alvo), meses - 1, meses)
+    meses = np.where((fim < ini) & (fim > alvo), meses + 1, meses)
+    return np.where(nulo, np.nan, meses)
+
+
+def classificar_periodo(cvco, referencia, rotulos):
+    """
+    Classifica cada linha pelo número de meses completos entre a data de CVCO
+    e a data de `referencia` (data do documento ou a data de hoje).
+    `rotulos` segue a ordem de PERIODOS_DEPARTAMENTO / PERIODOS_GRD:
+    sem data, negativo, até 3, 12, 24, 36, 48 e 60 meses, acima de 60 meses.
+    Retorna um pd.Categorical ordenado com as categorias de `rotulos`.
+    """
+    meses = diferenca_meses(cvco, referencia)
+    faixa = 2 + np.searchsorted(LIMITES_MESES, np.nan_to_num(meses), side="left")
+    codigos = np.where(np.isnan(meses), 0, np.where(meses < 0, 1, faixa))
+    return pd.Categorical.from_codes(codigos, categories=list(rotulos), ordered=True)
+
+
+if __name__ == "__main__":
+    # Micro-benchmark: GRD sintética com 1 milhão de linhas
+    # Uso: python -m utils.periodos
+    import time
+    from dateutil.relativedelta import relativedelta
+
+    n = 1_000_000
+    rng = np.random.default_rng(0)
+    cvco = pd.Series(pd.Timestamp("2012-01-01") + pd.to_timedelta(rng.integers(0, 4000, n), unit="D"))
+    doc = pd.Series(pd.Timestamp("2012-01-01") + pd.to_timedelta(rng.integers(0, 5000, n), unit="D"))
+    cvco[rng.random(n) < 0.05] = pd.NaT
+
+    inicio = time.perf_counter()
+    periodos = classificar_periodo(cvco, doc, PERIODOS_GRD)
+    t_vetorizado = time.perf_counter() - inicio
+
+    def classify_period_doc(cvco_date, doc_date):
+        """Versão linha a linha (relativedelta), usada como referência."""
+        if pd.isnull(cvco_date) or pd.isnull(doc_date):
+            return PERIODOS_GRD[0]
+        delta = relativedelta(doc_date.to_pydatetime(), cvco_date.to_pydatetime())
+        meses = delta.years * 12 + delta.months
+        if meses < 0:
+            return PERIODOS_GRD[1]
+        return PERIODOS_GRD[2 + int(np.searchsorted(LIMITES_MESES, meses))]
+
+    amostra = 50_000
+    inicio = time.perf_counter()
+    referencia = [classify_period_doc(c, d) for c, d in zip(cvco[:amostra], doc[:amostra])]
+    t_linha = (time.perf_counter() - inicio) * n / amostra
+
+    assert list(periodos[:amostra]) == referencia
+    print(f"Linhas: {n:,}")
+    print(f"Vetorizado:               {t_vetorizado:8.3f} s")
+    print(f"Linha a linha (estimado): {t_linha:8.3f} s  ({t_linha / t_vetorizado:.0f}x)")
@@ -0,0 +1,224 @@
+"""
+Previsão mensal de chamados de assistência técnica por empreendimento
+("Previsão de Chamados por Ano" do Painel de Assistência Técnica).
+
+O histórico da aba engenharia é comparado com a exposição (unidades x meses
+em garantia) de cada empreendimento da aba departamento:
+  - taxa por idade: chamados por unidade-mês em cada ano de garantia;
+  - fator do empreendimento: chamados observados / esperados pela taxa por
+    idade, puxado para 1 com o peso de FORCA_PRIOR chamados esperados, para
+    que obras com pouco histórico fiquem perto da média;
+  - fator de chuva: exp(beta x chuva padronizada do mês), com beta ajustado
+    nos desvios mensais; meses sem registro usam a média histórica do mês.
+
+Todos os meses de garantia de todas as obras são calculados de uma vez, em
+arrays com uma posição por (obra, mês).
+"""
+import numpy as np
+import pandas as pd
+
+from utils.garantia import PRAZO_GARANTIA_MESES
+
+FORCA_PRIOR = 10.0
+
+
+def _meses(datas):
+    """Datas como nº do mês (ano x 12 + mês - 1), float com NaN onde não há data."""
+    datas = pd.Series(pd.to_datetime(np.asarray(datas), errors="coerce"))
+    return (datas.dt.year * 12 + datas.dt.month - 1).to_numpy(dtype=float)
+
+
+def _grade(meses, primeiro=0):
+    """
+    Uma posição por (obra, mês): índice da obra e posição k do mês na
+    garantia, de `primeiro` (por obra ou único) até `primeiro` + meses - 1.
+    """
+    obra = np.repeat(np.arange(len(meses)), meses)
+    k = np.arange(meses.sum()) - np.repeat(np.cumsum(meses) - meses, meses)
+    return obra, k + np.broadcast_to(primeiro, len(meses))[obra]
+
+
+def _chuva_padronizada(ajuste, mes):
+    """Chuva padronizada de cada mês: a registrada ou, sem registro, a média do mês do calendário."""
+    chuva = ajuste["chuva"].reindex(mes).to_numpy()
+    media_mes = ajuste["climatologia"].to_numpy()[mes % 12]
+    chuva = np.where(np.isnan(chuva), media_mes, chuva)
+    return np.nan_to_num((chuva - ajuste["chuva_media"]) / ajuste["chuva_desvio"])
+
+
+def ajustar(chamados, obras, chuva=None, prazo_meses=PRAZO_GARANTIA_MESES, ate=None):
+    """
+    Ajusta o modelo de chamados.
+
+    `chamados` tem "Empreendimento" e "Data de Abertura"; `obras` tem
+    "Empreendimento", "Data Entrega de Obra" e "N° Unidades"; `chuva`
+    (opcional) tem "AnoMes" ("AAAA-MM") e "Chuva" (mm). Só contam os
+    chamados abertos dentro da garantia (`prazo_meses` a partir do mês da
+    entrega), e só os meses entre o primeiro chamado registrado e o mês de
+    `ate` (padrão: mês do último chamado) entram na exposição.
+    Retorna um dict com os parâmetros, usado por `prever`.
+    """
+    obras = obras[["Empreendimento", "Data Entrega de Obra", "N° Unidades"]].copy()
+    obras["N° Unidades"] = pd.to_numeric(obras["N° Unidades"], errors="coerce")
+    obras = obras.dropna().drop_duplicates("Empreendimento")
+    obras = obras[obras["N° Unidades"] > 0].reset_index(drop=True)
+    inicio = _meses(obras["Data Entrega de Obra"]).astype(np.int64)
+    unidades = obras["N° Unidades"].to_numpy(dtype=float)
+
+    mes_chamado = _meses(chamados["Data de Abertura"])
+    desde = np.nanmin(mes_chamado, initial=np.inf)
+    fim = _meses([ate])[0] if ate is not None else np.nanmax(mes_chamado, initial=-np.inf)
+    if not (np.isfinite(desde) and np.isfinite(fim)):
+        desde, fim = 0, -1  # sem histórico: nenhum mês observado
+    anos = max(prazo_meses // 12, 1)
+
+    # Exposição observada: meses de garantia de cada obra entre `desde` e `fim`
+    k0 = np.clip(desde - inicio, 0, None).astype(np.int64)
+    n_obs = np.clip(np.minimum(prazo_meses, fim - inicio) - k0 + 1, 0, None).astype(np.int64)
+    obra, k = _grade(n_obs, k0)
+    idade = np.minimum(k // 12, anos - 1)
+    exposicao = unidades[obra]
+    mes = inicio[obra] + k
+
+    # Chamados de cada (obra, mês)
+    idx = pd.Index(obras["Empreendimento"]).get_indexer(chamados["Empreendimento"])
+    # Só os chamados de obras ajustadas: o -1 do get_indexer não pode indexar os arrays das obras
+    com_obra = (idx >= 0) & ~np.isnan(mes_chamado)
+    idx = idx[com_obra]
+    k_chamado = mes_chamado[com_obra] - inicio[idx] - k0[idx]
+    validos = (k_chamado >= 0) & (k_chamado < n_obs[idx])
+    celula = (np.cumsum(n_obs) - n_obs)[idx[validos]] + k_chamado[validos].astype(np.int64)
+    observados = np.bincount(celula, minlength=len(obra)).astype(float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taxa_idade = np.bincount(idade, observados, anos) / np.bincount(idade, exposicao, anos)
+    taxa_idade = np.nan_to_num(taxa_idade)
+    esperado = exposicao * taxa_idade[idade]
+    fator = ((np.bincount(obra, observados, len(obras)) + FORCA_PRIOR)
+             / (np.bincount(obra, esperado, len(obras)) + FORCA_PRIOR))
+    esperado = esperado * fator[obra]
+
+    # Chuva: série por mês, média por mês do calendário e beta sobre log(observado / esperado) do mês
+    if chuva is not None and {"AnoMes", "Chuva"} <= set(chuva.columns):
+        serie = pd.DataFrame({"mes": _meses(pd.to_datetime(chuva["AnoMes"], format="%Y-%m", errors="coerce")),
+                              "chuva": pd.to_numeric(chuva["Chuva"], errors="coerce")}).dropna()
+        serie = serie.groupby(serie["mes"].astype(np.int64))["chuva"].mean()
+    else:
+        serie = pd.Series(dtype=float)
+    ajuste = {
+        "obras": pd.DataFrame({"Empreendimento": obras["Empreendimento"].to_numpy(),
+                               "inicio": inicio, "unidades": unidades, "fator": fator}),
+        "taxa_idade": taxa_idade,
+        "beta": 0.0,
+        "chuva": serie,
+        "climatologia": serie.groupby(serie.index % 12).mean().reindex(range(12)),
+        "chuva_media": serie.mean() if len(serie) else 0.0,
+        "chuva_desvio": serie.std() if len(serie) > 1 and serie.std() > 0 else 1.0,
+        "observados": observados,
+        "k0": k0,
+        "n_obs": n_obs,
+        "prazo_meses": prazo_meses,
+        "fim": int(fim),
+    }
+    if len(serie) > 1 and len(mes):
+        base = mes.min()
+        obs_mes = np.bincount(mes - base, observados)
+        esp_mes = np.bincount(mes - base, esperado)
+        meses_obs = np.arange(len(obs_mes)) + base
+        com_dado = (esp_mes > 0) & np.isin(meses_obs, serie.index)
+        z = _chuva_padronizada(ajuste, meses_obs[com_dado])
+        y = np.log((obs_mes[com_dado] + 0.5) / (esp_mes[com_dado] + 0.5))
+        w = esp_mes[com_dado]
+        if (w * z * z).sum() > 0:
+            ajuste["beta"] = float((w * z * y).sum() / (w * z * z).sum())
+        # Reescala a taxa para o total ajustado bater com o total observado
+        total = (esperado * np.exp(ajuste["beta"] * _chuva_padronizada(ajuste, mes))).sum()
+        if total > 0:
+            ajuste["taxa_idade"] = taxa_idade * observados.sum() / total
+    return ajuste
+
+
+def prever(ajuste):
+    """
+    Chamados previstos em todos os meses de garantia de todas as obras
+    ajustadas. Retorna "Empreendimento", "AnoMes" (Period mensal), "Ano",
+    "Ano de Garantia" (1, 2, ...), "Chamados Previstos" e "Chamados
+    Registrados" (NaN nos meses fora do histórico usado no ajuste).
+    """
+    obras = ajuste["obras"]
+    prazo = ajuste["prazo_meses"]
+    anos = len(ajuste["taxa_idade"])
+    obra, k = _grade(np.full(len(obras), prazo + 1, dtype=np.int64))
+    idade = np.minimum(k // 12, anos - 1)
+    mes = obras["inicio"].to_numpy()[obra] + k
+
+    previstos = (obras["unidades"].to_numpy()[obra] * ajuste["taxa_idade"][idade]
+                 * obras["fator"].to_numpy()[obra] * np.exp(ajuste["beta"] * _chuva_padronizada(ajuste, mes)))
+
+    k0, n_obs = ajuste["k0"], ajuste["n_obs"]
+    posicao = k - k0[obra]
+    observado = (posicao >= 0) & (posicao < n_obs[obra])
+    registrados = np.full(len(obra), np.nan)
+    registrados[observado] = ajuste["observados"][(np.cumsum(n_obs) - n_obs)[obra[observado]] + posicao[observado]]
+
+    meses = pd.PeriodIndex.from_ordinals(mes - 1970 * 12, freq="M")
+    return pd.DataFrame({
+        "Empreendimento": obras["Empreendimento"].to_numpy()[obra],
+        "AnoMes": meses,
+        "Ano": meses.year,
+        "Ano de Garantia": idade + 1,
+        "Chamados Previstos": previstos,
+        "Chamados Registrados": registrados,
+    })
+
+
+if __name__ == "__main__":
+    # Backtest: ajusta com o histórico até um mês de corte e compara os 12 meses
+    # seguintes com a razão global (chamados/unidade/ano x unidades em garantia)
+    # Uso: python -m utils.previsao [planilha] [AAAA-MM de corte]
+    import os
+    import sys
+
+    from utils.base_dados import ler_aba
+
+    caminho = sys.argv[1] if len(sys.argv) > 1 else os.path.join("pages", "base2025.xlsx")
+    eng = ler_aba(caminho, "engenharia")
+    dep = ler_aba(caminho, "departamento")
+    chuva = ler_aba(caminho, "calendariodechuvas")
+    for df in (eng, dep, chuva):
+        df.columns = df.columns.str.strip().str.replace(r"\s+", " ", regex=True)
+    dep = dep.rename(columns={c: n for c in dep.columns for n in ("Data Entrega de Obra", "N° Unidades")
+                              if c.replace(" ", "").lower() == n.replace(" ", "").lower()})
+    dep["Data Entrega de Obra"] = pd.to_datetime(dep["Data Entrega de Obra"], format="%d/%m/%Y", errors="coerce")
+    eng["Data de Abertura"] = pd.to_datetime(eng["Data de Abertura"], format="%d/%m/%Y", errors="coerce")
+    meses_chuva = ["JAN", "FEV", "MAR", "ABR", "MAI", "JUN", "JUL", "AGO", "SET", "OUT", "NOV", "DEZ"]
+    chuva = chuva.melt(id_vars=["ANO"], value_vars=meses_chuva, var_name="Mes", value_name="Chuva")
+    chuva["Chuva"] = pd.to_numeric(chuva["Chuva"].astype(str).str.replace(",", "."), errors="coerce")
+    chuva["AnoMes"] = chuva["ANO"].astype(str) + "-" + (chuva["Mes"].map(meses_chuva.index) + 1).map("{:02d}".format)
+
+    ultimo = eng["Data de Abertura"].max().to_period("M")
+    corte = pd.Period(sys.argv[2], freq="M") if len(sys.argv) > 2 else ultimo - 12
+    teste = pd.period_range(corte + 1, min(corte + 12, ultimo), freq="M")
+
+    ajuste = ajustar(eng, dep, chuva, ate=corte.to_timestamp())
+    previsao = prever(ajuste)
+    real = prever(ajustar(eng, dep, chuva, ate=teste[-1].to_timestamp()))
+    no_teste = previsao["AnoMes"].isin(teste)
+    por_mes = pd.DataFrame({
+        "Previsto": previsao[no_teste].groupby("AnoMes")["Chamados Previstos"].sum(),
+        "Real": real[real["AnoMes"].isin(teste)].groupby("AnoMes")["Chamados Registrados"].sum(),
+    })
+
+    # Referência: razão global até o corte x unidades em garantia no mês
+    historico = previsao[previsao["Chamados Registrados"].notna()]
+    unidades = ajuste["obras"].set_index("Empreendimento")["unidades"]
+    exposicao = previsao[no_teste].assign(u=lambda d: d["Empreendimento"].map(unidades)).groupby("AnoMes")["u"].sum()
+    taxa_global = historico["Chamados Registrados"].sum() / historico["Empreendimento"].map(unidades).sum()
+    por_mes["Razão global"] = exposicao * taxa_global
+
+    print(f"Corte: {corte}  |  beta chuva: {ajuste['beta']:+.3f}  |  taxa por ano de garantia (chamados/unidade/ano): "
+          + ", ".join(f"{t * 12:.3f}" for t in ajuste["taxa_idade"]))
+    print(por_mes.round(1).to_string())
+    for coluna in ("Previsto", "Razão global"):
+        erro = (por_mes[coluna] - por_mes["Real"]).abs().sum() / por_mes["Real"].sum()
+        print(f"Erro absoluto relativo ({coluna}): {erro:.1%}")
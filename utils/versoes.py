@@ -0,0 +1,142 @@
+"""
+Versões salvas do cronograma de contrapartidas ("Salvar Versão").
+
+Cada versão fica em disco (pickle gzip) com os dados base e as
+distribuições de desembolso, em vez de um XLSX em base64 guardado na
+sessão. Para ocupar pouco espaço, a versão guarda só a diferença para a
+anterior (linhas novas/alteradas por "id", ids removidos e distribuições
+alteradas); a cada INTERVALO_COMPLETA versões é gravada uma cópia completa,
+o que limita o tamanho da cadeia a reconstruir.
+
+A pasta é compartilhada por todas as sessões, então guarda só as
+MAX_VERSOES mais recentes: ao salvar, as mais antigas são apagadas, exceto
+as que ainda formam a cadeia (até a cópia completa) de uma versão mantida.
+"""
+import datetime
+import os
+import uuid
+
+import pandas as pd
+
+PASTA_VERSOES = ".versoes"
+INTERVALO_COMPLETA = 20
+MAX_VERSOES = 100
+_EXT = ".pkl.gz"
+
+
+def listar(pasta=PASTA_VERSOES):
+    """Nomes das versões salvas, da mais antiga para a mais recente."""
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(n[:-len(_EXT)] for n in os.listdir(pasta) if n.endswith(_EXT))
+
+
+def data_versao(nome):
+    """Data/hora em que a versão `nome` foi salva."""
+    return datetime.datetime.strptime(nome[:22], "%Y%m%d_%H%M%S_%f")
+
+
+def _ler(nome, pasta):
+    return pd.read_pickle(os.path.join(pasta, nome + _EXT), compression="gzip")
+
+
+def _gravar(registro, nome, pasta):
+    os.makedirs(pasta, exist_ok=True)
+    destino = os.path.join(pasta, nome + _EXT)
+    tmp = f"{destino}.{os.getpid()}.tmp"
+    pd.to_pickle(registro, tmp, compression="gzip")
+    os.replace(tmp, destino)
+
+
+def _cadeia(nome, pasta):
+    """Registros da versão `nome` até a última cópia completa (esta por último)."""
+    cadeia = [_ler(nome, pasta)]
+    while cadeia[-1]["tipo"] != "completa":
+        cadeia.append(_ler(cadeia[-1]["anterior"], pasta))
+    return cadeia
+
+
+def _reconstruir(cadeia):
+    cadeia = list(cadeia)
+    base = cadeia.pop()
+    df, distribuicoes = base["df"], dict(base["distribuicoes"])
+    for delta in reversed(cadeia):
+        linhas = pd.concat([df[~df["id"].isin(delta["removidos"])], delta["linhas"]])
+        df = linhas.drop_duplicates("id", keep="last").set_index("id", drop=False).loc[delta["ordem"]]
+        df = df.reset_index(drop=True)
+        for chave in delta["dist_removidas"]:
+            distribuicoes.pop(chave, None)
+        distribuicoes.update(delta["distribuicoes"])
+    return df, distribuicoes
+
+
+def carregar(nome, pasta=PASTA_VERSOES):
+    """
+    Reconstrói a versão `nome`: (DataFrame dos dados base, {chave: distribuição}).
+    Parte da última cópia completa e aplica as diferenças em ordem.
+    """
+    return _reconstruir(_cadeia(nome, pasta))
+
+
+def _diferenca(df, distribuicoes, df_ant, dist_ant):
+    """Delta de (df, distribuicoes) contra a versão anterior, ou None se não for possível."""
+    if ("id" not in df.columns or df["id"].isna().any() or df["id"].duplicated().any()
+            or list(df.columns) != list(df_ant.columns)):
+        return None
+    atual = df.set_index("id", drop=False)
+    # Uma cópia completa pode ter ids nulos ou repetidos; como em carregar, vale a última linha de cada id
+    anterior = df_ant.dropna(subset=["id"]).drop_duplicates("id", keep="last").set_index("id", drop=False)
+    comuns = atual.index.intersection(anterior.index)
+    a, b = atual.loc[comuns], anterior.loc[comuns]
+    iguais = ((a == b) | (a.isna() & b.isna())).all(axis=1)
+    alteradas = iguais.index[~iguais].append(atual.index.difference(anterior.index))
+    return {
+        "tipo": "delta",
+        "linhas": atual.loc[atual.index.isin(alteradas)].reset_index(drop=True),
+        "removidos": anterior.index.difference(atual.index).tolist(),
+        "ordem": atual.index.tolist(),
+        "distribuicoes": {k: v for k, v in distribuicoes.items()
+                          if k not in dist_ant or not v.equals(dist_ant[k])},
+        "dist_removidas": [k for k in dist_ant if k not in distribuicoes],
+    }
+
+
+def salvar(df, distribuicoes, pasta=PASTA_VERSOES):
+    """Grava uma nova versão e devolve o nome dela."""
+    existentes = listar(pasta)
+    nome = f"{datetime.datetime.now():%Y%m%d_%H%M%S_%f}_{uuid.uuid4().hex[:6]}"
+    registro = None
+    if existentes:
+        anterior = existentes[-1]
+        cadeia = _cadeia(anterior, pasta)
+        if len(cadeia) < INTERVALO_COMPLETA:
+            registro = _diferenca(df, distribuicoes, *_reconstruir(cadeia))
+        if registro is not None:
+            registro["anterior"] = anterior
+    if registro is None:
+        registro = {"tipo": "completa", "df": df, "distribuicoes": dict(distribuicoes)}
+    _gravar(registro, nome, pasta)
+    _podar(pasta, MAX_VERSOES)
+    return nome
+
+
+def _podar(pasta, limite):
+    """
+    Apaga as versões anteriores à cópia completa de que depende a mais antiga
+    das `limite` versões mais recentes (ficam no máximo limite +
+    INTERVALO_COMPLETA - 1 arquivos).
+    """
+    nomes = listar(pasta)
+    if len(nomes) <= limite:
+        return
+    mais_antiga = nomes[-limite]
+    while True:
+        registro = _ler(mais_antiga, pasta)
+        if registro["tipo"] == "completa":
+            break
+        mais_antiga = registro["anterior"]
+    for nome in nomes[:nomes.index(mais_antiga)]:
+        try:
+            os.remove(os.path.join(pasta, nome + _EXT))
+        except FileNotFoundError:  # já apagada por outra sessão
+            pass